@@ -0,0 +1,141 @@
+"""
+In-process result cache for the analytics endpoints.
+
+Entries are keyed per section and remember the watermarks of the tables they
+were computed from. One cheap probe (MAX of an indexed column per table)
+tells us whether any source table changed since; if not, the cached result
+is served instead of re-running the GROUP BY. TTL bounds staleness for
+in-place updates the watermarks cannot see (e.g. an order status change),
+and LRU eviction bounds memory.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Every probe is an index-only MAX(), so the whole statement costs one round trip
+WATERMARK_PROBES = {
+    'orders': "SELECT MAX(order_id) FROM orders",
+    'order_items': "SELECT MAX(order_item_id) FROM order_items",
+    'users': "SELECT MAX(user_id) FROM users",
+    'products': "SELECT MAX(product_id) FROM products",
+    'product_variants': "SELECT MAX(variant_id) FROM product_variants",
+    'categories': "SELECT MAX(category_id) FROM categories",
+    'inventory': "SELECT MAX(last_updated) FROM inventory",
+    'reviews': "SELECT MAX(review_id) FROM reviews",
+}
+
+
+def build_watermark_query(probes):
+    """Combine {name: scalar probe} into a single SELECT returning one column per name"""
+    columns = ",\n        ".join(f"({sql}) as {name}" for name, sql in probes.items())
+    return f"SELECT\n        {columns}"
+
+
+WATERMARK_QUERY = build_watermark_query(WATERMARK_PROBES)
+
+
+class AnalyticsCache:
+    """TTL + LRU cache whose entries are invalidated by table watermarks.
+
+    Args:
+        probe (callable): Returns a dict of table name -> watermark, or None if unavailable
+        ttl (float): Seconds an entry may be served at most (0 disables the cache)
+        max_entries (int): LRU capacity
+        probe_interval (float): Seconds a probe result is reused, so a burst of
+            section requests (one dashboard load) shares a single probe
+    """
+
+    def __init__(self, probe, ttl=60.0, max_entries=256, probe_interval=1.0):
+        self._probe = probe
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.probe_interval = probe_interval
+
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, marks, expires_at)
+        self._watermarks = None
+        self._probed_at = 0.0
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._probes = 0
+        self._bypassed = 0
+
+    def watermarks(self):
+        """Current table watermarks, probing the database at most once per interval"""
+        with self._probe_lock:
+            if self._watermarks is None or time.monotonic() - self._probed_at >= self.probe_interval:
+                self._watermarks = self._probe()
+                self._probed_at = time.monotonic()
+                with self._lock:
+                    self._probes += 1
+            return self._watermarks
+
+    def get_or_compute(self, key, sources, compute):
+        """Return the cached value for `key`, recomputing it when a source table changed"""
+        if not self.ttl:
+            return compute()
+
+        watermarks = self.watermarks()
+        if watermarks is None:
+            # Probe failed; serve fresh data rather than risk a stale hit
+            with self._lock:
+                self._bypassed += 1
+            return compute()
+        marks = tuple(watermarks.get(table) for table in sources)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, cached_marks, expires_at = entry
+                if cached_marks == marks and now < expires_at:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                if cached_marks != marks:
+                    self._invalidations += 1
+                else:
+                    self._expirations += 1
+                del self._entries[key]
+            self._misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (value, marks, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self):
+        """Drop every entry and force a new probe"""
+        with self._probe_lock:
+            self._watermarks = None
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'expirations': self._expirations,
+                'evictions': self._evictions,
+                'probes': self._probes,
+                'bypassed': self._bypassed,
+            }
@@ -13,157 +13,282 @@ Description: Flask backend server for AI-powered eCommerce analytics system
 that converts natural language queries to SQL using Google's Gemini AI.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import os
 import mysql.connector
-import pandas as pd
 from tabulate import tabulate
 from dotenv import load_dotenv
-import re
-import sqlparse
 from google import genai
 from google.genai import types
+from google.genai import errors as genai_errors
 from decimal import Decimal
 from flask_cors import CORS
 from collections import defaultdict
 import decimal
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import json
+import time
+import hashlib
+import functools
+import calendar
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from db import get_pool, DB_NAME
+from analytics_cache import AnalyticsCache, WATERMARK_PROBES, build_watermark_query
+from live_dashboard import LiveDashboard
+from compression import Compressor
+import rollups
+from columnar import ColumnStore, ColumnarEngine, COLUMNAR_DIR, COLUMNAR_LOOKBACK_DAYS
+from question_cache import QuestionCache, normalize_question
+from session_cache import SessionCache
+from singleflight import Group
+from resilience import CircuitBreaker, ModelUnavailable, ResilientCaller
+from sql_result import QueryResult
+import sql_normalize
+import export
+from export import ExportError
+from json_encoding import FastJSONProvider, dumps as json_dumps
+from sql_guard import QueryGuard, is_timeout_error
+from schema_prompt import SchemaPrompter, SCHEMA_COLUMNS_QUERY, SCHEMA_FOREIGN_KEYS_QUERY
+from fast_path import FastPathRouter, intent
+from pagination import (PageArgs, PageArgError, parse_page_args, date_range_conditions,
+                        keyset_condition, where_clause, split_page)
+import itertools
+import logging
+import metrics
+from logs import setup_logging, log_event, log_payload
+from metrics import span, timed
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # Decimal/date aware, orjson when installed
 CORS(app)  # Enable CORS for all routes
 
 load_dotenv()
+setup_logging()
+logger = logging.getLogger('app')
+
+# Requests slower than this are logged with their span breakdown (0 disables)
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 0))
+metrics.init_app(app, slow_request_ms=SLOW_REQUEST_MS)
+
+# gzip / br for JSON, CSV and Arrow bodies (br needs `pip install brotli`)
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") in ("1", "true", "True")
+compressor = Compressor(
+    min_size=int(os.environ.get("COMPRESSION_MIN_BYTES", 1024)),
+    gzip_level=int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),
+    brotli_quality=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5)),
+)
+if COMPRESSION_ENABLED:
+    compressor.init_app(app)
 GEMINI_API_KEY = os.environ.get("GEMINI")
 if not GEMINI_API_KEY:
     raise Exception("❌ GEMINI_API_KEY not found. Please check your .env file or environment.")
 
-DB_NAME = "online_store"
-DB_USER = "root"
-DB_PASS = ""
-DB_HOST = "localhost"
-
 # Database connection
 def get_db_connection():
-    return mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASS,
-        database=DB_NAME
-    )
+    """Check a connection out of the shared pool (use as a context manager)"""
+    return get_pool().connection()
+
+# Identical calls in flight at the same time run once and share the result
+SINGLEFLIGHT_ENABLED = os.environ.get("SINGLEFLIGHT_ENABLED", "1") in ("1", "true", "True")
+# Seconds a duplicate waits on the leader before running the call itself
+SINGLEFLIGHT_TIMEOUT = float(os.environ.get("SINGLEFLIGHT_TIMEOUT", 30)) or None
+db_flight = Group('db', timeout=SINGLEFLIGHT_TIMEOUT)
+gemini_flight = Group('gemini', timeout=SINGLEFLIGHT_TIMEOUT)
 
 # Helper function to execute queries
 def execute_query(query, params=None):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute(query, params or ())
-        result = cursor.fetchall()
-        return result
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+    """Rows of a read-only query as dicts, raising if it fails; concurrent identical queries share one execution"""
+    if not SINGLEFLIGHT_ENABLED:
+        return _execute_query(query, params)
+    return db_flight.do((query, tuple(params or ())), _execute_query, query, params)
+
+def _execute_query(query, params=None):
+    # Failures propagate: every caller is a cached section, and an empty
+    # result standing in for an error would be cached (and pushed live) as data
+    with span('db.query'), get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params or ())
+            result = cursor.fetchall()
+            return result
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'db.query_failed', error=str(e), query=query)
+            raise
+        finally:
+            cursor.close()
 
 def test_db_connection():
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASS,
-            database=DB_NAME
-        )
-        conn.close()
-        print("✅ MySQL connection successful!")
+        with get_db_connection() as conn:
+            conn.ping()
+        logger.info("MySQL connection successful")
     except Exception as e:
-        print(f"❌ MySQL connection failed:\n{e}")
+        log_event(logger, logging.ERROR, 'db.connection_failed', error=str(e))
 
 # Test the DB connection
 # test_db_connection()  # Commented out to avoid running on every API call
 
-def run_sql(sql):
-    try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASS,
-            database=DB_NAME
-        )
+# Rows pulled from the server per fetchmany() call on the NL query path
+SQL_FETCH_BATCH = int(os.environ.get("SQL_FETCH_BATCH", 500))
+
+def run_sql(sql, batch_size=SQL_FETCH_BATCH):
+    """Execute a SELECT on an unbuffered cursor; returns a QueryResult or an error message.
+
+    The pooled connection stays checked out until the result is exhausted or
+    closed. A result closed early still has rows in flight, so its connection
+    is discarded instead of going back to the pool.
+    """
+    pool = get_pool()
+    with span('db.execute') as current:
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            current.failed = True
+            return sql_error_message(e)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+        except Exception as e:
+            current.failed = True
+            pool.release(conn, discard=isinstance(e, (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError)))
+            return sql_error_message(e)
+
+    def release(exhausted):
+        if exhausted:
+            cursor.close()
+        pool.release(conn, discard=not exhausted)
+
+    return QueryResult.from_cursor(cursor, on_close=release, batch_size=batch_size)
+
+@timed('sql_guard.explain')
+def explain_sql(sql):
+    """Parsed EXPLAIN FORMAT=JSON plan of a statement"""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(sql)
-        columns = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-        conn.close()
-        return pd.DataFrame(rows, columns=columns)
-    except Exception as e:
-        return f"❌ SQL Execution Error:\n{e}"
+        try:
+            cursor.execute("EXPLAIN FORMAT=JSON " + sql.strip().rstrip(';'))
+            return json.loads(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+
+# Generated SQL is explained first; expensive plans are refused and the rest
+# run under a server-side deadline
+SQL_GUARD_ENABLED = os.environ.get("SQL_GUARD_ENABLED", "1") in ("1", "true", "True")
+query_guard = QueryGuard(
+    explain_sql,
+    max_rows=int(os.environ.get("SQL_GUARD_MAX_ROWS", 1000000)),
+    max_full_scans=int(os.environ.get("SQL_GUARD_MAX_FULL_SCANS", 2)),
+    max_execution_ms=int(os.environ.get("SQL_MAX_EXECUTION_MS", 5000)),
+    full_scan_min_rows=int(os.environ.get("SQL_GUARD_FULL_SCAN_MIN_ROWS", 10000)),
+)
 
+def sql_error_message(error):
+    """User-facing text for a failed generated query"""
+    if is_timeout_error(error):
+        return query_guard.timeout_message()
+    if getattr(error, 'errno', None) in (1054, 1146):
+        # Unknown column / table: the model was shown an outdated schema
+        schema_prompter.mark_stale()
+    return f"❌ SQL Execution Error:\n{error}"
+
+@timed('sql.validate')
 def is_safe_select(sql):
-    parsed = sqlparse.parse(sql)
-    for stmt in parsed:
-        if stmt.get_type() != 'SELECT':
-            return False
-    return True
+    """A single SELECT that writes nothing"""
+    return sql_normalize.is_safe_select(sql_normalize.parse(sql))
+
+# Rows a generated query without its own LIMIT may return on /ask
+ASK_ROW_LIMIT = 100
 
-def add_limit(sql, limit=100):
-    # Check for existing LIMIT clause (case-insensitive, word boundary)
-    if re.search(r'\bLIMIT\s+\d+', sql, re.IGNORECASE):
-        return sql
-    sql = sql.rstrip(';')
-    return f"{sql} LIMIT {limit};"
+def add_limit(sql, limit=ASK_ROW_LIMIT):
+    """`sql` with a LIMIT on the outermost query unless it has one; LIMITs in subqueries do not count"""
+    return sql_normalize.add_limit(sql_normalize.parse(sql), limit) + ";"
 
 # Step 4: Check if response is SQL or conversational text
 def is_sql_response(response):
     # Check if response starts with SELECT and looks like SQL
-    response_clean = response.strip().upper()
+    response_clean = sql_normalize.extract_statement(response).upper()
     return (response_clean.startswith('SELECT') and 
             any(keyword in response_clean for keyword in ['FROM', 'WHERE', 'JOIN']))
 
 # Updated Gemini Prompt Configuration
+# Fixed part of the prompt; the schema section is added per question by schema_prompter
 SYSTEM_PROMPT = """
 You are an AI assistant for an eCommerce database system. You can handle both general conversation and database queries.
 
-For DATABASE QUESTIONS:
-- Return ONLY a valid MySQL SELECT query
-- Do NOT include backticks, markdown, explanations, or natural language
-- Do NOT prefix with "SQL:" or wrap with quotes or code blocks
-- The entire output must be ONE LINE of raw SQL
-
-For GENERAL CONVERSATION:
-- Respond naturally and helpfully in complete, grammatically correct English sentences
-- Use proper sentence structure and avoid mixing technical terms with casual language
-- Be friendly, professional, and conversational
-- Provide clear and easy-to-understand explanations
-- Use proper punctuation and capitalization
-- If asked about your capabilities, mention you can help with both general questions and database queries
-
-IMPORTANT RESPONSE GUIDELINES:
-- Always respond in complete, well-formed English sentences
-- Use natural language that sounds human and professional
-- Avoid technical jargon unless necessary and always explain it
-- Structure your responses logically with proper grammar
-- Be concise but complete in your explanations
-
-SCHEMA (for database queries):
-- users(user_id, name, email, password_hash, phone, created_at, updated_at)
-- categories(category_id, name, description)
-- products(product_id, category_id, name, description, base_price, brand, image_url, created_at)
-- product_variants(variant_id, product_id, sku, color, size, additional_price)
-- inventory(variant_id, quantity, last_updated)
-- orders(order_id, user_id, order_date, status, total_amount, shipping_address)
-- order_items(order_item_id, order_id, variant_id, quantity, price)
-- payments(payment_id, order_id, payment_method, payment_status, paid_at)
-- shipping(shipping_id, order_id, carrier, tracking_number, status, estimated_delivery_date)
-- reviews(review_id, user_id, product_id, rating, comment, created_at)
+For DATABASE QUESTIONS return ONLY one line of raw MySQL SELECT: no backticks, markdown, quotes, "SQL:" prefix or explanations.
+
+For GENERAL CONVERSATION reply in friendly, professional, complete English sentences with proper grammar and punctuation. Explain any technical term you use. If asked about your capabilities, mention you can help with both general questions and database queries.
 """
 
-def get_sql_from_gemini(user_question):
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    model = "gemini-2.5-flash-preview-04-17"
+def load_schema():
+    """Columns and foreign keys of the current database, for schema_prompter"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(SCHEMA_COLUMNS_QUERY)
+            columns = cursor.fetchall()
+            cursor.execute(SCHEMA_FOREIGN_KEYS_QUERY)
+            return columns, cursor.fetchall()
+        finally:
+            cursor.close()
+
+schema_prompter = SchemaPrompter(
+    load_schema,
+    SYSTEM_PROMPT,
+    refresh_interval=float(os.environ.get("SCHEMA_REFRESH_SECONDS", 300))
+)
+
+# Answers to previously seen questions (validated SQL or conversational reply)
+question_cache = QuestionCache(
+    os.environ.get("QUESTION_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_cache.sqlite3")),
+    ttl=float(os.environ.get("QUESTION_CACHE_TTL", 86400)),
+    max_entries=int(os.environ.get("QUESTION_CACHE_SIZE", 1024)),
+    max_stored=int(os.environ.get("QUESTION_CACHE_MAX_STORED", 100000)),
+    revalidate=float(os.environ.get("QUESTION_CACHE_REVALIDATE_SECONDS", 5))
+)
+
+# Rows behind recent answers per chat session, so refinements ("sort by revenue",
+# "just the top 3") are answered without Gemini or the database
+session_cache = SessionCache(
+    max_sessions=int(os.environ.get("SESSION_CACHE_SESSIONS", 1000)),
+    results_per_session=int(os.environ.get("SESSION_CACHE_RESULTS", 4)),
+    max_rows=int(os.environ.get("SESSION_CACHE_MAX_ROWS", 1000)),
+    max_bytes=int(float(os.environ.get("SESSION_CACHE_MAX_MB", 64)) * 2 ** 20),
+    ttl=float(os.environ.get("SESSION_CACHE_TTL", 1800))
+)
 
-    prompt = SYSTEM_PROMPT + f"\nUser Question: {user_question}\n"
+GEMINI_MODEL = "gemini-2.5-flash-preview-04-17"
+# Alternative API endpoint, e.g. the load-test stub in benchmarks/gemini_stub.py
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL")
+
+# Seconds /ask waits for the model in total, retries and hedges included
+GEMINI_DEADLINE_SECONDS = float(os.environ.get("GEMINI_DEADLINE_SECONDS", 20))
+# Seconds /ask/stream waits for the first chunk of the reply, and for each one after it
+GEMINI_FIRST_TOKEN_SECONDS = float(os.environ.get("GEMINI_FIRST_TOKEN_SECONDS", GEMINI_DEADLINE_SECONDS))
+GEMINI_CHUNK_GAP_SECONDS = float(os.environ.get("GEMINI_CHUNK_GAP_SECONDS", 10))
+
+_gemini_client = None
+_gemini_client_lock = threading.Lock()
+
+def get_gemini_client():
+    """Long-lived Gemini client, created on first use and shared by every request"""
+    global _gemini_client
+    if _gemini_client is None:
+        with _gemini_client_lock:
+            if _gemini_client is None:
+                # The HTTP timeout ends attempts the deadline has already given up on
+                http_options = types.HttpOptions(base_url=GEMINI_BASE_URL, timeout=int(GEMINI_DEADLINE_SECONDS * 1000))
+                _gemini_client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+    return _gemini_client
+
+def stream_from_gemini(user_question):
+    """Yield the model's reply text chunk by chunk, as it is generated"""
+    with span('schema_prompt'):
+        prompt, prompt_info = schema_prompter.build(user_question)
+    log_event(logger, logging.DEBUG, 'gemini.prompt', tables=prompt_info['tables'],
+              prompt_tokens_est=prompt_info['prompt_tokens_est'])
     contents = [
         types.Content(
             role="user",
@@ -176,17 +301,72 @@ def get_sql_from_gemini(user_question):
         response_mime_type="text/plain",
     )
 
-    sql_result = ""
-    for chunk in client.models.generate_content_stream(
-        model=model,
+    prompt_tokens = None
+    for chunk in get_gemini_client().models.generate_content_stream(
+        model=GEMINI_MODEL,
         contents=contents,
         config=generate_content_config,
     ):
-        sql_result += chunk.text
-    return sql_result.strip()
+        if chunk.usage_metadata is not None and chunk.usage_metadata.prompt_token_count:
+            prompt_tokens = chunk.usage_metadata.prompt_token_count
+        if chunk.text:
+            yield chunk.text
+
+    if prompt_tokens is not None:
+        schema_prompter.record_prompt_tokens(prompt_tokens)
+        log_event(logger, logging.DEBUG, 'gemini.usage', prompt_tokens=prompt_tokens)
+
+def gemini_retryable(error):
+    """Server errors, throttling and network failures are retried; other 4xx replies are not"""
+    if isinstance(error, genai_errors.ClientError):
+        return error.code in (408, 429)
+    return True
+
+gemini_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get("GEMINI_BREAKER_FAILURES", 5)),
+    reset_seconds=float(os.environ.get("GEMINI_BREAKER_RESET_SECONDS", 30)),
+    probe_timeout=float(os.environ.get("GEMINI_BREAKER_PROBE_SECONDS", 60))
+)
+gemini_caller = ResilientCaller(
+    'gemini',
+    deadline=GEMINI_DEADLINE_SECONDS,
+    attempts=int(os.environ.get("GEMINI_ATTEMPTS", 3)),
+    backoff=float(os.environ.get("GEMINI_BACKOFF_SECONDS", 0.25)),
+    hedge=os.environ.get("GEMINI_HEDGE", "0") in ("1", "true", "True"),
+    hedge_min_delay=float(os.environ.get("GEMINI_HEDGE_MIN_MS", 500)) / 1000,
+    retryable=gemini_retryable,
+    breaker=gemini_breaker,
+    max_workers=int(os.environ.get("GEMINI_MAX_CONCURRENCY", 32))
+)
 
-def format_natural_response(columns, rows, user_question):
-    """Format database results into natural English responses"""
+GEMINI_UNAVAILABLE_TEXT = ("The assistant is not available right now, please try again in a moment. "
+                           "Dashboard data and previously asked questions still work.")
+
+def gemini_reply(user_question):
+    return "".join(stream_from_gemini(user_question)).strip()
+
+def _sql_from_gemini(user_question):
+    with span('gemini'):
+        return gemini_caller.call(gemini_reply, user_question)
+
+def get_sql_from_gemini(user_question):
+    """Complete Gemini reply; a burst of the same question shares one call.
+
+    Raises ModelUnavailable when the model gives no answer in time or the circuit is open.
+    """
+    if not SINGLEFLIGHT_ENABLED:
+        return _sql_from_gemini(user_question)
+    return gemini_flight.do(normalize_question(user_question), _sql_from_gemini, user_question)
+
+@timed('format_response')
+def format_natural_response(columns, rows, user_question, total_rows=None):
+    """Format database results into natural English responses.
+
+    Only the first 10 rows are read; pass `total_rows` when `rows` is just
+    that preview of a larger result.
+    """
+    if total_rows is None:
+        total_rows = len(rows)
     if not rows:
         return "No results found for your query."
     
@@ -221,11 +401,11 @@ def format_natural_response(columns, rows, user_question):
     if len(columns) == 1:
         # Single column results
         col_name = humanize_column(columns[0])
-        if len(rows) == 1:
+        if total_rows == 1:
             return f"The {col_name.lower()} is {rows[0][0]}."
         else:
             values = [str(row[0]) for row in rows[:10]]  # Limit to first 10
-            if len(rows) > 10:
+            if total_rows > 10:
                 return f"Here are the top 10 {col_name.lower()}s: {', '.join(values)}."
             else:
                 return f"The {col_name.lower()}s are: {', '.join(values)}."
@@ -249,8 +429,8 @@ def format_natural_response(columns, rows, user_question):
             else:
                 sentences.append(f"{row[0]} - {col2_name.lower()}: {row[1]}")
         
-        if len(rows) > 10:
-            result = ". ".join(sentences) + f". (Showing top 10 of {len(rows)} results)"
+        if total_rows > 10:
+            result = ". ".join(sentences) + f". (Showing top 10 of {total_rows} results)"
         else:
             result = ". ".join(sentences) + "."
         return result
@@ -265,374 +445,1072 @@ def format_natural_response(columns, rows, user_question):
                 pairs.append(f"{human_col}: {val}")
             sentences.append("Record " + str(i+1) + " - " + ", ".join(pairs))
         
-        if len(rows) > 5:
-            result = ". ".join(sentences) + f". (Showing 5 of {len(rows)} total records)"
+        if total_rows > 5:
+            result = ". ".join(sentences) + f". (Showing 5 of {total_rows} total records)"
         else:
             result = ". ".join(sentences) + "."
         return result
 
-def chat_with_db_gemini(user_question):
-    print(f"[DEBUG] User question: {user_question}")
-    gemini_response = get_sql_from_gemini(user_question)
-    print(f"[DEBUG] Gemini response: {gemini_response}")
+def clean_sql(gemini_response):
+    """Reduce a SQL reply from the model to one normalized statement ending in ';'"""
+    return sql_normalize.parse(sql_normalize.extract_statement(gemini_response)).sql + ";"
+
+# Rows format_natural_response reads; the rest of a result is only counted
+ANSWER_PREVIEW_ROWS = 10
+
+def fetch_sql_result(final_sql, batch_size=SQL_FETCH_BATCH):
+    """Run a validated SELECT with the LIMIT and cost guard applied; returns a QueryResult or an error message"""
+    # Add LIMIT
+    final_sql_with_limit = add_limit(final_sql)
+    parsed = sql_normalize.parse(final_sql)
+    log_payload(logger, 'sql.final', sql=final_sql_with_limit, fingerprint=parsed.digest, tables=parsed.tables)
+
+    if SQL_GUARD_ENABLED:
+        try:
+            decision = query_guard.check(final_sql_with_limit)
+        except Exception as e:
+            return sql_error_message(e)
+        if not decision.allowed:
+            return query_guard.rejection_message(decision)
+        final_sql_with_limit = decision.sql
+
+    result = run_sql(final_sql_with_limit, batch_size=batch_size)
+    if isinstance(result, str):
+        return result
+    log_event(logger, logging.DEBUG, 'sql.columns', columns=result.columns)
+    return result
+
+def result_is_complete(final_sql, total_rows):
+    """Whether `total_rows` is the whole answer, not a slice cut off by a LIMIT.
+
+    A query with its own LIMIT ("top 10 products") is a slice too: sorting or
+    filtering it differently needs the underlying rows, so only truncations of it are served.
+    """
+    return not sql_normalize.parse(final_sql).has_limit and total_rows < ASK_ROW_LIMIT
+
+def issued_sql(final_sql):
+    """`sql` and `export_token` response fields; the token lets /ask/export run that SQL"""
+    sql = final_sql.rstrip(';')
+    return {"sql": sql, "export_token": export.sign_sql(sql)}
+
+def answer_with_sql(user_question, final_sql, session_id=None):
+    """Run a validated SELECT and phrase the result; returns (response, succeeded)"""
+    result = fetch_sql_result(final_sql)
+    if not isinstance(result, str):
+        # With a session the rows are kept for follow-ups, otherwise only the preview is
+        keep = session_cache.max_rows if session_id else ANSWER_PREVIEW_ROWS
+        try:
+            with span('db.fetch'), result:
+                kept = list(itertools.islice(result, keep))
+                total_rows = len(kept) + sum(1 for _ in result)
+        except Exception as e:
+            result = sql_error_message(e)
+    if isinstance(result, str):
+        log_event(logger, logging.WARNING, 'sql.failed', error=result, sql=final_sql)
+        return {"text": result, "sql": final_sql.rstrip(';')}, False
+
+    if session_id:
+        session_cache.put(session_id, user_question, final_sql, result.columns, kept,
+                          complete=result_is_complete(final_sql, total_rows) and total_rows == len(kept))
+    if not kept:
+        log_event(logger, logging.DEBUG, 'sql.no_rows')
+        return {"text": "No results found.", **issued_sql(final_sql)}, True
+
+    # Use the new natural response formatter
+    text = format_natural_response(result.columns, kept[:ANSWER_PREVIEW_ROWS], user_question, total_rows)
+    log_payload(logger, 'answer.text', text=text, total_rows=total_rows)
+    return {"text": text, **issued_sql(final_sql)}, True
+
+def session_answer(user_question, session_id):
+    """(follow-up kind, columns, rows, text) when the session's recent results answer the question, else None"""
+    if not session_id:
+        return None
+    with span('session_cache'):
+        served = session_cache.answer(session_id, user_question)
+    if served is None:
+        return None
+    kind, columns, rows = served
+    text = format_natural_response(columns, rows, user_question) if rows else "No results found."
+    log_payload(logger, 'session_cache.hit', followup=kind, rows=len(rows))
+    return kind, columns, rows, text
+
+def chat_with_db_gemini(user_question, session_id=None):
+    log_payload(logger, 'ask.question', question=user_question)
+
+    followup = session_answer(user_question, session_id)
+    if followup is not None:
+        kind, _, _, text = followup
+        return {"text": text, "sql": None, "cached": False, "followup": kind}
+
+    fast = fast_path_answer(user_question)
+    if fast is not None:
+        name, columns, rows, text = fast
+        return {"text": text, "sql": None, "cached": False, "fast_path": name}
+
+    # Repeated question: reuse the validated SQL / reply and skip Gemini
+    with span('question_cache'):
+        cached = question_cache.get(user_question)
+    if cached is not None:
+        kind, payload = cached
+        log_event(logger, logging.DEBUG, 'question_cache.hit', kind=kind)
+        if kind == 'sql':
+            response, succeeded = answer_with_sql(user_question, payload, session_id)
+        else:
+            response, succeeded = {"text": payload, "sql": None}, True
+        if succeeded:
+            response['cached'] = True
+            return response
+        # The schema or data moved under the cached SQL, ask Gemini again
+        log_event(logger, logging.WARNING, 'question_cache.stale', sql=payload)
+        question_cache.evict(user_question)
+
+    started = time.perf_counter()
+    try:
+        gemini_response = get_sql_from_gemini(user_question)
+    except ModelUnavailable as e:
+        # Fast path and cache were tried above; all that is left is failing fast
+        log_event(logger, logging.WARNING, 'gemini.unavailable', error=str(e))
+        return {"text": GEMINI_UNAVAILABLE_TEXT, "sql": None, "cached": False, "degraded": True}
+    log_payload(logger, 'gemini.reply', reply=gemini_response)
 
     # Check if response is SQL or conversational
     if is_sql_response(gemini_response):
         # Handle as SQL query
-        sql_line = gemini_response.splitlines()[0]
-        sql_clean = re.sub(r"[`;]", "", sql_line).strip()
-        final_sql = sql_clean + ";"
-        print(f"[DEBUG] Cleaned SQL: {final_sql}")
+        final_sql = clean_sql(gemini_response)
+        log_payload(logger, 'sql.cleaned', sql=final_sql)
 
         # Validate it's a SELECT query
         if not is_safe_select(final_sql):
-            print(f"[DEBUG] Not a valid SELECT query: {final_sql}")
-            return {"text": "Sorry, I could not generate a valid SELECT SQL query for your question.", "sql": None}
-
-        # Add LIMIT
-        final_sql_with_limit = add_limit(final_sql)
-        print(f"[DEBUG] Final SQL with LIMIT: {final_sql_with_limit}")
-
-        result = run_sql(final_sql_with_limit)
-        print(f"[DEBUG] SQL execution result: {result}")
-
-        if isinstance(result, pd.DataFrame) and not result.empty:
-            result = result.replace({Decimal: float})
-            columns = list(result.columns)
-            rows = result.values.tolist()
-            
-            # Use the new natural response formatter
-            text = format_natural_response(columns, rows, user_question)
-            print(f"[DEBUG] Response text: {text}")
-            return {"text": text, "sql": final_sql.rstrip(';')}
-        elif isinstance(result, pd.DataFrame):
-            print("[DEBUG] No results found.")
-            return {"text": "No results found.", "sql": final_sql.rstrip(';')}
-        else:
-            print(f"[DEBUG] Error or non-DataFrame result: {result}")
-            return {"text": str(result), "sql": final_sql.rstrip(';')}
+            log_event(logger, logging.WARNING, 'sql.not_select', sql=final_sql)
+            return {"text": "Sorry, I could not generate a valid SELECT SQL query for your question.", "sql": None, "cached": False}
+
+        response, succeeded = answer_with_sql(user_question, final_sql, session_id)
+        # Only cache SQL that actually ran, a broken query should get a fresh attempt
+        if succeeded:
+            question_cache.put(user_question, 'sql', final_sql)
     else:
         # Handle as conversational response
-        print(f"[DEBUG] Conversational response: {gemini_response}")
-        return {"text": gemini_response, "sql": None}
+        log_event(logger, logging.DEBUG, 'gemini.conversational')
+        response = {"text": gemini_response, "sql": None}
+        question_cache.put(user_question, 'text', gemini_response)
+
+    fast_path_router.record_slow_path((time.perf_counter() - started) * 1000)
+    response['cached'] = False
+    return response
+
+# Result rows per `rows` event on /ask/stream
+STREAM_ROW_BATCH = int(os.environ.get("STREAM_ROW_BATCH", 20))
+
+def stream_sql_answer(user_question, final_sql, session_id=None):
+    """Events for a validated SELECT: sql, columns, rows (batched), answer; returns success"""
+    yield 'sql', issued_sql(final_sql)
+
+    result = fetch_sql_result(final_sql, batch_size=STREAM_ROW_BATCH)
+    if isinstance(result, str):
+        yield 'answer', {'text': result}
+        return False
+
+    # Rows go out batch by batch as the cursor delivers them; only the
+    # preview the answer is phrased from is kept
+    yield 'columns', {'columns': result.columns}
+    keep = session_cache.max_rows if session_id else ANSWER_PREVIEW_ROWS
+    kept = []
+    try:
+        with result:
+            for batch in result.iter_batches():
+                if len(kept) < keep:
+                    kept.extend(batch[:keep - len(kept)])
+                yield 'rows', {'rows': batch}
+    except Exception as e:
+        yield 'answer', {'text': sql_error_message(e)}
+        return False
+
+    if session_id:
+        session_cache.put(session_id, user_question, final_sql, result.columns, kept,
+                          complete=result_is_complete(final_sql, result.rows_read) and result.rows_read == len(kept))
+    preview = kept[:ANSWER_PREVIEW_ROWS]
+    text = format_natural_response(result.columns, preview, user_question, result.rows_read) if preview else "No results found."
+    yield 'answer', {'text': text}
+    return True
+
+def stream_chat(user_question, session_id=None):
+    """Streaming variant of chat_with_db_gemini, yielding (event, data) pairs"""
+    followup = session_answer(user_question, session_id)
+    if followup is not None:
+        kind, columns, rows, text = followup
+        yield 'meta', {'cached': False, 'followup': kind}
+        yield 'columns', {'columns': columns}
+        if rows:
+            yield 'rows', {'rows': rows}
+        yield 'answer', {'text': text}
+        return
+
+    fast = fast_path_answer(user_question)
+    if fast is not None:
+        name, columns, rows, text = fast
+        yield 'meta', {'cached': False, 'fast_path': name}
+        yield 'columns', {'columns': columns}
+        if rows:
+            yield 'rows', {'rows': rows}
+        yield 'answer', {'text': text}
+        return
+
+    with span('question_cache'):
+        cached = question_cache.get(user_question)
+    yield 'meta', {'cached': cached is not None}
+    if cached is not None:
+        kind, payload = cached
+        if kind == 'sql':
+            # Events are already out, so a failure only keeps the next ask from reusing it
+            if not (yield from stream_sql_answer(user_question, payload, session_id)):
+                question_cache.evict(user_question)
+        else:
+            yield 'token', {'text': payload}
+            yield 'answer', {'text': payload}
+        return
+
+    # Conversational text is forwarded as it arrives. A reply starting with
+    # SELECT is held back until complete, it has to be validated before use.
+    reply = ""
+    mode = None
+    with span('gemini'):
+        try:
+            for piece in gemini_caller.stream(stream_from_gemini, user_question,
+                                              first_chunk=GEMINI_FIRST_TOKEN_SECONDS,
+                                              between_chunks=GEMINI_CHUNK_GAP_SECONDS):
+                reply += piece
+                if mode == 'text':
+                    yield 'token', {'text': piece}
+                elif mode is None:
+                    head = reply.lstrip().upper()
+                    if head.startswith('SELECT'):
+                        mode = 'sql'
+                    elif head and not 'SELECT'.startswith(head):
+                        mode = 'text'
+                        yield 'token', {'text': reply.lstrip()}
+        except ModelUnavailable as e:
+            log_event(logger, logging.WARNING, 'gemini.unavailable', error=str(e))
+            if mode == 'text':
+                # Part of the reply is already out, end it with an error event
+                raise
+            yield 'answer', {'text': GEMINI_UNAVAILABLE_TEXT, 'degraded': True}
+            return
+
+    reply = reply.strip()
+    if mode == 'sql' and is_sql_response(reply):
+        final_sql = clean_sql(reply)
+        if not is_safe_select(final_sql):
+            yield 'answer', {'text': "Sorry, I could not generate a valid SELECT SQL query for your question."}
+            return
+        if (yield from stream_sql_answer(user_question, final_sql, session_id)):
+            question_cache.put(user_question, 'sql', final_sql)
+        return
+
+    if mode != 'text':
+        # Very short reply, or one that only looked like SQL
+        yield 'token', {'text': reply}
+    question_cache.put(user_question, 'text', reply)
+    yield 'answer', {'text': reply}
 
 # Analytics API Endpoints
 
-def convert_decimals_to_float(obj):
-    """Recursively convert Decimal objects to float for JSON serialization"""
-    if isinstance(obj, list):
-        return [convert_decimals_to_float(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_decimals_to_float(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
+# Serve sales trend, top products and categories from the daily rollup tables
+# (maintained by `python rollups.py refresh`) instead of the raw order tables
+ANALYTICS_USE_ROLLUPS = os.environ.get("ANALYTICS_USE_ROLLUPS", "0") in ("1", "true", "True")
+
+WATERMARK_QUERY = build_watermark_query(
+    dict(WATERMARK_PROBES, rollups=rollups.WATERMARK_PROBE) if ANALYTICS_USE_ROLLUPS else WATERMARK_PROBES
+)
+
+def probe_watermarks():
+    """Cheap MAX() probes telling the analytics cache whether source tables changed"""
+    try:
+        with span('cache.watermarks'):
+            rows = execute_query(WATERMARK_QUERY)
+    except Exception:
+        return None
+    return rows[0] if rows else None
+
+analytics_cache = AnalyticsCache(
+    probe_watermarks,
+    ttl=float(os.environ.get("ANALYTICS_CACHE_TTL", 60)),
+    max_entries=int(os.environ.get("ANALYTICS_CACHE_SIZE", 256))
+)
+
+# "columnar" answers sales trend, order status, top products and categories
+# from memory-mapped column snapshots (columnar.py); SQL stays the fallback
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "sql")
+
+def orders_watermark():
+    marks = analytics_cache.watermarks()
+    return marks.get('orders') if marks else None
+
+columnar_engine = None
+if ANALYTICS_ENGINE == 'columnar':
+    columnar_engine = ColumnarEngine(
+        ColumnStore(COLUMNAR_DIR),
+        lambda: get_pool().connection(),
+        watermark=orders_watermark,
+        interval=float(os.environ.get("COLUMNAR_REFRESH_SECONDS", 30)),
+        lookback_days=COLUMNAR_LOOKBACK_DAYS,
+    ).start()
+
+def from_columnar(query, *args):
+    """Answer from the column snapshot, or None to run the SQL instead"""
+    if columnar_engine is None:
+        return None
+    return columnar_engine.query(query, *args)
+
+# Section name -> the tables it is computed from, filled in by @cached_section
+SECTION_SOURCES = {}
+
+def cached_section(name, sources, daily=False):
+    """Cache a fetch_* section until one of its `sources` tables changes.
+
+    `daily` sections use CURDATE() windows, so their key also includes today's date.
+    """
+    SECTION_SOURCES[name] = sources
+
+    def decorator(fetch):
+        @functools.wraps(fetch)
+        def wrapper(*args):
+            key = (name, args, date.today().isoformat() if daily else None)
+            with span(f'section.{name}'):
+                return analytics_cache.get_or_compute(key, sources, lambda: fetch(*args))
+        wrapper.section = name
+        return wrapper
+    return decorator
+
+# One round trip for every overview KPI: each table is scanned once and the
+# month windows / cancelled filters become conditional aggregates.
+OVERVIEW_QUERY = """
+    SELECT u.*, o.*, p.*
+    FROM (
+        SELECT
+            COUNT(*) as total_users,
+            COUNT(CASE WHEN created_at >= DATE_FORMAT(CURDATE(), '%Y-%m-01') THEN 1 END) as users_this_month,
+            COUNT(CASE WHEN created_at >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+                        AND created_at < DATE_FORMAT(CURDATE(), '%Y-%m-01') THEN 1 END) as users_last_month
+        FROM users
+    ) u
+    CROSS JOIN (
+        SELECT
+            COUNT(*) as total_orders,
+            COUNT(CASE WHEN order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01') THEN 1 END) as orders_this_month,
+            COUNT(CASE WHEN order_date >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+                        AND order_date < DATE_FORMAT(CURDATE(), '%Y-%m-01') THEN 1 END) as orders_last_month,
+            SUM(CASE WHEN status != 'Cancelled' THEN total_amount END) as total_revenue,
+            SUM(CASE WHEN order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
+                      AND status != 'Cancelled' THEN total_amount END) as revenue_this_month,
+            SUM(CASE WHEN order_date >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+                      AND order_date < DATE_FORMAT(CURDATE(), '%Y-%m-01')
+                      AND status != 'Cancelled' THEN total_amount END) as revenue_last_month,
+            AVG(CASE WHEN status != 'Cancelled' THEN total_amount END) as avg_order_value
+        FROM orders
+    ) o
+    CROSS JOIN (
+        SELECT COUNT(*) as total_products FROM products
+    ) p
+"""
+
+def calculate_growth(current, previous):
+    """Month-over-month growth in percent (0 when last month had nothing)"""
+    return ((current - previous) / max(previous, 1)) * 100 if previous > 0 else 0
+
+def build_overview_stats(row):
+    """Turn the OVERVIEW_QUERY row into the overview payload"""
+    total_revenue = row['total_revenue'] or 0
+    revenue_this_month = row['revenue_this_month'] or 0
+    revenue_last_month = row['revenue_last_month'] or 0
+    avg_order_value = row['avg_order_value'] or 0
+
+    return {
+        'total_users': row['total_users'],
+        'user_growth': round(calculate_growth(row['users_this_month'], row['users_last_month']), 1),
+        'total_orders': row['total_orders'],
+        'order_growth': round(calculate_growth(row['orders_this_month'], row['orders_last_month']), 1),
+        'total_revenue': float(total_revenue),
+        'revenue_growth': round(calculate_growth(revenue_this_month, revenue_last_month), 1),
+        'total_products': row['total_products'],
+        'avg_order_value': float(avg_order_value)
+    }
+
+@cached_section('overview', ('users', 'orders', 'products'), daily=True)
+def fetch_overview_stats():
+    """Key metrics for dashboard overview"""
+    return build_overview_stats(execute_query(OVERVIEW_QUERY)[0])
+
+SALES_TREND_DAYS = 30
+SALES_TREND_PAGE_LIMIT = 366
+
+SALES_TREND_QUERY = """
+    SELECT 
+        DATE(order_date) as date,
+        COUNT(*) as orders,
+        SUM(total_amount) as revenue
+    FROM orders 
+    WHERE order_date >= %s
+    AND order_date < %s
+    AND status != 'Cancelled'
+    GROUP BY DATE(order_date)
+    ORDER BY date
+    LIMIT %s
+"""
+
+@cached_section('sales_trend', ('orders', 'rollups'), daily=True)
+def fetch_sales_trend_page(page):
+    """Daily orders and revenue from page.start to page.end (default: the last 30 days)"""
+    start = page.start or date.today() - timedelta(days=SALES_TREND_DAYS)
+    end = page.end or date.today()
+    if page.cursor is not None:
+        # The sort key is the day itself, so the next page simply starts after the last day served
+        try:
+            start = max(start, date.fromisoformat(page.cursor[0]) + timedelta(days=1))
+        except (TypeError, ValueError):
+            raise PageArgError("Invalid cursor")
+    rows = from_columnar('sales_trend', start, end + timedelta(days=1), page.limit + 1)
+    if rows is None:
+        query = rollups.SALES_TREND_QUERY if ANALYTICS_USE_ROLLUPS else SALES_TREND_QUERY
+        rows = execute_query(query, (start, end + timedelta(days=1), page.limit + 1))
+    return split_page(rows, page.limit, lambda row: [row['date']])
+
+def fetch_sales_trend():
+    """Sales trend for the last 30 days"""
+    return fetch_sales_trend_page(PageArgs(SALES_TREND_PAGE_LIMIT, None, None, None))[0]
+
+@cached_section('order_status', ('orders',))
+def fetch_order_status_distribution():
+    """Order status distribution"""
+    rows = from_columnar('order_status')
+    if rows is not None:
+        return rows
+    return execute_query("""
+        SELECT 
+            status,
+            COUNT(*) as count,
+            SUM(total_amount) as revenue
+        FROM orders 
+        GROUP BY status
+        ORDER BY count DESC
+    """)
+
+TOP_PRODUCTS_QUERY = """
+    SELECT 
+        p.product_id,
+        p.name,
+        p.brand,
+        SUM(oi.quantity) as total_sold,
+        SUM(oi.quantity * oi.price) as revenue
+    FROM products p
+    JOIN product_variants pv ON p.product_id = pv.product_id
+    JOIN order_items oi ON pv.variant_id = oi.variant_id
+    JOIN orders o ON oi.order_id = o.order_id
+    {where}
+    GROUP BY p.product_id, p.name, p.brand
+    {having}
+    ORDER BY total_sold DESC, p.product_id DESC
+    LIMIT %s
+"""
+
+@cached_section('top_products', ('orders', 'order_items', 'product_variants', 'products', 'rollups'))
+def fetch_top_products_page(page):
+    """Best sellers by units sold, optionally limited to orders placed from page.start to page.end"""
+    rows = from_columnar('top_products', page.start, page.end and page.end + timedelta(days=1),
+                         page.cursor, page.limit + 1)
+    if rows is not None:
+        return split_page(rows, page.limit, lambda row: [row['total_sold'], row['product_id']])
+    if ANALYTICS_USE_ROLLUPS:
+        template = rollups.TOP_PRODUCTS_QUERY
+        conditions, params = date_range_conditions('r.day', page.start, page.end)
     else:
-        return obj
+        template = TOP_PRODUCTS_QUERY
+        conditions, params = date_range_conditions('o.order_date', page.start, page.end)
+        conditions.insert(0, "o.status != 'Cancelled'")
+    having, having_params = keyset_condition(['total_sold', 'p.product_id'], page.cursor)
+    query = template.format(where=where_clause(conditions), having=f"HAVING {having}" if having else "")
+    rows = execute_query(query, tuple(params + having_params + [page.limit + 1]))
+    return split_page(rows, page.limit, lambda row: [row['total_sold'], row['product_id']])
 
-@app.route('/api/analytics/overview', methods=['GET'])
-def get_overview_stats():
-    """Get key metrics for dashboard overview"""
+def fetch_top_products():
+    """Top selling products"""
+    return fetch_top_products_page(PageArgs(10, None, None, None))[0]
+
+@cached_section('categories', ('orders', 'order_items', 'product_variants', 'products', 'categories', 'rollups'))
+def fetch_category_performance():
+    """Category performance data"""
+    rows = from_columnar('category_performance')
+    if rows is not None:
+        return rows
+    if ANALYTICS_USE_ROLLUPS:
+        return execute_query(rollups.CATEGORY_PERFORMANCE_QUERY)
+    return execute_query("""
+        SELECT 
+            c.name as category,
+            COUNT(DISTINCT p.product_id) as product_count,
+            COALESCE(SUM(oi.quantity), 0) as total_sold,
+            COALESCE(SUM(oi.quantity * oi.price), 0) as revenue
+        FROM categories c
+        LEFT JOIN products p ON c.category_id = p.category_id
+        LEFT JOIN product_variants pv ON p.product_id = pv.product_id
+        LEFT JOIN order_items oi ON pv.variant_id = oi.variant_id
+        LEFT JOIN orders o ON oi.order_id = o.order_id AND o.status != 'Cancelled'
+        GROUP BY c.category_id, c.name
+        ORDER BY revenue DESC
+    """)
+
+TOP_CUSTOMERS_QUERY = """
+    SELECT 
+        u.user_id,
+        u.name,
+        u.email,
+        COUNT(o.order_id) as total_orders,
+        SUM(o.total_amount) as total_spent
+    FROM users u
+    JOIN orders o ON u.user_id = o.user_id
+    {where}
+    GROUP BY u.user_id, u.name, u.email
+    {having}
+    ORDER BY total_spent DESC, u.user_id DESC
+    LIMIT %s
+"""
+
+# mysql-connector only substitutes %s placeholders; a literal % needs no escaping
+CUSTOMER_ACQUISITION_QUERY = """
+    SELECT 
+        DATE_FORMAT(created_at, '%Y-%m') as month,
+        COUNT(*) as new_customers
+    FROM users
+    WHERE created_at >= %s
+    AND created_at < %s
+    GROUP BY DATE_FORMAT(created_at, '%Y-%m')
+    ORDER BY month
+"""
+
+def months_ago(day, months):
+    """Same day `months` earlier, clamped to the length of that month (like INTERVAL n MONTH)"""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+@cached_section('customer_insights', ('users', 'orders'), daily=True)
+def fetch_customer_insights_page(page):
+    """Customer behavior insights; top customers page by total spent"""
+    # Top customers by revenue
+    conditions, params = date_range_conditions('o.order_date', page.start, page.end)
+    having, having_params = keyset_condition(['total_spent', 'u.user_id'], page.cursor)
+    query = TOP_CUSTOMERS_QUERY.format(
+        where=where_clause(["o.status != 'Cancelled'"] + conditions),
+        having=f"HAVING {having}" if having else ""
+    )
+    top_customers, next_cursor = split_page(
+        execute_query(query, tuple(params + having_params + [page.limit + 1])),
+        page.limit,
+        lambda row: [row['total_spent'], row['user_id']]
+    )
+
+    # Customer acquisition by month (default: the last 12 months)
+    start = page.start or months_ago(date.today(), 12)
+    end = page.end or date.today()
+    customer_acquisition = execute_query(CUSTOMER_ACQUISITION_QUERY, (start, end + timedelta(days=1)))
+
+    return {
+        'top_customers': top_customers,
+        'customer_acquisition': customer_acquisition
+    }, next_cursor
+
+def fetch_customer_insights():
+    """Customer behavior insights"""
+    return fetch_customer_insights_page(PageArgs(10, None, None, None))[0]
+
+LOW_STOCK_THRESHOLD = 10
+
+LOW_STOCK_QUERY = """
+    SELECT 
+        p.name as product_name,
+        pv.color,
+        pv.size,
+        pv.sku,
+        i.variant_id,
+        i.quantity
+    FROM inventory i
+    JOIN product_variants pv ON pv.variant_id = i.variant_id
+    JOIN products p ON p.product_id = pv.product_id
+    WHERE i.quantity < %s
+    {keyset}
+    ORDER BY i.quantity ASC, i.variant_id ASC
+    LIMIT %s
+"""
+
+INVENTORY_SUMMARY_QUERY = """
+    SELECT 
+        COUNT(*) as total_variants,
+        SUM(i.quantity) as total_stock,
+        AVG(i.quantity) as avg_stock,
+        COUNT(CASE WHEN i.quantity = 0 THEN 1 END) as out_of_stock,
+        COUNT(CASE WHEN i.quantity < 10 THEN 1 END) as low_stock
+    FROM inventory i
+"""
+
+def query_low_stock(page, threshold=LOW_STOCK_THRESHOLD):
+    """One page of variants below `threshold`, lowest stock first; returns (rows, next_cursor)"""
+    keyset, params = keyset_condition(['i.quantity', 'i.variant_id'], page.cursor, descending=False)
+    query = LOW_STOCK_QUERY.format(keyset=f"AND {keyset}" if keyset else "")
+    rows = execute_query(query, tuple([threshold] + params + [page.limit + 1]))
+    return split_page(rows, page.limit, lambda row: [row['quantity'], row['variant_id']])
+
+@cached_section('inventory', ('inventory', 'product_variants', 'products'))
+def fetch_inventory_status_page(page):
+    """Inventory status; low stock alerts page by stock level"""
+    low_stock, next_cursor = query_low_stock(page)
+    return {
+        'low_stock_items': low_stock,
+        'summary': execute_query(INVENTORY_SUMMARY_QUERY)[0]
+    }, next_cursor
+
+def fetch_inventory_status():
+    """Inventory status and low stock alerts"""
+    return fetch_inventory_status_page(PageArgs(20, None, None, None))[0]
+
+PRODUCT_RATINGS_QUERY = """
+    SELECT 
+        p.product_id,
+        p.name,
+        AVG(r.rating) as avg_rating,
+        COUNT(r.review_id) as review_count
+    FROM products p
+    JOIN reviews r ON p.product_id = r.product_id
+    {where}
+    GROUP BY p.product_id, p.name
+    {having}
+    ORDER BY avg_rating DESC, review_count DESC, p.product_id DESC
+    LIMIT %s
+"""
+
+RATING_DISTRIBUTION_QUERY = """
+    SELECT 
+        rating,
+        COUNT(*) as count
+    FROM reviews
+    {where}
+    GROUP BY rating
+    ORDER BY rating DESC
+"""
+
+@cached_section('reviews', ('reviews', 'products'))
+def fetch_review_analytics_page(page):
+    """Review and rating analytics; product ratings page by average rating"""
+    # Average rating by product
+    conditions, params = date_range_conditions('r.created_at', page.start, page.end)
+    having, having_params = keyset_condition(['avg_rating', 'review_count', 'p.product_id'], page.cursor)
+    query = PRODUCT_RATINGS_QUERY.format(where=where_clause(conditions), having=f"HAVING {having}" if having else "")
+    product_ratings, next_cursor = split_page(
+        execute_query(query, tuple(params + having_params + [page.limit + 1])),
+        page.limit,
+        lambda row: [row['avg_rating'], row['review_count'], row['product_id']]
+    )
+
+    # Rating distribution
+    conditions, params = date_range_conditions('created_at', page.start, page.end)
+    rating_distribution = execute_query(RATING_DISTRIBUTION_QUERY.format(where=where_clause(conditions)), tuple(params))
+
+    return {
+        'product_ratings': product_ratings,
+        'rating_distribution': rating_distribution
+    }, next_cursor
+
+def fetch_review_analytics():
+    """Review and rating analytics"""
+    return fetch_review_analytics_page(PageArgs(10, None, None, None))[0]
+
+# Conditional GET: analytics responses carry an ETag derived from the
+# watermarks of their source tables, so a client holding the current data
+# gets a 304 for the cost of the watermark probe instead of the section queries
+ANALYTICS_ETAGS = os.environ.get("ANALYTICS_ETAGS", "1") in ("1", "true", "True")
+NOT_MODIFIED = metrics.REGISTRY.counter('app_not_modified_total', "Conditional GETs answered with 304",
+                                        ['endpoint'])
+
+def section_etag(names):
+    """Weak ETag of the current request for sections `names`, or None when it cannot be trusted.
+
+    Besides the watermarks it covers the query string, today's date (CURDATE()
+    windows) and the analytics cache TTL period, so in-place updates the
+    watermarks cannot see are picked up as soon as the cache would pick them up.
+    """
+    if not ANALYTICS_ETAGS or not analytics_cache.ttl:
+        return None
     try:
-        # Total users
-        total_users = execute_query("SELECT COUNT(*) as count FROM users")[0]['count']
-        
-        # Users this month vs last month
-        this_month = execute_query("""
-            SELECT COUNT(*) as count FROM users 
-            WHERE created_at >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-        """)[0]['count']
-        
-        last_month = execute_query("""
-            SELECT COUNT(*) as count FROM users 
-            WHERE created_at >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
-            AND created_at < DATE_FORMAT(CURDATE(), '%Y-%m-01')
-        """)[0]['count']
-        
-        user_growth = ((this_month - last_month) / max(last_month, 1)) * 100 if last_month > 0 else 0
-        
-        # Total orders
-        total_orders = execute_query("SELECT COUNT(*) as count FROM orders")[0]['count']
-        
-        # Orders this month vs last month
-        orders_this_month = execute_query("""
-            SELECT COUNT(*) as count FROM orders 
-            WHERE order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-        """)[0]['count']
-        
-        orders_last_month = execute_query("""
-            SELECT COUNT(*) as count FROM orders 
-            WHERE order_date >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
-            AND order_date < DATE_FORMAT(CURDATE(), '%Y-%m-01')
-        """)[0]['count']
-        
-        order_growth = ((orders_this_month - orders_last_month) / max(orders_last_month, 1)) * 100 if orders_last_month > 0 else 0
-        
-        # Total revenue
-        total_revenue = execute_query("SELECT SUM(total_amount) as total FROM orders WHERE status != 'Cancelled'")[0]['total'] or 0
-        
-        # Revenue this month vs last month
-        revenue_this_month = execute_query("""
-            SELECT SUM(total_amount) as total FROM orders 
-            WHERE order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-            AND status != 'Cancelled'
-        """)[0]['total'] or 0
-        
-        revenue_last_month = execute_query("""
-            SELECT SUM(total_amount) as total FROM orders 
-            WHERE order_date >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
-            AND order_date < DATE_FORMAT(CURDATE(), '%Y-%m-01')
-            AND status != 'Cancelled'
-        """)[0]['total'] or 0
-        
-        revenue_growth = ((revenue_this_month - revenue_last_month) / max(revenue_last_month, 1)) * 100 if revenue_last_month > 0 else 0
-        
-        # Total products
-        total_products = execute_query("SELECT COUNT(*) as count FROM products")[0]['count']
-        
-        # Average order value
-        avg_order_value = execute_query("""
-            SELECT AVG(total_amount) as avg_value FROM orders 
-            WHERE status != 'Cancelled'
-        """)[0]['avg_value'] or 0
-        
-        data = {
-            'total_users': total_users,
-            'user_growth': round(user_growth, 1),
-            'total_orders': total_orders,
-            'order_growth': round(order_growth, 1),
-            'total_revenue': float(total_revenue),
-            'revenue_growth': round(revenue_growth, 1),
-            'total_products': total_products,
-            'avg_order_value': float(avg_order_value)
-        }
-        
+        marks = analytics_cache.watermarks()
+    except Exception:
+        return None   # the section itself reports the database error
+    if marks is None:
+        return None
+    key = json_dumps([
+        request.full_path,
+        ANALYTICS_ENGINE,
+        date.today().isoformat(),
+        int(time.time() // analytics_cache.ttl),
+        [[marks.get(table) for table in SECTION_SOURCES[name]] for name in names],
+    ])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+
+def conditional_response(names, build):
+    """304 when If-None-Match holds the current ETag of `names`, else build() tagged with it"""
+    etag = section_etag(names)
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        NOT_MODIFIED.inc((request.url_rule.rule,))
+        response = Response(status=304)
+    else:
+        response = app.make_response(build())
+        if etag is None or response.status_code != 200 or 'no-store' in response.headers.get('Cache-Control', ''):
+            return response
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def analytics_response(fetch):
+    """Run one analytics section and wrap it in the standard JSON envelope"""
+    def build():
+        try:
+            return jsonify({
+                'success': True,
+                'data': fetch()
+            })
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    return conditional_response([fetch.section], build)
+
+def paged_analytics_response(fetch_page, default_limit, cursor_size, dates=True):
+    """Like analytics_response for a section paged by `limit` / `cursor` (and `from` / `to`)"""
+    def build():
+        try:
+            page = parse_page_args(request.args, default_limit, cursor_size, dates=dates)
+            data, next_cursor = fetch_page(page)
+        except PageArgError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
         return jsonify({
             'success': True,
-            'data': convert_decimals_to_float(data)
+            'data': data,
+            'next_cursor': next_cursor
         })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return conditional_response([fetch_page.section], build)
+
+@app.route('/api/analytics/overview', methods=['GET'])
+def get_overview_stats():
+    """Get key metrics for dashboard overview"""
+    return analytics_response(fetch_overview_stats)
 
 @app.route('/api/analytics/sales-trend', methods=['GET'])
 def get_sales_trend():
-    """Get sales trend for the last 30 days"""
-    try:
-        sales_data = execute_query("""
-            SELECT 
-                DATE(order_date) as date,
-                COUNT(*) as orders,
-                SUM(total_amount) as revenue
-            FROM orders 
-            WHERE order_date >= CURDATE() - INTERVAL 30 DAY
-            AND status != 'Cancelled'
-            GROUP BY DATE(order_date)
-            ORDER BY date
-        """)
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(sales_data)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    """Get daily sales between ?from= and ?to= (default: the last 30 days)"""
+    return paged_analytics_response(fetch_sales_trend_page, SALES_TREND_PAGE_LIMIT, 1)
 
 @app.route('/api/analytics/order-status', methods=['GET'])
 def get_order_status_distribution():
     """Get order status distribution"""
-    try:
-        status_data = execute_query("""
-            SELECT 
-                status,
-                COUNT(*) as count,
-                SUM(total_amount) as revenue
-            FROM orders 
-            GROUP BY status
-            ORDER BY count DESC
-        """)
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(status_data)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return analytics_response(fetch_order_status_distribution)
 
 @app.route('/api/analytics/top-products', methods=['GET'])
 def get_top_products():
-    """Get top selling products"""
-    try:
-        top_products = execute_query("""
-            SELECT 
-                p.name,
-                p.brand,
-                SUM(oi.quantity) as total_sold,
-                SUM(oi.quantity * oi.price) as revenue
-            FROM products p
-            JOIN product_variants pv ON p.product_id = pv.product_id
-            JOIN order_items oi ON pv.variant_id = oi.variant_id
-            JOIN orders o ON oi.order_id = o.order_id
-            WHERE o.status != 'Cancelled'
-            GROUP BY p.product_id, p.name, p.brand
-            ORDER BY total_sold DESC
-            LIMIT 10
-        """)
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(top_products)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    """Get top selling products (?limit=, ?cursor=, ?from=, ?to=)"""
+    return paged_analytics_response(fetch_top_products_page, 10, 2)
 
 @app.route('/api/analytics/categories', methods=['GET'])
 def get_category_performance():
     """Get category performance data"""
-    try:
-        category_data = execute_query("""
-            SELECT 
-                c.name as category,
-                COUNT(DISTINCT p.product_id) as product_count,
-                COALESCE(SUM(oi.quantity), 0) as total_sold,
-                COALESCE(SUM(oi.quantity * oi.price), 0) as revenue
-            FROM categories c
-            LEFT JOIN products p ON c.category_id = p.category_id
-            LEFT JOIN product_variants pv ON p.product_id = pv.product_id
-            LEFT JOIN order_items oi ON pv.variant_id = oi.variant_id
-            LEFT JOIN orders o ON oi.order_id = o.order_id AND o.status != 'Cancelled'
-            GROUP BY c.category_id, c.name
-            ORDER BY revenue DESC
-        """)
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(category_data)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return analytics_response(fetch_category_performance)
 
 @app.route('/api/analytics/customer-insights', methods=['GET'])
 def get_customer_insights():
-    """Get customer behavior insights"""
-    try:
-        # Top customers by revenue
-        top_customers = execute_query("""
-            SELECT 
-                u.name,
-                u.email,
-                COUNT(o.order_id) as total_orders,
-                SUM(o.total_amount) as total_spent
-            FROM users u
-            JOIN orders o ON u.user_id = o.user_id
-            WHERE o.status != 'Cancelled'
-            GROUP BY u.user_id, u.name, u.email
-            ORDER BY total_spent DESC
-            LIMIT 10
-        """)
-        
-        # Customer acquisition by month
-        customer_acquisition = execute_query("""
-            SELECT 
-                DATE_FORMAT(created_at, '%Y-%m') as month,
-                COUNT(*) as new_customers
-            FROM users
-            WHERE created_at >= CURDATE() - INTERVAL 12 MONTH
-            GROUP BY DATE_FORMAT(created_at, '%Y-%m')
-            ORDER BY month
-        """)
-        
-        data = {
-            'top_customers': top_customers,
-            'customer_acquisition': customer_acquisition
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(data)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    """Get customer behavior insights (top customers paged by ?limit= / ?cursor=)"""
+    return paged_analytics_response(fetch_customer_insights_page, 10, 2)
 
 @app.route('/api/analytics/inventory', methods=['GET'])
 def get_inventory_status():
-    """Get inventory status and low stock alerts"""
-    try:
-        low_stock = execute_query("""
-            SELECT 
-                p.name as product_name,
-                pv.color,
-                pv.size,
-                pv.sku,
-                i.quantity
-            FROM products p
-            JOIN product_variants pv ON p.product_id = pv.product_id
-            JOIN inventory i ON pv.variant_id = i.variant_id
-            WHERE i.quantity < 10
-            ORDER BY i.quantity ASC
-            LIMIT 20
-        """)
-        
-        # Inventory summary
-        inventory_summary = execute_query("""
-            SELECT 
-                COUNT(*) as total_variants,
-                SUM(i.quantity) as total_stock,
-                AVG(i.quantity) as avg_stock,
-                COUNT(CASE WHEN i.quantity = 0 THEN 1 END) as out_of_stock,
-                COUNT(CASE WHEN i.quantity < 10 THEN 1 END) as low_stock
-            FROM inventory i
-        """)[0]
-        
-        data = {
-            'low_stock_items': low_stock,
-            'summary': inventory_summary
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(data)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    """Get inventory status and low stock alerts (paged by ?limit= / ?cursor=)"""
+    return paged_analytics_response(fetch_inventory_status_page, 20, 2, dates=False)
 
 @app.route('/api/analytics/reviews', methods=['GET'])
 def get_review_analytics():
-    """Get review and rating analytics"""
+    """Get review and rating analytics (product ratings paged by ?limit= / ?cursor=)"""
+    return paged_analytics_response(fetch_review_analytics_page, 10, 3)
+
+# Sections served by the combined dashboard endpoint, in display order
+DASHBOARD_SECTIONS = {
+    'overview': fetch_overview_stats,
+    'sales_trend': fetch_sales_trend,
+    'order_status': fetch_order_status_distribution,
+    'top_products': fetch_top_products,
+    'categories': fetch_category_performance,
+    'inventory': fetch_inventory_status,
+}
+
+# Bounded fan-out; keep it at or below DB_POOL_SIZE so sections never queue on the pool
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", len(DASHBOARD_SECTIONS)))
+dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+def run_timed(fetch):
+    """Run a section fetcher, returning (data, error, elapsed_ms) instead of raising"""
+    started = time.perf_counter()
     try:
-        # Average rating by product
-        product_ratings = execute_query("""
-            SELECT 
-                p.name,
-                AVG(r.rating) as avg_rating,
-                COUNT(r.review_id) as review_count
-            FROM products p
-            LEFT JOIN reviews r ON p.product_id = r.product_id
-            GROUP BY p.product_id, p.name
-            HAVING review_count > 0
-            ORDER BY avg_rating DESC, review_count DESC
-            LIMIT 10
-        """)
-        
-        # Rating distribution
-        rating_distribution = execute_query("""
-            SELECT 
-                rating,
-                COUNT(*) as count
-            FROM reviews
-            GROUP BY rating
-            ORDER BY rating DESC
-        """)
-        
-        data = {
-            'product_ratings': product_ratings,
-            'rating_distribution': rating_distribution
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': convert_decimals_to_float(data)
-        })
+        data, error = fetch(), None
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        data, error = None, str(e)
+    return data, error, round((time.perf_counter() - started) * 1000, 2)
+
+@app.route('/api/analytics/dashboard', methods=['GET'])
+def get_dashboard():
+    """Get every dashboard section in one response, queried concurrently"""
+    requested = request.args.get('sections')
+    names = requested.split(',') if requested else list(DASHBOARD_SECTIONS)
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    return conditional_response(names, lambda: build_dashboard(names))
+
+def build_dashboard(names):
+    """Query `names` concurrently into the combined dashboard payload"""
+    started = time.perf_counter()
+    # Each section runs in a copy of this request's context so its spans join the request trace
+    futures = {
+        name: dashboard_executor.submit(contextvars.copy_context().run, run_timed, DASHBOARD_SECTIONS[name])
+        for name in names
+    }
+
+    data, errors, timings = {}, {}, {}
+    for name, future in futures.items():
+        section_data, error, elapsed_ms = future.result()
+        timings[name] = elapsed_ms
+        if error is None:
+            data[name] = section_data
+        else:
+            errors[name] = error
+    timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+
+    body = {
+        'success': not errors,
+        'partial': bool(errors) and bool(data),
+        'data': data,
+        'errors': errors,
+        'timings_ms': timings
+    }
+    if errors:
+        # A partial dashboard must not be revalidated into a 304 once the section recovers
+        return jsonify(body), (500 if not data else 200), {'Cache-Control': 'no-store'}
+    return jsonify(body)
+
+# Push channel: one producer recomputes sections whose watermarks moved and
+# streams them to every open dashboard
+live_dashboard = LiveDashboard(
+    {name: (fetch, SECTION_SOURCES[name]) for name, fetch in DASHBOARD_SECTIONS.items()},
+    analytics_cache.watermarks,
+    interval=float(os.environ.get("LIVE_DASHBOARD_INTERVAL", 2)),
+    max_age=float(os.environ.get("LIVE_DASHBOARD_MAX_AGE", 60)),
+    keepalive=float(os.environ.get("LIVE_DASHBOARD_KEEPALIVE", 15)),
+)
+
+@app.route('/api/analytics/live', methods=['GET'])
+def get_live_dashboard():
+    """Server-Sent Events: a snapshot of the dashboard sections, then each section as it changes"""
+    requested = request.args.get('sections')
+    names = requested.split(',') if requested else list(DASHBOARD_SECTIONS)
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    live_dashboard.start()
+
+    def generate():
+        for event, payload in live_dashboard.events(names):
+            yield ": keepalive\n\n" if event is None else sse_event(event, payload)
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Fast path: questions the analytics sections already answer skip Gemini
+
+def overview_answer(key, column):
+    """Answer with one figure from the cached overview section"""
+    def answer():
+        return [column], [[fetch_overview_stats()[key]]]
+    return answer
+
+def answer_top_products(n='10'):
+    page = PageArgs(max(1, min(int(n), 100)), None, None, None)
+    rows, _ = fetch_top_products_page(page)
+    return ['name', 'total_sold'], [[row['name'], int(row['total_sold'] or 0)] for row in rows]
+
+def answer_low_stock(threshold=str(LOW_STOCK_THRESHOLD)):
+    threshold = int(threshold)
+    if threshold == LOW_STOCK_THRESHOLD:
+        rows = fetch_inventory_status()['low_stock_items']
+    else:
+        rows, _ = query_low_stock(PageArgs(20, None, None, None), threshold)
+    return ['product_name', 'quantity'], [[row['product_name'], row['quantity']] for row in rows]
+
+def answer_orders_by_status():
+    return ['status', 'orders'], [[row['status'], row['count']] for row in fetch_order_status_distribution()]
+
+fast_path_router = FastPathRouter([
+    intent('total_revenue', [
+        r"(?:total |overall )?(?:revenue|sales)(?: so far| to date)?",
+        r"(?:sum|total) of (?:all )?(?:orders?|order amounts?|sales)",
+        r"total order (?:amounts?|values?)",
+    ], overview_answer('total_revenue', 'total_revenue')),
+    intent('order_count', [
+        r"how many orders(?: are there| do we have| in total)?",
+        r"(?:total )?(?:number|count) of orders",
+        r"(?:total orders|order count)",
+    ], overview_answer('total_orders', 'number_of_orders')),
+    intent('customer_count', [
+        r"how many (?:customers|users)(?: are there| do we have| in total)?",
+        r"(?:total )?(?:number|count) of (?:customers|users)",
+        r"total (?:customers|users)",
+    ], overview_answer('total_users', 'number_of_customers')),
+    intent('product_count', [
+        r"how many products(?: are there| do we have| in total)?",
+        r"(?:total )?(?:number|count) of products",
+        r"total products",
+    ], overview_answer('total_products', 'number_of_products')),
+    intent('avg_order_value', [
+        r"(?:average|avg|mean) order (?:value|amount|size)",
+    ], overview_answer('avg_order_value', 'average_order_value')),
+    intent('top_products', [
+        r"(?:top|best)(?: (?P<n>\d{1,3}))? (?:selling |sold |best selling )?products?",
+        r"(?:top|best)(?: (?P<n>\d{1,3}))? (?:sellers?|selling items)",
+        r"(?:most|best) (?:sold|selling|popular) products?",
+    ], answer_top_products),
+    intent('low_stock', [
+        r"(?:low|running low) (?:on )?stock(?: items| products| variants)?(?: below (?P<threshold>\d{1,6}))?",
+        r"(?:items|products|variants) (?:with |that are |are |running )?low (?:on |in )?stock(?: below (?P<threshold>\d{1,6}))?",
+        r"(?:items|products|variants) (?:with )?(?:stock|quantity|inventory) (?:below|under|less than) (?P<threshold>\d{1,6})",
+    ], answer_low_stock),
+    intent('orders_by_status', [
+        r"(?:number of )?orders? (?:by|per|grouped by|for each|in each) status",
+        r"order status(?: distribution| breakdown| counts?)?",
+        r"how many orders (?:are there )?(?:by|per|in each|for each) status",
+    ], answer_orders_by_status),
+])
+
+def fast_path_answer(user_question):
+    """(intent name, columns, rows, text) when the fast path can answer, else None"""
+    with span('fast_path'):
+        matched = fast_path_router.answer(user_question)
+    if matched is None:
+        return None
+    name, columns, rows = matched
+    text = format_natural_response(columns, rows, user_question) if rows else "No results found."
+    log_payload(logger, 'fast_path.hit', intent=name, text=text)
+    return name, columns, rows, text
+
+@app.route('/api/admin/pool', methods=['GET'])
+def get_pool_stats():
+    """Get connection pool usage (checkout waits, in-use counts)"""
+    return jsonify({
+        'success': True,
+        'data': get_pool().stats()
+    })
+
+@app.route('/api/admin/singleflight', methods=['GET'])
+def get_singleflight_stats():
+    """Get how many duplicate database and Gemini calls were coalesced"""
+    return jsonify({
+        'success': True,
+        'data': {'enabled': SINGLEFLIGHT_ENABLED, 'db': db_flight.stats(), 'gemini': gemini_flight.stats()}
+    })
+
+@app.route('/api/admin/cache', methods=['GET', 'DELETE'])
+def analytics_cache_admin():
+    """Get analytics cache hit/miss counters, or clear it with DELETE"""
+    if request.method == 'DELETE':
+        analytics_cache.clear()
+    return jsonify({
+        'success': True,
+        'data': analytics_cache.stats()
+    })
+
+@app.route('/api/admin/live-dashboard', methods=['GET'])
+def live_dashboard_admin():
+    """Subscribers and producer counters of the live dashboard channel"""
+    return jsonify({
+        'success': True,
+        'data': live_dashboard.stats()
+    })
+
+@app.route('/api/admin/session-cache', methods=['GET', 'DELETE'])
+def session_cache_admin():
+    """Get how many chat turns were answered from cached results, or drop every session with DELETE"""
+    if request.method == 'DELETE':
+        session_cache.clear()
+    return jsonify({
+        'success': True,
+        'data': session_cache.stats()
+    })
+
+@app.route('/api/admin/question-cache', methods=['GET', 'DELETE'])
+def question_cache_admin():
+    """Get question cache hit/miss counters, or purge every cached answer with DELETE"""
+    if request.method == 'DELETE':
+        removed = question_cache.purge()
+        return jsonify({'success': True, 'purged': removed, 'data': question_cache.stats()})
+    return jsonify({
+        'success': True,
+        'data': question_cache.stats()
+    })
+
+@app.route('/api/admin/schema-prompt', methods=['GET', 'DELETE'])
+def schema_prompt_admin():
+    """Get prompt size statistics; DELETE re-reads the schema on the next question"""
+    if request.method == 'DELETE':
+        schema_prompter.clear()
+    return jsonify({
+        'success': True,
+        'data': schema_prompter.stats()
+    })
+
+@app.route('/api/admin/fast-path', methods=['GET'])
+def fast_path_admin():
+    """Get fast path hit rate and the latency it saved"""
+    return jsonify({
+        'success': True,
+        'data': fast_path_router.stats()
+    })
+
+@app.route('/api/admin/columnar', methods=['GET', 'POST'])
+def columnar_admin():
+    """Get columnar snapshot size and served/fallback counts; POST refreshes it now"""
+    if columnar_engine is None:
+        return jsonify({'success': False, 'error': 'ANALYTICS_ENGINE is not "columnar"'}), 404
+    if request.method == 'POST':
+        result = columnar_engine.refresh()
+        return jsonify({'success': result is not None, 'refresh': result, 'data': columnar_engine.stats()})
+    return jsonify({
+        'success': True,
+        'data': columnar_engine.stats()
+    })
+
+# Component counters exported as gauges on /metrics
+metrics.REGISTRY.register_stats('db_pool', lambda: get_pool().stats())
+metrics.REGISTRY.register_stats('analytics_cache', analytics_cache.stats)
+metrics.REGISTRY.register_stats('question_cache', question_cache.stats)
+metrics.REGISTRY.register_stats('schema_prompt', schema_prompter.stats)
+metrics.REGISTRY.register_stats('fast_path', fast_path_router.stats)
+metrics.REGISTRY.register_stats('singleflight_db', db_flight.stats)
+metrics.REGISTRY.register_stats('singleflight_gemini', gemini_flight.stats)
+metrics.REGISTRY.register_stats('gemini', gemini_caller.stats)
+metrics.REGISTRY.register_stats('sql_normalize', sql_normalize.normalizer.stats)
+metrics.REGISTRY.register_stats('session_cache', session_cache.stats)
+metrics.REGISTRY.register_stats('live_dashboard', live_dashboard.stats)
+metrics.REGISTRY.register_stats('compression', compressor.stats)
+if columnar_engine is not None:
+    metrics.REGISTRY.register_stats('columnar', columnar_engine.stats)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Latency histograms, error counts and component stats in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def hello_world():
@@ -647,6 +1525,7 @@ def ask_gemini():
     if request.method == 'GET':
         # For testing: get message from query param
         user_message = "what is sum of all orders"
+        session_id = None
         if not user_message:
             return jsonify({'error': 'Missing "message" in query params.'}), 400
     else:
@@ -654,8 +1533,139 @@ def ask_gemini():
         if not data or 'message' not in data:
             return jsonify({'error': 'Missing "message" in request body.'}), 400
         user_message = data['message']
-    response = chat_with_db_gemini(user_message)
+        session_id = data.get('session_id')
+    response = chat_with_db_gemini(user_message, session_id)
     return jsonify(response)
 
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json_dumps(data)}\n\n"
+
+@app.route('/ask/stream', methods=['GET', 'POST'])
+def ask_gemini_stream():
+    """Server-Sent Events variant of /ask: reply tokens, then the SQL, then result rows"""
+    if request.method == 'GET':
+        user_message = request.args.get('message')
+        session_id = request.args.get('session_id')
+    else:
+        data = request.get_json(silent=True) or {}
+        user_message = data.get('message')
+        session_id = data.get('session_id')
+    if not user_message:
+        return jsonify({'error': 'Missing "message" in request.'}), 400
+
+    def generate():
+        started = time.perf_counter()
+        first_token_ms = None
+        try:
+            for event, payload in stream_chat(user_message, session_id):
+                if first_token_ms is None and event in ('token', 'sql'):
+                    first_token_ms = round((time.perf_counter() - started) * 1000, 2)
+                yield sse_event(event, payload)
+        except Exception as e:
+            yield sse_event('error', {'message': str(e)})
+        yield sse_event('done', {
+            'first_token_ms': first_token_ms,
+            'total_ms': round((time.perf_counter() - started) * 1000, 2)
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Full results of natural-language queries, streamed by /ask/export
+EXPORT_MAX_ROWS = int(os.environ.get("EXPORT_MAX_ROWS", 1000000))
+EXPORT_FETCH_BATCH = int(os.environ.get("EXPORT_FETCH_BATCH", 5000))
+# Exports may stream one large table whole, so the limits are looser than
+# for /ask, but a second full scan (an unindexed join) is still refused
+export_guard = QueryGuard(
+    explain_sql,
+    max_rows=int(os.environ.get("EXPORT_GUARD_MAX_ROWS", 5000000)),
+    max_full_scans=int(os.environ.get("EXPORT_GUARD_MAX_FULL_SCANS", 1)),
+    max_execution_ms=int(os.environ.get("EXPORT_MAX_EXECUTION_MS", 120000)),
+    full_scan_min_rows=int(os.environ.get("SQL_GUARD_FULL_SCAN_MIN_ROWS", 10000)),
+)
+
+def export_sql_for_question(user_question):
+    """SQL answering a question, from the question cache or Gemini; returns (sql, cached)"""
+    with span('question_cache'):
+        cached = question_cache.get(user_question)
+    if cached is not None:
+        kind, payload = cached
+        if kind != 'sql':
+            raise ExportError("That question has a text answer, there is no result to export")
+        return payload, True
+
+    reply = get_sql_from_gemini(user_question)
+    if not is_sql_response(reply):
+        raise ExportError("That question has a text answer, there is no result to export")
+    return clean_sql(reply), False
+
+def fetch_export_result(sql, max_rows):
+    """Run a validated SELECT for export; returns a QueryResult or an error message"""
+    # One row over the ceiling lets a cut-off export be told apart
+    sql = add_limit(sql, max_rows + 1)
+    if SQL_GUARD_ENABLED:
+        try:
+            decision = export_guard.check(sql)
+        except Exception as e:
+            return sql_error_message(e)
+        if not decision.allowed:
+            return export_guard.rejection_message(decision)
+        sql = decision.sql
+    return run_sql(sql, batch_size=EXPORT_FETCH_BATCH)
+
+@app.route('/ask/export', methods=['GET', 'POST'])
+def ask_export():
+    """Full result of a question or a previously returned `sql`, streamed as CSV, Arrow IPC or Parquet"""
+    data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
+    fmt = data.get('format', 'csv')
+    user_message = data.get('message')
+    sql = data.get('sql')
+    if not sql and not user_message:
+        return jsonify({'error': 'Missing "message" or "sql" in request.'}), 400
+    if sql and not export.verify_sql(sql, data.get('token')):
+        return jsonify({'error': 'Only SQL returned by /ask can be exported; pass its "export_token" as "token".'}), 403
+    try:
+        max_rows = int(data.get('max_rows', EXPORT_MAX_ROWS))
+    except (TypeError, ValueError):
+        return jsonify({'error': '"max_rows" must be an integer.'}), 400
+    max_rows = max(1, min(max_rows, EXPORT_MAX_ROWS))
+
+    try:
+        mimetype, extension = export.check_format(fmt)
+        cached = True
+        if not sql:
+            sql, cached = export_sql_for_question(user_message)
+        sql = export.check_export_sql(sql, schema_prompter.schema().tables, DB_NAME)
+        if not is_safe_select(sql):
+            raise ExportError("Only a single SELECT statement can be exported")
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except ModelUnavailable:
+        return jsonify({'error': GEMINI_UNAVAILABLE_TEXT}), 503
+
+    result = fetch_export_result(sql, max_rows)
+    if isinstance(result, str):
+        log_event(logger, logging.WARNING, 'export.failed', error=result, sql=sql)
+        return jsonify({'error': result, 'sql': sql}), 400
+    if not cached:
+        question_cache.put(user_message, 'sql', sql + ';')
+
+    filename = f"export-{datetime.now().strftime('%Y%m%dT%H%M%S')}.{extension}"
+    return Response(
+        stream_with_context(export.stream(result, fmt, max_rows)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Export-Max-Rows': str(max_rows),
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
 if __name__ == '__main__':
+    schema_prompter.schema()  # read the schema once before serving
     app.run(debug=True)
@@ -0,0 +1,175 @@
+"""
+Benchmark: bytes and latency saved by ETag revalidation and compression.
+
+Requests each analytics route five ways and reports the body size on the
+wire and the median latency:
+
+    cold:     full response, analytics cache cleared first (section queries run)
+    warm:     full response served from the analytics cache
+    gzip/br:  warm, with Accept-Encoding (br only when `brotli` is installed)
+    304:      If-None-Match with the current ETag (only the watermark probe runs)
+
+By default the routes run in-process over synthetic rows, with --query-ms
+of simulated database time per section query and --probe-ms per watermark
+probe. Pass --url to measure a running server instead. A CSV export of
+--export-rows rows is also compressed to show the savings on NL exports.
+
+Usage (from backend/):
+    python benchmarks/bench_conditional.py [--rows 500] [--query-ms 40] [--repeat 20] [--json]
+    python benchmarks/bench_conditional.py --url http://localhost:5000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI", "benchmark")
+os.environ.setdefault("QUESTION_CACHE_PATH", ":memory:")
+
+import app as backend
+import compression
+import export
+from analytics_cache import AnalyticsCache
+from sql_result import QueryResult
+
+ROUTES = [
+    '/api/analytics/categories',
+    '/api/analytics/customer-insights?limit=100',
+    '/api/analytics/order-status',
+]
+MARKS = {table: 1 for table in ('orders', 'order_items', 'users', 'products', 'product_variants', 'categories')}
+
+
+def synthetic_rows(query, params, rows):
+    """Rows shaped like what each analytics query returns"""
+    if 'as category' in query:
+        return [{'category': f"Category {i}", 'product_count': i % 90, 'total_sold': i * 7,
+                 'revenue': Decimal(f"{i * 1234}.56")} for i in range(rows)]
+    if 'total_spent' in query:
+        return [{'user_id': i, 'name': f"Customer {i}", 'email': f"customer{i}@example.com",
+                 'total_orders': 50 - i % 50, 'total_spent': Decimal(f"{99999 - i}.10")}
+                for i in range(min(rows, params[-1]))]
+    if 'new_customers' in query:
+        return [{'month': f"2025-{m:02d}", 'new_customers': 100 + m} for m in range(1, 13)]
+    return [{'status': status, 'count': 100 * i, 'revenue': Decimal(f"{i * 5000}.00")}
+            for i, status in enumerate(('Delivered', 'Shipped', 'Processing', 'Pending', 'Cancelled'), 1)]
+
+
+def in_process(args):
+    """Point the app at synthetic data; returns request(path, headers) and a cache reset"""
+    def execute_query(query, params=None):
+        time.sleep(args.query_ms / 1000)
+        return synthetic_rows(query, params, args.rows)
+
+    def probe():
+        time.sleep(args.probe_ms / 1000)
+        return dict(MARKS)
+
+    backend.execute_query = execute_query
+    backend.analytics_cache = AnalyticsCache(probe, probe_interval=0)
+    client = backend.app.test_client()
+
+    def request(path, headers):
+        response = client.get(path, headers=headers)
+        return response.status_code, len(response.data), response.headers.get('ETag')
+    return request, backend.analytics_cache.clear
+
+
+def remote(url):
+    """Requests against a running server; wire bytes are read before decoding"""
+    import requests
+    session = requests.Session()
+
+    def request(path, headers):
+        headers = {'Accept-Encoding': 'identity', **headers}
+        response = session.get(url.rstrip('/') + path, headers=headers, stream=True)
+        body = response.raw.read(decode_content=False)
+        return response.status_code, len(body), response.headers.get('ETag')
+    return request, lambda: session.delete(url.rstrip('/') + '/api/admin/cache')
+
+
+def measure(request, path, headers, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        status, size, _ = request(path, headers)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'status': status, 'bytes': size, 'median_ms': round(statistics.median(timings), 2)}
+
+
+def bench_route(request, clear, path, repeat):
+    _, _, etag = request(path, {})
+    modes = {
+        'cold': measure(request, path, {}, repeat, before=clear),
+        'warm': measure(request, path, {}, repeat),
+        'gzip': measure(request, path, {'Accept-Encoding': 'gzip'}, repeat),
+    }
+    if compression.brotli is not None:
+        modes['br'] = measure(request, path, {'Accept-Encoding': 'br'}, repeat)
+    if etag:
+        modes['304'] = measure(request, path, {'If-None-Match': etag}, repeat)
+    full = modes['cold']
+    for result in modes.values():
+        result['bytes_saved_pct'] = round(100 * (1 - result['bytes'] / full['bytes']), 1) if full['bytes'] else 0.0
+        result['latency_saved_pct'] = round(100 * (1 - result['median_ms'] / full['median_ms']), 1)
+    return modes
+
+
+def bench_export(rows):
+    """Wire bytes of a CSV export with and without compression"""
+    result = QueryResult.from_rows(
+        ['order_id', 'user_id', 'status', 'total_amount', 'order_date'],
+        [(i, i % 5000, ('Delivered', 'Shipped', 'Cancelled')[i % 3], Decimal(f"{i % 900}.99"),
+          f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:{i % 60:02d}:00") for i in range(rows)]
+    )
+    body = b''.join(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+                    for chunk in export.csv_stream(result, rows))
+    compressor = compression.Compressor()
+    results = {'identity': {'bytes': len(body), 'median_ms': 0.0}}
+    for encoding in compressor.encodings:
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in compressor._stream(iter([body]), encoding))
+        results[encoding] = {'bytes': size, 'median_ms': round((time.perf_counter() - start) * 1000, 2)}
+    for result in results.values():
+        result['bytes_saved_pct'] = round(100 * (1 - result['bytes'] / len(body)), 1)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="measure a running server instead of the in-process app")
+    parser.add_argument('--routes', nargs='+', default=ROUTES)
+    parser.add_argument('--rows', type=int, default=500, help="synthetic rows per section query")
+    parser.add_argument('--query-ms', type=float, default=40.0, help="simulated time per section query")
+    parser.add_argument('--probe-ms', type=float, default=1.0, help="simulated time per watermark probe")
+    parser.add_argument('--export-rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    request, clear = remote(args.url) if args.url else in_process(args)
+    routes = {path: bench_route(request, clear, path, args.repeat) for path in args.routes}
+    exported = bench_export(args.export_rows)
+
+    if args.json:
+        print(json.dumps({'routes': routes, 'export': exported}, indent=2))
+        return
+    print(f"{'route':<44}  {'mode':>5}  {'status':>6}  {'bytes':>9}  {'saved':>6}  {'median ms':>9}  {'saved':>6}")
+    for path, modes in routes.items():
+        for mode, r in modes.items():
+            print(f"{path:<44}  {mode:>5}  {r['status']:>6}  {r['bytes']:>9}  {r['bytes_saved_pct']:>5}%  "
+                  f"{r['median_ms']:>9}  {r['latency_saved_pct']:>5}%")
+    print(f"\nCSV export, {args.export_rows} rows")
+    for encoding, r in exported.items():
+        print(f"{encoding:>10}  {r['bytes']:>10} bytes  {r['bytes_saved_pct']:>5}% saved  {r['median_ms']:>8} ms to encode")
+
+
+if __name__ == '__main__':
+    main()
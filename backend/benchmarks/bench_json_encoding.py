@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: analytics response encoding.
+
+Encodes a 10k-row payload shaped like the inventory / customer sections
+(Decimal money, DATETIME, ints, strings) three ways:
+
+    walk+flask: convert_decimals_to_float() walk, then Flask's default provider (the old path)
+    stdlib:     json_encoding with the json module, one pass
+    orjson:     json_encoding with orjson (skipped when not installed)
+
+Usage (from backend/):
+    python benchmarks/bench_json_encoding.py [--rows 10000] [--repeat 20] [--json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import json_encoding
+
+
+def convert_decimals_to_float(obj):
+    """The recursive walk the analytics routes used before json_encoding"""
+    if isinstance(obj, list):
+        return [convert_decimals_to_float(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {key: convert_decimals_to_float(value) for key, value in obj.items()}
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    else:
+        return obj
+
+
+def make_payload(rows):
+    base = datetime.datetime(2025, 1, 1, 9, 30)
+    items = [{
+        'variant_id': i,
+        'product_name': f"Product {i}",
+        'brand': f"Brand {i % 40}",
+        'sku': f"SKU-{i:06d}",
+        'price': Decimal(f"{i % 900}.{i % 100:02d}"),
+        'total_spent': Decimal(f"{i * 3}.50"),
+        'quantity': i % 25,
+        'last_updated': base + datetime.timedelta(minutes=i),
+    } for i in range(rows)]
+    return {'success': True, 'data': {'low_stock_items': items, 'summary': {'total_variants': rows}}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    payload = make_payload(args.rows)
+    flask_default = DefaultJSONProvider(Flask('bench'))
+    encoders = {
+        'walk+flask': lambda: flask_default.dumps(convert_decimals_to_float(payload)).encode('utf-8'),
+        'stdlib': lambda: json_encoding.dumps_bytes(payload, backend='stdlib'),
+    }
+    if json_encoding.orjson is not None:
+        encoders['orjson'] = lambda: json_encoding.dumps_bytes(payload, backend='orjson')
+
+    results = {}
+    for name, encode in encoders.items():
+        encode()  # warm up
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            body = encode()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {'median_ms': round(statistics.median(timings), 2), 'bytes': len(body)}
+
+    baseline = results['walk+flask']['median_ms']
+    for result in results.values():
+        result['speedup'] = round(baseline / result['median_ms'], 1)
+
+    if args.json:
+        print(json.dumps({'rows': args.rows, 'results': results}, indent=2))
+        return
+    print(f"{args.rows} rows")
+    print(f"{'encoder':>12}  {'median ms':>10}  {'bytes':>10}  {'speedup':>8}")
+    for name, r in results.items():
+        print(f"{name:>12}  {r['median_ms']:>10}  {r['bytes']:>10}  {r['speedup']:>7}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Memory / latency benchmark: DataFrame result path vs streaming QueryResult.
+
+Replays the same synthetic result set (name, DECIMAL price, int quantity)
+through both paths, from cursor to formatted answer:
+
+    dataframe: fetchall() -> pd.DataFrame -> replace({Decimal: float}) -> values.tolist()
+    streaming: fetchmany() batches, Decimal converted per batch, 10-row preview + count
+
+Usage (from backend/):
+    python benchmarks/bench_result_path.py [--rows 100 10000 200000] [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI", "benchmark")
+os.environ.setdefault("QUESTION_CACHE_PATH", ":memory:")
+
+import pandas as pd
+from mysql.connector import FieldType
+
+from app import ANSWER_PREVIEW_ROWS, SQL_FETCH_BATCH, format_natural_response
+from sql_result import QueryResult
+
+DESCRIPTION = [
+    ('name', FieldType.VAR_STRING, None, None, None, None, False),
+    ('price', FieldType.NEWDECIMAL, None, None, None, None, False),
+    ('quantity', FieldType.LONGLONG, None, None, None, None, False),
+]
+QUESTION = "list products with price and quantity"
+
+
+class ReplayCursor:
+    """Serves pre-built rows like an unbuffered cursor would, one batch at a time"""
+
+    def __init__(self, rows):
+        self.description = DESCRIPTION
+        self._rows = rows
+        self._pos = 0
+
+    def fetchall(self):
+        rows, self._pos = self._rows[self._pos:], len(self._rows)
+        return rows
+
+    def fetchmany(self, size):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+
+def make_rows(count):
+    return [(f"Product {i}", Decimal(f"{i % 1000}.99"), i % 50) for i in range(count)]
+
+
+def dataframe_path(cursor):
+    columns = [desc[0] for desc in cursor.description]
+    df = pd.DataFrame(cursor.fetchall(), columns=columns)
+    df = df.replace({Decimal: float})
+    rows = df.values.tolist()
+    return format_natural_response(columns, rows, QUESTION)
+
+
+def streaming_path(cursor):
+    with QueryResult.from_cursor(cursor, batch_size=SQL_FETCH_BATCH) as result:
+        rows = list(islice(result, ANSWER_PREVIEW_ROWS))
+        total = len(rows) + sum(1 for _ in result)
+    return format_natural_response(result.columns, rows, QUESTION, total)
+
+
+def measure(path, rows, repeat):
+    """Median wall time and peak traced allocation of one pass over `rows`"""
+    timings = []
+    for _ in range(repeat):
+        cursor = ReplayCursor(rows)
+        start = time.perf_counter()
+        answer = path(cursor)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Separate pass for memory, tracing slows allocation-heavy code down
+    tracemalloc.start()
+    path(ReplayCursor(rows))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'median_ms': round(statistics.median(timings), 2), 'peak_kib': round(peak / 1024, 1), 'answer': answer}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 10000, 200000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in args.rows:
+        rows = make_rows(count)
+        old = measure(dataframe_path, rows, args.repeat)
+        new = measure(streaming_path, rows, args.repeat)
+        assert old.pop('answer') == new.pop('answer'), "paths disagree on the answer"
+        results.append({'rows': count, 'dataframe': old, 'streaming': new})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'rows':>8}  {'dataframe ms':>12}  {'streaming ms':>12}  {'dataframe KiB':>13}  {'streaming KiB':>13}")
+    for r in results:
+        print(f"{r['rows']:>8}  {r['dataframe']['median_ms']:>12}  {r['streaming']['median_ms']:>12}  "
+              f"{r['dataframe']['peak_kib']:>13}  {r['streaming']['peak_kib']:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Local stand-in for the Gemini API, for load tests.
+
+Serves `models/<model>:streamGenerateContent?alt=sse` and
+`models/<model>:generateContent` the way the google-genai client expects.
+The reply is canned SQL picked by keywords in the prompt's "User Question"
+line, or a conversational sentence when nothing matches. It is sent in a
+few chunks spread over a configurable latency, so time-to-first-token and
+total model time look like the real API's.
+
+Faults can be injected for resilience tests: a share of requests answered
+with an HTTP error (`--error-rate`), or an explicit script of per-request
+faults queued with `GeminiStub.inject()`.
+
+Point the backend at it with GEMINI_BASE_URL=http://127.0.0.1:<port>.
+
+Usage (from backend/):
+    python benchmarks/gemini_stub.py [--port 8089] [--latency-ms 800] [--jitter-ms 200] [--chunks 4]
+                                     [--error-rate 0.1] [--error-status 503]
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (keyword regex over the question, reply); first match wins
+CANNED_REPLIES = [
+    (r"revenue|sales", "SELECT SUM(total_amount) AS total_revenue FROM orders WHERE status != 'cancelled'"),
+    (r"customer|user", "SELECT u.name, COUNT(o.order_id) AS orders FROM users u "
+                       "JOIN orders o ON o.user_id = u.user_id GROUP BY u.user_id, u.name ORDER BY orders DESC LIMIT 10"),
+    (r"review|rating", "SELECT p.name, AVG(r.rating) AS avg_rating FROM reviews r "
+                       "JOIN products p ON p.product_id = r.product_id GROUP BY p.product_id, p.name ORDER BY avg_rating DESC LIMIT 10"),
+    (r"categor", "SELECT c.name, COUNT(p.product_id) AS products FROM categories c "
+                 "LEFT JOIN products p ON p.category_id = c.category_id GROUP BY c.category_id, c.name"),
+    (r"stock|inventory", "SELECT pv.sku, i.quantity FROM inventory i "
+                         "JOIN product_variants pv ON pv.variant_id = i.variant_id ORDER BY i.quantity ASC LIMIT 20"),
+    (r"order", "SELECT status, COUNT(*) AS orders FROM orders GROUP BY status"),
+    (r"product", "SELECT name, base_price FROM products ORDER BY base_price DESC LIMIT 10"),
+]
+CONVERSATIONAL_REPLY = ("Hello! I can answer general questions and look things up in the store database, "
+                        "such as orders, products, customers and reviews.")
+
+
+def reply_for(prompt):
+    match = re.search(r"User Question:\s*(.*)", prompt)
+    question = (match.group(1) if match else prompt).lower()
+    for pattern, reply in CANNED_REPLIES:
+        if re.search(pattern, question):
+            return reply
+    return CONVERSATIONAL_REPLY
+
+
+def split_chunks(text, count):
+    size = max(1, -(-len(text) // count))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def response_json(text, prompt):
+    return {
+        'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'index': 0}],
+        'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': len(text) // 4},
+    }
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = "".join(part.get('text', '')
+                         for content in body.get('contents', []) for part in content.get('parts', []))
+        reply = reply_for(prompt)
+        stub = self.server
+        latency = max(0.0, stub.latency_ms + random.uniform(-stub.jitter_ms, stub.jitter_ms)) / 1000
+        with stub.lock:
+            stub.requests += 1
+            fault = stub.faults.popleft() if stub.faults else {}
+        if not fault and stub.error_rate and random.random() < stub.error_rate:
+            fault = {'status': stub.error_status}
+        if 'latency_ms' in fault:
+            latency = fault['latency_ms'] / 1000
+        if 'status' in fault:
+            time.sleep(latency)
+            with stub.lock:
+                stub.errors += 1
+            payload = json.dumps({'error': {'code': fault['status'], 'message': "injected fault",
+                                            'status': 'UNAVAILABLE'}}).encode()
+            self.send_response(fault['status'])
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        if ':streamGenerateContent' in self.path:
+            chunks = split_chunks(reply, stub.chunks)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for chunk in chunks:
+                time.sleep(latency / len(chunks))
+                event = response_json(chunk, prompt)
+                self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+                self.wfile.flush()
+            self.close_connection = True
+        elif ':generateContent' in self.path:
+            time.sleep(latency)
+            payload = json.dumps(response_json(reply, prompt)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self.send_error(404)
+
+
+class GeminiStub(ThreadingHTTPServer):
+    """Threaded stub server; `requests` counts model calls served, `errors` the injected failures"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency_ms=800, jitter_ms=0, chunks=4, error_rate=0.0, error_status=503):
+        super().__init__(('127.0.0.1', port), GeminiStubHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lock = threading.Lock()
+        self.faults = deque()
+        self.requests = 0
+        self.errors = 0
+
+    def inject(self, *faults):
+        """Queue faults for the next requests, one each: {'status': 503} and/or {'latency_ms': 5000}"""
+        with self.lock:
+            self.faults.extend(faults)
+        return self
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name='gemini-stub').start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=800, help="time to stream a whole reply")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="+/- uniform jitter on the latency")
+    parser.add_argument('--chunks', type=int, default=4, help="SSE chunks per reply")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument('--error-status', type=int, default=503, help="HTTP status of injected errors")
+    args = parser.parse_args(argv)
+
+    stub = GeminiStub(args.port, args.latency_ms, args.jitter_ms, args.chunks, args.error_rate, args.error_status)
+    print(f"Gemini stub on {stub.base_url} (latency {args.latency_ms:g}ms +/- {args.jitter_ms:g}ms)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Load test: every analytics route and /ask at set concurrency levels.
+
+Starts the backend in-process (or targets --base-url), with Gemini replaced
+by benchmarks/gemini_stub.py, and hammers each endpoint with N concurrent
+clients for --duration seconds per concurrency level. Reports requests per
+second, p50/p95/p99 latency and errors per endpoint, and writes the numbers
+to a JSON file tagged with the current commit. Pass an earlier file to
+--compare to see the change in RPS and p95.
+
+/ask is measured three ways: questions the fast path answers, questions
+that go to the (stubbed) model, made unique per request so the question
+cache never serves them, and the same through /ask/stream.
+
+--dataset PRESET first rebuilds the database named by DB_NAME with the
+seeded data of datagen.py at that scale (tiny, small, medium, large). It
+drops the online_store tables, so point DB_NAME at a scratch database.
+
+Usage (from backend/):
+    DB_NAME=online_store_bench python benchmarks/load_test.py --dataset small \\
+        [--concurrency 1,8,32] [--duration 10] [--gemini-latency-ms 800] [--output results.json]
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GEMINI", "load-test")
+os.environ.setdefault("QUESTION_CACHE_PATH", ":memory:")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from gemini_stub import GeminiStub
+
+FAST_PATH_QUESTIONS = ["what is sum of all orders", "top 5 selling products", "how many customers",
+                       "orders by status", "show me low stock items"]
+MODEL_QUESTIONS = ["which customers placed the most orders", "what are the highest rated products",
+                   "how many products are in each category", "list the most expensive products", "hello, who are you?"]
+
+# name -> (method, path, body for the i-th request or None)
+ENDPOINTS = {
+    'overview': ('GET', '/api/analytics/overview', None),
+    'sales-trend': ('GET', '/api/analytics/sales-trend', None),
+    'order-status': ('GET', '/api/analytics/order-status', None),
+    'top-products': ('GET', '/api/analytics/top-products', None),
+    'categories': ('GET', '/api/analytics/categories', None),
+    'customer-insights': ('GET', '/api/analytics/customer-insights', None),
+    'inventory': ('GET', '/api/analytics/inventory', None),
+    'reviews': ('GET', '/api/analytics/reviews', None),
+    'dashboard': ('GET', '/api/analytics/dashboard', None),
+    'ask-fast-path': ('POST', '/ask', lambda i: {'message': FAST_PATH_QUESTIONS[i % len(FAST_PATH_QUESTIONS)]}),
+    'ask-model': ('POST', '/ask', lambda i: {'message': f"{MODEL_QUESTIONS[i % len(MODEL_QUESTIONS)]} (request {i})"}),
+    'ask-stream': ('POST', '/ask/stream', lambda i: {'message': f"{MODEL_QUESTIONS[i % len(MODEL_QUESTIONS)]} (stream {i})"}),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def send(host, port, method, path, body):
+    """One request on a fresh connection; returns (status, elapsed seconds)"""
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def run_level(base_url, endpoint, concurrency, duration):
+    """Drive one endpoint with `concurrency` clients for `duration` seconds"""
+    method, path, make_body = ENDPOINTS[endpoint]
+    parts = urlsplit(base_url)
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            try:
+                status, elapsed = send(parts.hostname, parts.port, method, path, make_body(i) if make_body else None)
+                failed = status >= 400
+            except (OSError, http.client.HTTPException):
+                elapsed, failed = None, True
+            with lock:
+                if elapsed is not None:
+                    latencies.append(elapsed)
+                if failed:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+    }
+
+
+def start_backend():
+    """Serve app.py on a free local port in a background thread"""
+    from werkzeug.serving import make_server
+    import app as backend
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no line per request
+
+    backend.schema_prompter.schema()
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name='backend').start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, previous):
+    before = {(r['endpoint'], r['concurrency']): r for r in previous['results']}
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')}):")
+    print(f"{'endpoint':>18} {'conc':>5} {'rps':>16} {'p95 ms':>20}")
+    for r in results:
+        old = before.get((r['endpoint'], r['concurrency']))
+        if old is None:
+            continue
+        print(f"{r['endpoint']:>18} {r['concurrency']:>5} {old['rps']:>7} -> {r['rps']:<7}"
+              f" {old['p95_ms']!s:>9} -> {r['p95_ms']!s:<9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', help="target a running backend instead of starting one "
+                                           "(it must already use the Gemini stub)")
+    parser.add_argument('--concurrency', default='1,8,32', help="comma separated client counts")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per endpoint and level")
+    parser.add_argument('--endpoints', help=f"comma separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--gemini-latency-ms', type=float, default=800)
+    parser.add_argument('--gemini-jitter-ms', type=float, default=100)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0,
+                        help="share of stub model calls that fail with a 503")
+    parser.add_argument('--dataset', choices=['tiny', 'small', 'medium', 'large'],
+                        help="rebuild DB_NAME with datagen.py at this scale first")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="JSON results file (default benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument('--compare', help="earlier JSON results to diff against")
+    args = parser.parse_args(argv)
+
+    endpoints = args.endpoints.split(',') if args.endpoints else list(ENDPOINTS)
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    dataset = None
+    if args.dataset:
+        import datagen
+        import db
+        print(f"Loading the {args.dataset} dataset into {db.DB_NAME}...")
+        conn = datagen.connect(db.DB_NAME)
+        try:
+            generator = datagen.Generator(datagen.PRESETS[args.dataset], seed=args.seed)
+            dataset, _, _ = datagen.run(generator, datagen.MySQLSink(conn, replace=True))
+        finally:
+            conn.close()
+
+    stub = None
+    base_url = args.base_url
+    if base_url is None:
+        stub = GeminiStub(latency_ms=args.gemini_latency_ms, jitter_ms=args.gemini_jitter_ms,
+                          error_rate=args.gemini_error_rate).start()
+        os.environ['GEMINI_BASE_URL'] = stub.base_url
+        base_url = start_backend()
+
+    results = []
+    print(f"{'endpoint':>18} {'conc':>5} {'reqs':>7} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint in endpoints:
+        for level in levels:
+            r = run_level(base_url, endpoint, level, args.duration)
+            results.append(r)
+            print(f"{endpoint:>18} {level:>5} {r['requests']:>7} {r['errors']:>7} {r['rps']:>8}"
+                  f" {r['p50_ms']!s:>9} {r['p95_ms']!s:>9} {r['p99_ms']!s:>9}")
+
+    commit = git_commit()
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    report = {
+        'commit': commit,
+        'timestamp': timestamp,
+        'python': platform.python_version(),
+        'settings': {
+            'concurrency': levels,
+            'duration_s': args.duration,
+            'gemini_latency_ms': args.gemini_latency_ms if stub else None,
+            'gemini_jitter_ms': args.gemini_jitter_ms if stub else None,
+            'gemini_error_rate': args.gemini_error_rate if stub else None,
+            'dataset_scale': args.dataset,
+            'seed': args.seed if args.dataset else None,
+            'dataset': dataset,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"load-{commit or 'unknown'}-{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,668 @@
+"""
+In-memory columnar snapshots of the order tables for the dashboard aggregates.
+
+orders and order_items are copied into NumPy column files, one raw file
+per column, that every worker process memory-maps: the operating system
+keeps a single copy in its page cache however many workers read it.
+Amounts are stored as integer cents (sums are exact, like DECIMAL), order
+status and product brand are dictionary encoded, and products,
+product_variants and categories become small lookup arrays. The sales
+trend, status distribution, top products and category aggregates are then
+answered by vectorized group-bys (np.bincount) instead of joins in MySQL.
+
+Refresh is incremental:
+- rows with an order_id above the snapshot watermark are appended to the
+  column files, in bounded batches
+- status and amount of orders placed within COLUMNAR_LOOKBACK_DAYS are
+  re-read, which is how cancellations show up; changed ones are patched
+  in copies of those two columns in a new generation
+- the catalog is re-read when its size changes or every COLUMNAR_CATALOG_TTL seconds
+
+Readers only map the row counts recorded in meta.json, which is replaced
+atomically after the data is written, so an append never shows half a
+batch. Files other processes may have mapped are never rewritten: a patch
+or a full rebuild goes to a fresh generation directory (unchanged files
+hard-linked into it) and the old one is removed once meta.json points
+away from it. One process writes at a time, serialised by a file lock.
+
+Changes the watermarks cannot see (deleted orders, items added to an old
+order, status changes older than the lookback window) need a rebuild.
+
+Usage (from backend/):
+    python columnar.py build [--dir .columnar]   # full snapshot from MySQL
+    python columnar.py refresh [--every 30]      # incremental refresh (once, or in a loop)
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from logs import log_event
+from metrics import span
+
+try:
+    import fcntl
+except ImportError:  # no cross-process lock (Windows): run a single writer
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_DIR = os.environ.get("COLUMNAR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".columnar"))
+COLUMNAR_LOOKBACK_DAYS = int(os.environ.get("COLUMNAR_LOOKBACK_DAYS", 90))
+COLUMNAR_CATALOG_TTL = float(os.environ.get("COLUMNAR_CATALOG_TTL", 300))
+# Orders (by order_id range) read from MySQL per append batch
+COLUMNAR_BATCH = int(os.environ.get("COLUMNAR_BATCH", 100000))
+
+EPOCH = datetime(1970, 1, 1)
+DAY = 86400
+
+CATALOG_ARRAYS = ('variant_product', 'product_category', 'product_brand')
+
+# Append-only column files: <generation>/<table>.<column>.bin
+COLUMNS = {
+    'orders': {'order_id': np.int64, 'order_ts': np.int64, 'status': np.uint8, 'total_cents': np.int64},
+    'items': {'order_id': np.int64, 'variant_id': np.int64, 'quantity': np.int64, 'price_cents': np.int64,
+              'order_index': np.int64},
+}
+
+ORDERS_QUERY = """
+    SELECT order_id, TIMESTAMPDIFF(SECOND, '1970-01-01', order_date), status,
+           CAST(total_amount * 100 AS SIGNED)
+    FROM orders
+    WHERE order_id > %s AND order_id <= %s
+    ORDER BY order_id
+"""
+ITEMS_QUERY = """
+    SELECT order_id, variant_id, quantity, CAST(price * 100 AS SIGNED)
+    FROM order_items
+    WHERE order_id > %s AND order_id <= %s
+    ORDER BY order_id, order_item_id
+"""
+RECENT_ORDERS_QUERY = """
+    SELECT order_id, status, CAST(total_amount * 100 AS SIGNED)
+    FROM orders
+    WHERE order_date >= %s AND order_id <= %s
+"""
+CATALOG_MARKS_QUERY = """
+    SELECT (SELECT COUNT(*) FROM categories), (SELECT MAX(category_id) FROM categories),
+           (SELECT COUNT(*) FROM products), (SELECT MAX(product_id) FROM products),
+           (SELECT COUNT(*) FROM product_variants), (SELECT MAX(variant_id) FROM product_variants)
+"""
+
+
+def to_seconds(value):
+    """Seconds since 1970-01-01 of a naive date or datetime (the server's local time, like DATE())"""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return int((value - EPOCH).total_seconds())
+
+
+def _map(path, dtype, rows, mode='r'):
+    if rows == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=(rows,))
+
+
+def _dense(ids, values, fill=-1):
+    """Array indexed by id holding `values` (fill where an id is absent)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    out = np.full(int(ids.max()) + 1 if len(ids) else 0, fill, dtype=np.int64)
+    out[ids] = values
+    return out
+
+
+def _lookup(table, keys):
+    """table[keys] with -1 for keys outside the table (and for -1 keys)"""
+    keys = np.asarray(keys, dtype=np.int64)
+    inside = (keys >= 0) & (keys < len(table))
+    out = np.full(len(keys), -1, dtype=np.int64)
+    out[inside] = table[keys[inside]]
+    return out
+
+
+def _status_codes(meta, statuses):
+    """status -> uint8 code, adding unseen statuses to meta['statuses']"""
+    codes = {status: code for code, status in enumerate(meta['statuses'])}
+    for status in statuses:
+        if status not in codes:
+            codes[status] = len(meta['statuses'])
+            meta['statuses'].append(status)
+    if len(meta['statuses']) > 256:
+        raise ValueError("more than 256 distinct order statuses")
+    return codes
+
+
+class Snapshot:
+    """Read-only view of one published state of the column store"""
+
+    def __init__(self, directory, meta):
+        self.meta = meta
+        self.last_order_id = meta['last_order_id']
+        generation = os.path.join(directory, meta['generation'])
+        self.orders = {name: _map(os.path.join(generation, f"orders.{name}.bin"), dtype, meta['orders'])
+                       for name, dtype in COLUMNS['orders'].items()}
+        self.items = {name: _map(os.path.join(generation, f"items.{name}.bin"), dtype, meta['items'])
+                      for name, dtype in COLUMNS['items'].items()}
+
+        self.statuses = meta['statuses']
+        # Matches MySQL's case-insensitive status != 'Cancelled'
+        self.cancelled = np.array([s.lower() == 'cancelled' for s in self.statuses] or [False], dtype=bool)
+
+        catalog = meta.get('catalog')
+        if catalog:
+            arrays = np.load(os.path.join(generation, catalog + '.npz'))
+            with open(os.path.join(generation, catalog + '.json')) as f:
+                strings = json.load(f)
+        else:
+            arrays = {name: np.zeros(0, dtype=np.int64) for name in CATALOG_ARRAYS}
+            strings = {'brands': [], 'product_names': {}, 'categories': {}}
+        # Lookup arrays indexed by id, -1 where there is no such row
+        self.variant_product = arrays['variant_product']
+        self.product_category = arrays['product_category']
+        self.product_brand = arrays['product_brand']
+        self.brands = strings['brands']
+        self.product_names = {int(k): v for k, v in strings['product_names'].items()}
+        self.categories = [(int(k), v) for k, v in strings['categories'].items()]
+
+    def _order_mask(self, start=None, end=None):
+        """Non-cancelled orders placed in [start, end)"""
+        mask = ~self.cancelled[self.orders['status']]
+        ts = self.orders['order_ts']
+        if start is not None:
+            mask &= ts >= to_seconds(start)
+        if end is not None:
+            mask &= ts < to_seconds(end)
+        return mask
+
+    def sales_trend(self, start, end, limit):
+        """Daily non-cancelled orders and revenue for start <= order_date < end"""
+        mask = self._order_mask(start, end)
+        days = self.orders['order_ts'][mask] // DAY
+        if not len(days):
+            return []
+        first = int(days.min())
+        counts = np.bincount(days - first)
+        revenue = np.bincount(days - first, weights=self.orders['total_cents'][mask])
+        rows = []
+        for offset in np.flatnonzero(counts)[:limit]:
+            rows.append({
+                'date': EPOCH.date() + timedelta(days=first + int(offset)),
+                'orders': int(counts[offset]),
+                'revenue': round(revenue[offset]) / 100,
+            })
+        return rows
+
+    def order_status(self):
+        """Orders and revenue per status, most frequent first"""
+        size = len(self.statuses)
+        counts = np.bincount(self.orders['status'], minlength=size)
+        revenue = np.bincount(self.orders['status'], weights=self.orders['total_cents'], minlength=size)
+        codes = sorted(np.flatnonzero(counts), key=lambda code: (-counts[code], code))
+        return [{'status': self.statuses[code], 'count': int(counts[code]), 'revenue': round(revenue[code]) / 100}
+                for code in codes]
+
+    def _item_products(self, items_mask=None):
+        """(product id, quantity, line cents) of order items whose variant and product exist"""
+        variant_id = self.items['variant_id']
+        quantity = self.items['quantity']
+        price = self.items['price_cents']
+        if items_mask is not None:
+            variant_id, quantity, price = variant_id[items_mask], quantity[items_mask], price[items_mask]
+        product = _lookup(self.variant_product, variant_id)
+        product[_lookup(self.product_category, product) < 0] = -1
+        found = product >= 0
+        return product[found], quantity[found], quantity[found] * price[found]
+
+    def top_products(self, start=None, end=None, after=None, limit=10):
+        """Best sellers by units in non-cancelled orders, keyset-paged on (total_sold, product_id) descending"""
+        order_index = self.items['order_index']
+        joined = order_index >= 0
+        items_mask = joined.copy()
+        items_mask[joined] = self._order_mask(start, end)[order_index[joined]]
+        product, quantity, cents = self._item_products(items_mask)
+
+        size = len(self.product_category)
+        lines = np.bincount(product, minlength=size)
+        sold = np.bincount(product, weights=quantity, minlength=size).astype(np.int64)
+        revenue = np.bincount(product, weights=cents, minlength=size)
+        ids = np.flatnonzero(lines)
+        if after is not None:
+            after_sold, after_id = after
+            keep = (sold[ids] < after_sold) | ((sold[ids] == after_sold) & (ids < after_id))
+            ids = ids[keep]
+        ids = ids[np.lexsort((-ids, -sold[ids]))][:limit]
+        return [{
+            'product_id': int(pid),
+            'name': self.product_names.get(int(pid)),
+            'brand': self.brands[self.product_brand[pid]] if self.product_brand[pid] >= 0 else None,
+            'total_sold': int(sold[pid]),
+            'revenue': round(revenue[pid]) / 100,
+        } for pid in ids]
+
+    def category_performance(self):
+        """Products, units and revenue per category over all order items, highest revenue first.
+
+        Like the SQL it replaces, the cancelled filter sits in a LEFT JOIN
+        condition there and so does not drop any order items.
+        """
+        product, quantity, cents = self._item_products()
+        category = self.product_category[product]
+        size = max([category_id for category_id, _ in self.categories] + [int(self.product_category.max(initial=-1))]) + 1
+        existing = self.product_category[self.product_category >= 0]
+        products = np.bincount(existing, minlength=size)
+        sold = np.bincount(category, weights=quantity, minlength=size).astype(np.int64)
+        revenue = np.bincount(category, weights=cents, minlength=size)
+        rows = [{
+            'category': name,
+            'product_count': int(products[category_id]),
+            'total_sold': int(sold[category_id]),
+            'revenue': round(revenue[category_id]) / 100,
+        } for category_id, name in self.categories]
+        order = sorted(range(len(rows)), key=lambda i: (-rows[i]['revenue'], self.categories[i][0]))
+        return [rows[i] for i in order]
+
+
+class ColumnStore:
+    """Column files under `directory`, written by one process and mapped by all.
+
+    Args:
+        directory (str): Where the generations and meta.json live
+    """
+
+    def __init__(self, directory=COLUMNAR_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._meta_stamp = None
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, 'meta.json')
+
+    def read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self):
+        """Latest published snapshot (None before the first build), remapped when meta.json changes"""
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            if stamp != self._meta_stamp:
+                meta = self.read_meta()
+                self._snapshot = Snapshot(self.directory, meta) if meta else None
+                self._meta_stamp = stamp
+            return self._snapshot
+
+    def _publish(self, meta):
+        tmp = self.meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    @contextmanager
+    def writer(self, blocking=True):
+        """Exclusive write access across processes; yields False if `blocking` is off and it is taken"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'lock'), 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def reset(self):
+        """Start an empty generation; the previous one is removed once replaced"""
+        old = self.read_meta()
+        generation = f"gen-{time.time_ns()}"
+        os.makedirs(os.path.join(self.directory, generation))
+        for table, columns in COLUMNS.items():
+            for name in columns:
+                open(os.path.join(self.directory, generation, f"{table}.{name}.bin"), 'wb').close()
+        meta = {'generation': generation, 'orders': 0, 'items': 0, 'last_order_id': 0, 'statuses': [],
+                'catalog': None, 'catalog_marks': None, 'catalog_loaded_at': 0, 'synced_at': time.time()}
+        self._publish(meta)
+        if old:
+            # Mappings held by other processes stay valid after unlink
+            shutil.rmtree(os.path.join(self.directory, old['generation']), ignore_errors=True)
+        return meta
+
+    def _fork(self, meta, rewrite):
+        """New generation with the files of meta's: hard links, except copies of the `rewrite` names"""
+        generation = f"gen-{time.time_ns()}"
+        source = os.path.join(self.directory, meta['generation'])
+        target = os.path.join(self.directory, generation)
+        os.makedirs(target)
+        for name in os.listdir(source):
+            if name not in rewrite:
+                try:
+                    os.link(os.path.join(source, name), os.path.join(target, name))
+                    continue
+                except OSError:  # no hard links on this filesystem
+                    pass
+            shutil.copyfile(os.path.join(source, name), os.path.join(target, name))
+        return generation
+
+    def _path(self, meta, table, name):
+        return os.path.join(self.directory, meta['generation'], f"{table}.{name}.bin")
+
+    def append(self, orders, items):
+        """Append orders (order_id ascending, above the watermark) and their items.
+
+        `orders` holds order_id, order_ts, status (strings) and total_cents
+        sequences; `items` holds order_id, variant_id, quantity and price_cents.
+        """
+        meta = self.read_meta()
+        order_ids = np.asarray(orders['order_id'], dtype=np.int64)
+        if len(order_ids) and (order_ids[0] <= meta['last_order_id'] or np.any(np.diff(order_ids) <= 0)):
+            raise ValueError("orders must be appended in increasing order_id above the watermark")
+
+        codes = _status_codes(meta, orders['status'])
+        columns = {
+            'order_id': order_ids,
+            'order_ts': orders['order_ts'],
+            'status': [codes[status] for status in orders['status']],
+            'total_cents': orders['total_cents'],
+        }
+        for name, dtype in COLUMNS['orders'].items():
+            with open(self._path(meta, 'orders', name), 'ab') as f:
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+        meta['orders'] += len(order_ids)
+
+        item_orders = np.asarray(items['order_id'], dtype=np.int64)
+        all_ids = _map(self._path(meta, 'orders', 'order_id'), np.int64, meta['orders'])
+        position = np.searchsorted(all_ids, item_orders)
+        inside = position < len(all_ids)
+        found = np.zeros(len(item_orders), dtype=bool)
+        found[inside] = all_ids[position[inside]] == item_orders[inside]
+        columns = dict(items, order_index=np.where(found, position, -1))
+        for name, dtype in COLUMNS['items'].items():
+            with open(self._path(meta, 'items', name), 'ab') as f:
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+        meta['items'] += len(item_orders)
+
+        if len(order_ids):
+            meta['last_order_id'] = int(order_ids[-1])
+        meta['synced_at'] = time.time()
+        self._publish(meta)
+        return meta
+
+    def update_orders(self, order_ids, statuses, total_cents):
+        """Patch status and amount of existing orders in a new generation; returns how many changed"""
+        meta = self.read_meta()
+        if not meta['orders'] or not len(order_ids):
+            return 0
+        order_ids = np.asarray(order_ids, dtype=np.int64)
+        codes = _status_codes(meta, statuses)
+        new_status = np.array([codes[status] for status in statuses], dtype=np.uint8)
+        new_cents = np.asarray(total_cents, dtype=np.int64)
+
+        all_ids = _map(self._path(meta, 'orders', 'order_id'), np.int64, meta['orders'])
+        position = np.searchsorted(all_ids, order_ids)
+        inside = position < len(all_ids)
+        inside[inside] = all_ids[position[inside]] == order_ids[inside]
+        position, new_status, new_cents = position[inside], new_status[inside], new_cents[inside]
+
+        status = _map(self._path(meta, 'orders', 'status'), np.uint8, meta['orders'])
+        cents = _map(self._path(meta, 'orders', 'total_cents'), np.int64, meta['orders'])
+        changed = (status[position] != new_status) | (cents[position] != new_cents)
+        old = None
+        if changed.any():
+            # Readers map the current files, the patch goes to copies
+            old = meta['generation']
+            meta['generation'] = self._fork(meta, {'orders.status.bin', 'orders.total_cents.bin'})
+            status = _map(self._path(meta, 'orders', 'status'), np.uint8, meta['orders'], mode='r+')
+            cents = _map(self._path(meta, 'orders', 'total_cents'), np.int64, meta['orders'], mode='r+')
+            status[position[changed]] = new_status[changed]
+            cents[position[changed]] = new_cents[changed]
+            status.flush()
+            cents.flush()
+        meta['synced_at'] = time.time()
+        self._publish(meta)
+        if old:
+            # Mappings held by other processes stay valid after unlink
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+        return int(changed.sum())
+
+    def replace_catalog(self, categories, products, variants, marks=None):
+        """Swap in the catalog: (category_id, name), (product_id, category_id, name, brand), (variant_id, product_id)"""
+        meta = self.read_meta()
+        brands = sorted({brand for _, _, _, brand in products if brand is not None})
+        brand_codes = {brand: code for code, brand in enumerate(brands)}
+        product_ids = [row[0] for row in products]
+        name = f"catalog-{time.time_ns()}"
+        base = os.path.join(self.directory, meta['generation'], name)
+        np.savez(base + '.npz',
+                 variant_product=_dense([v for v, _ in variants], [p for _, p in variants]),
+                 product_category=_dense(product_ids, [row[1] for row in products]),
+                 product_brand=_dense(product_ids, [brand_codes.get(row[3], -1) for row in products]))
+        with open(base + '.json', 'w') as f:
+            json.dump({'brands': brands, 'product_names': {row[0]: row[2] for row in products},
+                       'categories': {category_id: label for category_id, label in categories}}, f)
+
+        old = meta.get('catalog')
+        meta.update(catalog=name, catalog_marks=marks, catalog_loaded_at=time.time())
+        self._publish(meta)
+        if old:
+            for ext in ('.npz', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, meta['generation'], old + ext))
+                except OSError:
+                    pass
+
+
+def _rows(conn, query, params=(), batch_size=COLUMNAR_BATCH):
+    """Stream a query's rows in fetchmany() batches"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield batch
+    finally:
+        cursor.close()
+
+
+def _fetch_all(conn, query, params=()):
+    return [row for batch in _rows(conn, query, params) for row in batch]
+
+
+def sync(store, conn, lookback_days=COLUMNAR_LOOKBACK_DAYS, batch_size=COLUMNAR_BATCH, rebuild=False):
+    """Bring `store` up to date with MySQL (the caller holds the writer lock); returns what changed"""
+    meta = store.read_meta()
+    if meta is None or rebuild:
+        meta = store.reset()
+    result = {'new_orders': 0, 'new_items': 0, 'updated_orders': 0, 'catalog_reloaded': False}
+
+    marks = list(_fetch_all(conn, CATALOG_MARKS_QUERY)[0])
+    if marks != meta['catalog_marks'] or time.time() - meta['catalog_loaded_at'] >= COLUMNAR_CATALOG_TTL:
+        store.replace_catalog(
+            _fetch_all(conn, "SELECT category_id, name FROM categories"),
+            _fetch_all(conn, "SELECT product_id, category_id, name, brand FROM products"),
+            _fetch_all(conn, "SELECT variant_id, product_id FROM product_variants"),
+            marks=marks,
+        )
+        result['catalog_reloaded'] = True
+
+    # Orders already in the snapshot first: recent status / amount changes,
+    # patched in one go so a refresh forks at most one generation
+    last_order_id = meta['last_order_id']
+    if last_order_id:
+        since = datetime.combine(date.today() - timedelta(days=lookback_days), datetime.min.time())
+        ids, statuses, cents = [], [], []
+        for batch in _rows(conn, RECENT_ORDERS_QUERY, (since, last_order_id), batch_size):
+            for order_id, status, total_cents in batch:
+                ids.append(order_id)
+                statuses.append(status)
+                cents.append(total_cents)
+        result['updated_orders'] = store.update_orders(ids, statuses, cents)
+
+    max_order_id = _fetch_all(conn, "SELECT COALESCE(MAX(order_id), 0) FROM orders")[0][0]
+    for low in range(last_order_id, max_order_id, batch_size):
+        high = min(low + batch_size, max_order_id)
+        orders = _fetch_all(conn, ORDERS_QUERY, (low, high))
+        items = _fetch_all(conn, ITEMS_QUERY, (low, high))
+        order_columns = list(zip(*orders)) or [(), (), (), ()]
+        item_columns = list(zip(*items)) or [(), (), (), ()]
+        store.append(
+            dict(zip(('order_id', 'order_ts', 'status', 'total_cents'), order_columns)),
+            dict(zip(('order_id', 'variant_id', 'quantity', 'price_cents'), item_columns)),
+        )
+        result['new_orders'] += len(orders)
+        result['new_items'] += len(items)
+    result['last_order_id'] = max_order_id
+    return result
+
+
+class ColumnarEngine:
+    """Serves the dashboard aggregates from a ColumnStore kept fresh in the background.
+
+    Args:
+        store (ColumnStore): Column files shared by every worker
+        connection (callable): Context manager yielding a MySQL connection (e.g. pool.connection)
+        watermark (callable): Current MAX(order_id) of orders, or None if unknown
+        interval (float): Seconds between background refreshes
+        lookback_days (int): Recent orders whose status / amount changes are picked up
+
+    `query` answers only from a snapshot that has every order the watermark
+    reports; otherwise it wakes the refresher and returns None so the caller
+    falls back to SQL.
+    """
+
+    def __init__(self, store, connection, watermark=None, interval=30.0, lookback_days=COLUMNAR_LOOKBACK_DAYS):
+        self.store = store
+        self._connection = connection
+        self._watermark = watermark
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._served = 0
+        self._fallbacks = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._last_refresh_ms = None
+
+    def start(self):
+        """Refresh in a daemon thread: every `interval` seconds, or sooner when a query finds the snapshot behind"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='columnar-refresh')
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.refresh(blocking=False)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh(self, blocking=True, rebuild=False):
+        """Sync the store with MySQL; None if another process holds the writer lock"""
+        started = time.perf_counter()
+        try:
+            with self.store.writer(blocking=blocking) as acquired:
+                if not acquired:
+                    return None
+                with self._connection() as conn:
+                    result = sync(self.store, conn, self.lookback_days, rebuild=rebuild)
+        except Exception as e:
+            with self._stats_lock:
+                self._refresh_failures += 1
+            log_event(logger, logging.WARNING, 'columnar.refresh_failed', error=str(e))
+            return None
+        elapsed = round((time.perf_counter() - started) * 1000, 2)
+        with self._stats_lock:
+            self._refreshes += 1
+            self._last_refresh_ms = elapsed
+        log_event(logger, logging.INFO, 'columnar.refreshed', elapsed_ms=elapsed, **result)
+        return result
+
+    def query(self, name, *args):
+        """Result of Snapshot.<name>(*args), or None when SQL should answer instead"""
+        try:
+            # Mapping a generation a writer has just replaced can fail, SQL answers then
+            snapshot = self.store.snapshot()
+            behind = snapshot is None
+            if not behind and self._watermark is not None:
+                watermark = self._watermark()
+                behind = watermark is None or snapshot.last_order_id < watermark
+            if behind:
+                self._wake.set()
+                with self._stats_lock:
+                    self._fallbacks += 1
+                return None
+            with span(f'columnar.{name}'):
+                result = getattr(snapshot, name)(*args)
+        except Exception as e:
+            log_event(logger, logging.WARNING, 'columnar.query_failed', query=name, error=str(e))
+            with self._stats_lock:
+                self._fallbacks += 1
+            return None
+        with self._stats_lock:
+            self._served += 1
+        return result
+
+    def stats(self):
+        snapshot = self.store.snapshot()
+        with self._stats_lock:
+            return {
+                'ready': snapshot is not None,
+                'orders': snapshot.meta['orders'] if snapshot else 0,
+                'order_items': snapshot.meta['items'] if snapshot else 0,
+                'last_order_id': snapshot.last_order_id if snapshot else 0,
+                'served': self._served,
+                'fallbacks': self._fallbacks,
+                'refreshes': self._refreshes,
+                'refresh_failures': self._refresh_failures,
+                'last_refresh_ms': self._last_refresh_ms,
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the columnar snapshot of the order tables")
+    parser.add_argument('command', choices=['build', 'refresh'])
+    parser.add_argument('--dir', default=COLUMNAR_DIR)
+    parser.add_argument('--every', type=float, default=0,
+                        help="with refresh: keep running, refreshing every N seconds")
+    args = parser.parse_args(argv)
+
+    from db import get_pool
+    engine = ColumnarEngine(ColumnStore(args.dir), get_pool().connection)
+    while True:
+        started = time.perf_counter()
+        result = engine.refresh(rebuild=args.command == 'build')
+        if result is None:
+            print("❌ Refresh failed, see the log")
+            return 1
+        print(f"✅ Snapshot up to order #{result['last_order_id']} in {time.perf_counter() - started:.1f}s: {result}")
+        if args.command == 'build' or not args.every:
+            return 0
+        time.sleep(args.every)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
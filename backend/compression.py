@@ -0,0 +1,137 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+JSON, CSV and Arrow bodies of at least `min_size` bytes are sent with
+Content-Encoding br (when the optional `brotli` package is installed) or
+gzip, whichever the client ranks higher. Streamed responses (NL exports)
+are compressed chunk by chunk, so memory stays flat. Server-Sent Events
+and Parquet (already compressed) are left alone.
+"""
+
+import threading
+import zlib
+
+from flask import request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # br disabled, gzip only
+    brotli = None
+
+COMPRESSIBLE = ('application/json', 'text/csv', 'text/plain', 'application/vnd.apache.arrow.stream')
+
+COMPRESSED_BYTES = metrics.REGISTRY.counter('app_compression_bytes_total',
+                                            "Response bytes before and after compression",
+                                            ['encoding', 'stage'])
+
+
+class Compressor:
+    """Compress Flask responses the client accepts compressed.
+
+    Args:
+        min_size (int): Smallest buffered body worth compressing, in bytes
+        gzip_level (int): zlib compression level
+        brotli_quality (int): Brotli quality (0-11)
+        encodings (list): Encodings to offer in order of preference; unavailable ones are dropped
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, encodings=('br', 'gzip')):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = [name for name in encodings if name != 'br' or brotli is not None]
+
+        self._lock = threading.Lock()
+        self._compressed = {name: 0 for name in self.encodings}
+        self._streamed = 0
+        self._too_small = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def init_app(self, app):
+        app.after_request(self.compress)
+        return self
+
+    def compress(self, response):
+        """after_request hook: encode the body when the client and the content type allow it"""
+        if (response.status_code != 200 or request.method == 'HEAD'
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            with self._lock:
+                self._streamed += 1
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                with self._lock:
+                    self._too_small += 1
+                return response
+            body = self._encode(data, encoding)
+            if len(body) >= len(data):
+                return response
+            response.set_data(body)
+            self._count(encoding, len(data), len(body))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _encode(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)   # 31: gzip container
+        return compressor.compress(data) + compressor.flush()
+
+    def _stream(self, chunks, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            compress, finish = compressor.compress, compressor.flush
+        size_in = size_out = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                size_in += len(chunk)
+                out = compress(chunk)
+                if out:
+                    size_out += len(out)
+                    yield out
+            out = finish()
+            size_out += len(out)
+            yield out
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self._count(encoding, size_in, size_out)
+
+    def _count(self, encoding, size_in, size_out):
+        COMPRESSED_BYTES.inc((encoding, 'in'), size_in)
+        COMPRESSED_BYTES.inc((encoding, 'out'), size_out)
+        with self._lock:
+            self._compressed[encoding] += 1
+            self._bytes_in += size_in
+            self._bytes_out += size_out
+
+    def stats(self):
+        """Compressed response counts and byte savings for monitoring"""
+        with self._lock:
+            return {
+                'encodings': list(self.encodings),
+                'min_size': self.min_size,
+                'compressed': dict(self._compressed),
+                'streamed': self._streamed,
+                'too_small': self._too_small,
+                'bytes_in': self._bytes_in,
+                'bytes_out': self._bytes_out,
+                'ratio': round(self._bytes_out / self._bytes_in, 4) if self._bytes_in else 0.0,
+            }
@@ -0,0 +1,692 @@
+"""
+Synthetic online_store data at any scale.
+
+Generates every table of DATABASE_SCHEMA.md from seeded random generators:
+the same seed and scale always produce the same rows, whatever the chunk
+size or output. Rows are produced table by table in chunks; orders are
+produced in date order together with their items, payment and shipping
+rows, so memory stays flat from a thousand orders to tens of millions.
+Only the per-product catalog arrays (prices, popularity) are held.
+
+Distributions:
+- product popularity is Zipf-like (a few products sell most units) and
+  shuffled, so it does not follow product_id
+- orders follow store growth, a November/December peak and busier
+  weekends; order ids increase with order_date like a live table's
+- customers who signed up earlier order more, never before signing up
+- order status depends on age: recent orders are still pending or
+  processing, older ones delivered, with a steady share cancelled
+- ratings are J-shaped, and lower for a minority of poor products
+
+Outputs:
+    mysql    load into a database through LOAD DATA LOCAL INFILE per chunk
+             (default) or batched executemany; secondary indexes, unique
+             keys and (with --foreign-keys) foreign keys are added after
+             the load
+    csv      one <table>.csv per table, with a header row
+    parquet  one <table>.parquet per table, a row group per chunk (needs pyarrow)
+
+Usage (from backend/):
+    python datagen.py mysql --scale medium --database online_store_bench --replace
+    python datagen.py mysql --users 1000000 --orders 10000000 --method executemany --replace
+    python datagen.py csv --out data/ --scale large --seed 7
+    python datagen.py parquet --out data/ --scale small
+"""
+
+import argparse
+import bisect
+import csv
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+
+import db
+
+Scale = namedtuple('Scale', ['users', 'products', 'orders', 'reviews'])
+
+# Order items average 3 per order: "large" is about 30M order_items
+PRESETS = {
+    'tiny': Scale(users=50, products=20, orders=300, reviews=60),
+    'small': Scale(users=1000, products=200, orders=5000, reviews=2000),
+    'medium': Scale(users=100000, products=5000, orders=1000000, reviews=200000),
+    'large': Scale(users=1000000, products=50000, orders=10000000, reviews=2000000),
+}
+
+# Column names and kinds, in load order; kinds drive CSV/Parquet encoding
+TABLES = {
+    'categories': [('category_id', 'int'), ('name', 'str'), ('description', 'str')],
+    'users': [('user_id', 'int'), ('name', 'str'), ('email', 'str'), ('password_hash', 'str'),
+              ('phone', 'str'), ('created_at', 'datetime'), ('updated_at', 'datetime')],
+    'products': [('product_id', 'int'), ('category_id', 'int'), ('name', 'str'), ('description', 'str'),
+                 ('base_price', 'float'), ('brand', 'str'), ('image_url', 'str'), ('created_at', 'datetime')],
+    'product_variants': [('variant_id', 'int'), ('product_id', 'int'), ('sku', 'str'), ('color', 'str'),
+                         ('size', 'str'), ('additional_price', 'float')],
+    'inventory': [('variant_id', 'int'), ('quantity', 'int'), ('last_updated', 'datetime')],
+    'orders': [('order_id', 'int'), ('user_id', 'int'), ('order_date', 'datetime'), ('status', 'str'),
+               ('total_amount', 'float'), ('shipping_address', 'str')],
+    'order_items': [('order_item_id', 'int'), ('order_id', 'int'), ('variant_id', 'int'),
+                    ('quantity', 'int'), ('price', 'float')],
+    'payments': [('payment_id', 'int'), ('order_id', 'int'), ('payment_method', 'str'),
+                 ('payment_status', 'str'), ('paid_at', 'datetime')],
+    'shipping': [('shipping_id', 'int'), ('order_id', 'int'), ('carrier', 'str'), ('tracking_number', 'str'),
+                 ('status', 'str'), ('estimated_delivery_date', 'date')],
+    'reviews': [('review_id', 'int'), ('user_id', 'int'), ('product_id', 'int'), ('rating', 'int'),
+                ('comment', 'str'), ('created_at', 'datetime')],
+}
+
+# Tables with their primary key only; everything else comes after the load
+TABLE_SQL = {
+    'categories': """CREATE TABLE categories (
+        category_id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(255) NOT NULL,
+        description TEXT
+    )""",
+    'users': """CREATE TABLE users (
+        user_id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        phone VARCHAR(20),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )""",
+    'products': """CREATE TABLE products (
+        product_id INT PRIMARY KEY AUTO_INCREMENT,
+        category_id INT NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        description TEXT,
+        base_price DECIMAL(10,2) NOT NULL,
+        brand VARCHAR(255),
+        image_url VARCHAR(500),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    'product_variants': """CREATE TABLE product_variants (
+        variant_id INT PRIMARY KEY AUTO_INCREMENT,
+        product_id INT NOT NULL,
+        sku VARCHAR(100) NOT NULL,
+        color VARCHAR(50),
+        size VARCHAR(50),
+        additional_price DECIMAL(10,2) DEFAULT 0.00
+    )""",
+    'inventory': """CREATE TABLE inventory (
+        variant_id INT PRIMARY KEY,
+        quantity INT NOT NULL DEFAULT 0,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )""",
+    'orders': """CREATE TABLE orders (
+        order_id INT PRIMARY KEY AUTO_INCREMENT,
+        user_id INT NOT NULL,
+        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status ENUM('pending', 'processing', 'shipped', 'delivered', 'cancelled') DEFAULT 'pending',
+        total_amount DECIMAL(10,2) NOT NULL,
+        shipping_address TEXT NOT NULL
+    )""",
+    'order_items': """CREATE TABLE order_items (
+        order_item_id INT PRIMARY KEY AUTO_INCREMENT,
+        order_id INT NOT NULL,
+        variant_id INT NOT NULL,
+        quantity INT NOT NULL,
+        price DECIMAL(10,2) NOT NULL
+    )""",
+    'payments': """CREATE TABLE payments (
+        payment_id INT PRIMARY KEY AUTO_INCREMENT,
+        order_id INT NOT NULL,
+        payment_method ENUM('credit_card', 'debit_card', 'paypal', 'bank_transfer', 'cash_on_delivery') NOT NULL,
+        payment_status ENUM('pending', 'completed', 'failed', 'refunded') DEFAULT 'pending',
+        paid_at TIMESTAMP NULL
+    )""",
+    'shipping': """CREATE TABLE shipping (
+        shipping_id INT PRIMARY KEY AUTO_INCREMENT,
+        order_id INT NOT NULL,
+        carrier VARCHAR(255),
+        tracking_number VARCHAR(255),
+        status ENUM('preparing', 'shipped', 'in_transit', 'delivered', 'returned') DEFAULT 'preparing',
+        estimated_delivery_date DATE
+    )""",
+    'reviews': """CREATE TABLE reviews (
+        review_id INT PRIMARY KEY AUTO_INCREMENT,
+        user_id INT NOT NULL,
+        product_id INT NOT NULL,
+        rating INT NOT NULL CHECK (rating >= 1 AND rating <= 5),
+        comment TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+}
+
+# Secondary indexes of DATABASE_SCHEMA.md, built once over the loaded rows
+# instead of maintained row by row during the load
+INDEX_SQL = {
+    'categories': ["ADD INDEX idx_name (name)"],
+    'users': ["ADD UNIQUE KEY email (email)", "ADD INDEX idx_email (email)", "ADD INDEX idx_created_at (created_at)"],
+    'products': ["ADD INDEX idx_category (category_id)", "ADD INDEX idx_brand (brand)",
+                 "ADD INDEX idx_price (base_price)", "ADD INDEX idx_created_at (created_at)"],
+    'product_variants': ["ADD UNIQUE KEY sku (sku)", "ADD INDEX idx_product (product_id)", "ADD INDEX idx_sku (sku)"],
+    'inventory': ["ADD INDEX idx_quantity (quantity)", "ADD INDEX idx_last_updated (last_updated)"],
+    'orders': ["ADD INDEX idx_user (user_id)", "ADD INDEX idx_status (status)",
+               "ADD INDEX idx_order_date (order_date)", "ADD INDEX idx_total_amount (total_amount)"],
+    'order_items': ["ADD INDEX idx_order (order_id)", "ADD INDEX idx_variant (variant_id)"],
+    'payments': ["ADD INDEX idx_order (order_id)", "ADD INDEX idx_status (payment_status)",
+                 "ADD INDEX idx_method (payment_method)", "ADD INDEX idx_paid_at (paid_at)"],
+    'shipping': ["ADD INDEX idx_order (order_id)", "ADD INDEX idx_status (status)",
+                 "ADD INDEX idx_tracking (tracking_number)", "ADD INDEX idx_delivery_date (estimated_delivery_date)"],
+    'reviews': ["ADD INDEX idx_user (user_id)", "ADD INDEX idx_product (product_id)", "ADD INDEX idx_rating (rating)",
+                "ADD INDEX idx_created_at (created_at)", "ADD UNIQUE KEY unique_user_product (user_id, product_id)"],
+}
+
+FOREIGN_KEY_SQL = {
+    'products': ["ADD FOREIGN KEY (category_id) REFERENCES categories(category_id)"],
+    'product_variants': ["ADD FOREIGN KEY (product_id) REFERENCES products(product_id)"],
+    'inventory': ["ADD FOREIGN KEY (variant_id) REFERENCES product_variants(variant_id)"],
+    'orders': ["ADD FOREIGN KEY (user_id) REFERENCES users(user_id)"],
+    'order_items': ["ADD FOREIGN KEY (order_id) REFERENCES orders(order_id)",
+                    "ADD FOREIGN KEY (variant_id) REFERENCES product_variants(variant_id)"],
+    'payments': ["ADD FOREIGN KEY (order_id) REFERENCES orders(order_id)"],
+    'shipping': ["ADD FOREIGN KEY (order_id) REFERENCES orders(order_id)"],
+    'reviews': ["ADD FOREIGN KEY (user_id) REFERENCES users(user_id)",
+                "ADD FOREIGN KEY (product_id) REFERENCES products(product_id)"],
+}
+
+CATEGORIES = [('Electronics', 14), ('Clothing', 16), ('Home & Kitchen', 11), ('Books', 9), ('Sports', 8),
+              ('Beauty', 8), ('Toys', 7), ('Garden', 5), ('Grocery', 7), ('Automotive', 4), ('Office', 5), ('Music', 6)]
+BRANDS = ['Acme', 'Northwind', 'Contoso', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay',
+          'Soylent', 'Tyrell', 'Wonka', 'Cyberdyne', 'Oscorp', 'Aperture', 'Gringotts', 'Monarch', 'Duff', 'Krusty']
+ADJECTIVES = ['Classic', 'Premium', 'Compact', 'Deluxe', 'Essential', 'Ultra', 'Eco', 'Smart', 'Pro', 'Mini']
+NOUNS = ['Lamp', 'Jacket', 'Speaker', 'Backpack', 'Watch', 'Blender', 'Novel', 'Sneakers', 'Headphones', 'Mug',
+         'Desk', 'Camera', 'Racket', 'Serum', 'Puzzle', 'Drill', 'Kettle', 'Notebook', 'Guitar', 'Tent']
+COLORS = ['Black', 'White', 'Red', 'Blue', 'Green', 'Grey', 'Navy', 'Beige']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'One Size']
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Fatima', 'Carlos', 'Aiko', 'Olga', 'Kwame', 'Priya', 'Lucas',
+               'Sofia', 'Ahmed', 'Emma', 'Noah', 'Chloe', 'Mateo', 'Hana', 'Ivan', 'Zara', 'Liam']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Khan', 'Silva', 'Tanaka', 'Ivanova', 'Mensah', 'Patel', 'Muller',
+              'Rossi', 'Hassan', 'Brown', 'Kim', 'Martin', 'Lopez', 'Sato', 'Novak', 'Ali', 'Walsh']
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Lake View', 'Hill Rd']
+CITIES = ['Springfield', 'Riverton', 'Fairview', 'Georgetown', 'Salem', 'Madison', 'Clinton', 'Franklin']
+CARRIERS = [('UPS', '1Z'), ('FedEx', 'FX'), ('DHL', 'DH'), ('USPS', '94')]
+PAYMENT_METHODS = ['credit_card', 'debit_card', 'paypal', 'bank_transfer', 'cash_on_delivery']
+PAYMENT_WEIGHTS = [45, 20, 20, 8, 7]
+STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+REVIEW_COMMENTS = {
+    1: ["Broke after a week.", "Not as described.", "Would not buy again."],
+    2: ["Disappointing quality.", "Arrived late and damaged.", "Expected more for the price."],
+    3: ["It's okay.", "Does the job.", "Average, nothing special."],
+    4: ["Good value.", "Works well, minor issues.", "Happy with it."],
+    5: ["Excellent!", "Exactly what I needed.", "Love it, highly recommend."],
+}
+# Items per order (mean 3)
+ITEM_COUNTS = [1, 2, 3, 4, 5, 6]
+ITEM_CUM_WEIGHTS = list(itertools.accumulate([20, 25, 20, 15, 10, 10]))
+# Relative order volume per month, peaking for the holidays
+SEASON = [0.8, 0.75, 0.85, 0.9, 0.95, 0.9, 0.9, 0.95, 1.0, 1.1, 1.5, 1.8]
+
+
+def status_weights(age_days):
+    """Weights over STATUSES for an order placed `age_days` before the end of the data"""
+    if age_days <= 2:
+        return (55, 35, 10, 0, 0)
+    if age_days <= 7:
+        return (10, 25, 45, 15, 5)
+    return (1, 1, 3, 88, 7)
+
+
+class Generator:
+    """Deterministic rows for every online_store table.
+
+    Args:
+        scale (Scale): Row counts for users, products, orders and reviews
+        seed (int): Same seed and scale, same rows
+        end (date): Orders run up to the day before (default today)
+        years (float): Length of the order history
+    """
+
+    def __init__(self, scale, seed=42, end=None, years=3):
+        self.scale = scale
+        self.seed = seed
+        self.end = end or date.today()
+        self.days = max(1, int(years * 365))
+        self.start = self.end - timedelta(days=self.days)
+
+        # Daily order volume: growth over the period, season and weekday
+        self.day_weights = []
+        for i in range(self.days):
+            day = self.start + timedelta(days=i)
+            growth = 1 + 2 * i / self.days
+            self.day_weights.append(growth * SEASON[day.month - 1] * (1.25 if day.weekday() >= 5 else 1.0))
+        # Users signed up by the end of each day, growing like the store
+        signups = list(itertools.accumulate(1 + 2 * i / self.days for i in range(self.days)))
+        self.users_by_day = [max(1, round(scale.users * total / signups[-1])) for total in signups]
+
+        self._build_catalog()
+
+    def rng(self, name):
+        """Independent stream per table, so one table's rows never shift another's"""
+        return random.Random(f"{self.seed}:{name}")
+
+    def _build_catalog(self):
+        rng = self.rng('catalog')
+        categories = [weight for _, weight in CATEGORIES]
+        self.product_category = rng.choices(range(1, len(CATEGORIES) + 1), weights=categories, k=self.scale.products)
+        self.product_price = [round(min(3000.0, max(2.0, rng.lognormvariate(3.6, 0.9))), 2)
+                              for _ in range(self.scale.products)]
+        self.product_poor = [rng.random() < 0.2 for _ in range(self.scale.products)]
+        ranks = list(range(1, self.scale.products + 1))
+        rng.shuffle(ranks)
+        product_weights = [1 / rank ** 1.07 for rank in ranks]
+        self.product_cum = list(itertools.accumulate(product_weights))
+
+        self.variant_product = []
+        self.variant_extra = []
+        variant_weights = []
+        for product, weight in enumerate(product_weights, start=1):
+            count = rng.choice([1, 2, 2, 3, 4])
+            for _ in range(count):
+                self.variant_product.append(product)
+                self.variant_extra.append(rng.choice([0.0, 0.0, 0.0, 5.0, 10.0, 20.0]))
+                variant_weights.append(weight / count)
+        self.variant_cum = list(itertools.accumulate(variant_weights))
+
+    def variant_price(self, variant_index):
+        return round(self.product_price[self.variant_product[variant_index] - 1] + self.variant_extra[variant_index], 2)
+
+    def signup_days(self):
+        """Signup day index of each user, in user_id order"""
+        day = 0
+        for user_id in range(1, self.scale.users + 1):
+            while self.users_by_day[day] < user_id:
+                day += 1
+            yield day
+
+    def at(self, day_index, seconds):
+        return datetime.combine(self.start + timedelta(days=day_index), datetime.min.time()) + timedelta(seconds=seconds)
+
+    def categories(self):
+        for category_id, (name, _) in enumerate(CATEGORIES, start=1):
+            yield category_id, name, f"{name} products"
+
+    def users(self):
+        rng = self.rng('users')
+        for user_id, day in enumerate(self.signup_days(), start=1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created = self.at(day, rng.randrange(86400))
+            yield (user_id, f"{first} {last}", f"{first.lower()}.{last.lower()}{user_id}@example.com",
+                   f"{rng.getrandbits(128):032x}", f"555-{rng.randrange(10 ** 7):07d}", created, created)
+
+    def products(self):
+        rng = self.rng('products')
+        for index in range(self.scale.products):
+            product_id = index + 1
+            brand = rng.choice(BRANDS)
+            name = f"{brand} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}"
+            created = self.at(0, 0) - timedelta(days=rng.randrange(365), seconds=rng.randrange(86400))
+            yield (product_id, self.product_category[index], name, f"The {name}.", self.product_price[index],
+                   brand, f"https://cdn.example.com/products/{product_id}.jpg", created)
+
+    def product_variants(self):
+        rng = self.rng('variants')
+        counts = {}
+        for index, product_id in enumerate(self.variant_product):
+            counts[product_id] = counts.get(product_id, 0) + 1
+            yield (index + 1, product_id, f"SKU-{product_id:07d}-{counts[product_id]}",
+                   rng.choice(COLORS), rng.choice(SIZES), self.variant_extra[index])
+
+    def inventory(self):
+        rng = self.rng('inventory')
+        for index in range(len(self.variant_product)):
+            roll = rng.random()
+            quantity = 0 if roll < 0.04 else rng.randint(1, 9) if roll < 0.14 else rng.randint(10, 500)
+            yield index + 1, quantity, self.at(self.days - 1 - rng.randrange(min(30, self.days)), rng.randrange(86400))
+
+    def orders(self):
+        """Yield (order, items, payment, shipment or None) in order_date order"""
+        rng = self.rng('orders')
+        total_weight = sum(self.day_weights)
+        variant_total = self.variant_cum[-1]
+        order_id = item_id = shipping_id = 0
+        carry = 0.0
+        for day in range(self.days):
+            expected = self.scale.orders * self.day_weights[day] / total_weight + carry
+            count = int(expected)
+            carry = expected - count
+            if day == self.days - 1:
+                count = self.scale.orders - order_id
+            count = max(0, min(count, self.scale.orders - order_id))
+            # Customers signed up before this day; earlier ones order more often
+            eligible = self.users_by_day[day - 1] if day else 1
+            age = self.days - day
+
+            for seconds in sorted(rng.randrange(86400) for _ in range(count)):
+                order_id += 1
+                placed = self.at(day, seconds)
+                user_id = 1 + int(eligible * rng.random() ** 1.6)
+
+                items, total = [], 0.0
+                for _ in range(rng.choices(ITEM_COUNTS, cum_weights=ITEM_CUM_WEIGHTS)[0]):
+                    variant = bisect.bisect_right(self.variant_cum, rng.random() * variant_total)
+                    quantity = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+                    price = self.variant_price(variant)
+                    total += price * quantity
+                    item_id += 1
+                    items.append((item_id, order_id, variant + 1, quantity, price))
+
+                status = rng.choices(STATUSES, weights=status_weights(age))[0]
+                address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+                order = (order_id, user_id, placed, status, round(total, 2), address)
+
+                method = rng.choices(PAYMENT_METHODS, weights=PAYMENT_WEIGHTS)[0]
+                if status == 'cancelled':
+                    payment_status = 'refunded' if rng.random() < 0.6 else 'failed'
+                elif status == 'pending' or (method == 'cash_on_delivery' and status != 'delivered'):
+                    payment_status = 'pending'
+                else:
+                    payment_status = 'completed'
+                paid_at = placed + timedelta(minutes=rng.randint(1, 120)) if payment_status in ('completed', 'refunded') else None
+                payment = (order_id, order_id, method, payment_status, paid_at)
+
+                shipment = None
+                if status in ('shipped', 'delivered'):
+                    shipping_id += 1
+                    carrier, prefix = rng.choice(CARRIERS)
+                    shipment = (shipping_id, order_id, carrier, f"{prefix}{order_id:012d}",
+                                'delivered' if status == 'delivered' else rng.choice(['shipped', 'in_transit']),
+                                (placed + timedelta(days=rng.randint(3, 7))).date())
+                yield order, items, payment, shipment
+
+    def reviews(self):
+        rng = self.rng('reviews')
+        product_total = self.product_cum[-1]
+        per_user = self.scale.reviews / self.scale.users if self.scale.users else 0
+        review_id = 0
+        for user_id, signup_day in enumerate(self.signup_days(), start=1):
+            if review_id >= self.scale.reviews:
+                break
+            # Most customers never review, a few review a lot
+            wanted = min(self.scale.reviews - review_id, self.scale.products, 50,
+                         int(rng.expovariate(1 / (per_user + 0.5))) if per_user else 0)
+            reviewed = set()
+            for _ in range(wanted * 4):
+                if len(reviewed) >= wanted:
+                    break
+                product = bisect.bisect_right(self.product_cum, rng.random() * product_total)
+                if product in reviewed:
+                    continue
+                reviewed.add(product)
+                poor = self.product_poor[product]
+                rating = rng.choices([1, 2, 3, 4, 5], weights=(20, 15, 20, 25, 20) if poor else (4, 4, 9, 28, 55))[0]
+                review_id += 1
+                created = self.at(rng.randint(signup_day, self.days - 1), rng.randrange(86400))
+                yield review_id, user_id, product + 1, rating, rng.choice(REVIEW_COMMENTS[rating]), created
+
+    def chunks(self, chunk_size=50000):
+        """Yield (table, rows) in load order, at most `chunk_size` rows each"""
+        for table, rows in (('categories', self.categories()), ('users', self.users()),
+                            ('products', self.products()), ('product_variants', self.product_variants()),
+                            ('inventory', self.inventory())):
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                yield table, chunk
+
+        buffers = {'orders': [], 'order_items': [], 'payments': [], 'shipping': []}
+        for order, items, payment, shipment in self.orders():
+            buffers['orders'].append(order)
+            buffers['order_items'].extend(items)
+            buffers['payments'].append(payment)
+            if shipment is not None:
+                buffers['shipping'].append(shipment)
+            if len(buffers['order_items']) >= chunk_size:
+                for table, chunk in buffers.items():
+                    if chunk:
+                        yield table, chunk
+                buffers = {table: [] for table in buffers}
+        for table, chunk in buffers.items():
+            if chunk:
+                yield table, chunk
+
+        rows = self.reviews()
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield 'reviews', chunk
+
+
+def csv_value(value, null):
+    if value is None:
+        return null
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return value
+
+
+class CsvSink:
+    """One <table>.csv per table under `out_dir`"""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._files = {}
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    def write(self, table, rows):
+        if table not in self._files:
+            f = open(os.path.join(self.out_dir, f"{table}.csv"), 'w', newline='')
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in TABLES[table]])
+            self._files[table] = (f, writer)
+        _, writer = self._files[table]
+        writer.writerows([csv_value(v, '') for v in row] for row in rows)
+
+    def finish(self):
+        for f, _ in self._files.values():
+            f.close()
+        return {}
+
+
+class ParquetSink:
+    """One <table>.parquet per table under `out_dir`, a row group per chunk"""
+
+    def __init__(self, out_dir):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.out_dir = out_dir
+        self._writers = {}
+        kinds = {'int': pyarrow.int64(), 'str': pyarrow.string(), 'float': pyarrow.float64(),
+                 'datetime': pyarrow.timestamp('s'), 'date': pyarrow.date32()}
+        self._schemas = {table: pyarrow.schema([(name, kinds[kind]) for name, kind in columns])
+                         for table, columns in TABLES.items()}
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    def write(self, table, rows):
+        schema = self._schemas[table]
+        if table not in self._writers:
+            self._writers[table] = self.pq.ParquetWriter(os.path.join(self.out_dir, f"{table}.parquet"), schema)
+        columns = list(zip(*rows))
+        arrays = [self.pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+        self._writers[table].write_table(self.pa.Table.from_arrays(arrays, schema=schema))
+
+    def finish(self):
+        for writer in self._writers.values():
+            writer.close()
+        return {}
+
+
+# Rows per INSERT statement with --method executemany
+EXECUTEMANY_BATCH = 5000
+
+
+class MySQLSink:
+    """Load into MySQL with indexes deferred until every row is in.
+
+    Args:
+        conn: Connection opened with allow_local_infile=True (for load-data)
+        method (str): 'load-data' (LOAD DATA LOCAL INFILE per chunk) or 'executemany'
+        replace (bool): Drop existing online_store tables first, otherwise refuse to touch them
+        foreign_keys (bool): Also add the foreign keys of DATABASE_SCHEMA.md after the load
+    """
+
+    def __init__(self, conn, method='load-data', replace=False, foreign_keys=False):
+        self.conn = conn
+        self.method = method
+        self.replace = replace
+        self.foreign_keys = foreign_keys
+        self._tmp_dir = None
+
+    def start(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SHOW TABLES")
+        existing = {row[0] for row in cursor.fetchall()} & set(TABLES)
+        if existing and not self.replace:
+            cursor.close()
+            raise SystemExit(f"{', '.join(sorted(existing))} already exist; pass --replace to drop them")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
+        for table in reversed(list(TABLES)):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        for table in TABLES:
+            cursor.execute(TABLE_SQL[table])
+        cursor.close()
+        if self.method == 'load-data':
+            self._tmp_dir = tempfile.mkdtemp(prefix='datagen-')
+
+    def write(self, table, rows):
+        columns = [name for name, _ in TABLES[table]]
+        cursor = self.conn.cursor()
+        try:
+            if self.method == 'executemany':
+                sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+                for start in range(0, len(rows), EXECUTEMANY_BATCH):
+                    cursor.executemany(sql, rows[start:start + EXECUTEMANY_BATCH])
+            else:
+                path = os.path.join(self._tmp_dir, f"{table}.csv")
+                with open(path, 'w', newline='') as f:
+                    csv.writer(f, lineterminator='\n').writerows([csv_value(v, r'\N') for v in row] for row in rows)
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} "
+                    "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+                    f"LINES TERMINATED BY '\\n' ({', '.join(columns)})"
+                )
+                os.remove(path)
+            self.conn.commit()
+        finally:
+            cursor.close()
+
+    def finish(self):
+        """Build the deferred indexes (and foreign keys); returns seconds per table"""
+        timings = {}
+        cursor = self.conn.cursor()
+        for table in TABLES:
+            clauses = INDEX_SQL.get(table, []) + (FOREIGN_KEY_SQL.get(table, []) if self.foreign_keys else [])
+            if clauses:
+                started = time.perf_counter()
+                cursor.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+                timings[table] = round(time.perf_counter() - started, 2)
+        cursor.execute("SET SESSION unique_checks = 1")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.close()
+        if self._tmp_dir:
+            os.rmdir(self._tmp_dir)
+        return timings
+
+
+def connect(database):
+    """Connection for loading, creating `database` if needed"""
+    conn = mysql.connector.connect(host=db.DB_HOST, user=db.DB_USER, password=db.DB_PASS,
+                                   allow_local_infile=True, autocommit=False)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    cursor.execute(f"USE `{database}`")
+    cursor.close()
+    return conn
+
+
+def run(generator, sink, chunk_size=50000, progress=None):
+    """Stream every chunk into `sink`; returns (rows per table, load seconds, index seconds per table)"""
+    counts = dict.fromkeys(TABLES, 0)
+    started = time.perf_counter()
+    sink.start()
+    for table, rows in generator.chunks(chunk_size):
+        sink.write(table, rows)
+        counts[table] += len(rows)
+        if progress:
+            progress(table, counts[table])
+    loaded = time.perf_counter() - started
+    return counts, round(loaded, 2), sink.finish()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate online_store data at scale")
+    parser.add_argument('output', choices=['mysql', 'csv', 'parquet'])
+    parser.add_argument('--scale', choices=list(PRESETS), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--products', type=int)
+    parser.add_argument('--orders', type=int)
+    parser.add_argument('--reviews', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=date.fromisoformat, help="orders run up to the day before (default today)")
+    parser.add_argument('--years', type=float, default=3, help="length of the order history")
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--out', default='data', help="directory for csv / parquet")
+    parser.add_argument('--database', default=db.DB_NAME, help="mysql: target database (created if missing)")
+    parser.add_argument('--method', choices=['load-data', 'executemany'], default='load-data')
+    parser.add_argument('--replace', action='store_true', help="mysql: drop existing online_store tables")
+    parser.add_argument('--foreign-keys', action='store_true', help="mysql: add foreign keys after the load")
+    args = parser.parse_args(argv)
+
+    scale = PRESETS[args.scale]._replace(**{field: getattr(args, field) for field in Scale._fields
+                                            if getattr(args, field) is not None})
+    generator = Generator(scale, seed=args.seed, end=args.end, years=args.years)
+    print(f"Generating {scale} (seed {args.seed}, {generator.start} to {generator.end})")
+
+    conn = None
+    if args.output == 'mysql':
+        conn = connect(args.database)
+        sink = MySQLSink(conn, method=args.method, replace=args.replace, foreign_keys=args.foreign_keys)
+    elif args.output == 'csv':
+        sink = CsvSink(args.out)
+    else:
+        sink = ParquetSink(args.out)
+
+    last = {}
+
+    def progress(table, rows):
+        # One line per table and million rows
+        if rows // 1000000 != last.get(table, 0) // 1000000:
+            print(f"  {table}: {rows:,} rows", file=sys.stderr)
+        last[table] = rows
+
+    try:
+        counts, seconds, index_seconds = run(generator, sink, args.chunk_size, progress)
+    except mysql.connector.Error as e:
+        if args.method == 'load-data' and e.errno in (1148, 2068, 3948):
+            raise SystemExit(f"LOAD DATA LOCAL is disabled ({e.msg}); enable local_infile on the server "
+                             "or use --method executemany")
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+
+    total = sum(counts.values())
+    print(f"✅ {total:,} rows in {seconds:.1f}s ({total / max(seconds, 0.001):,.0f} rows/s)")
+    for table, rows in counts.items():
+        indexed = f", indexes {index_seconds[table]}s" if table in index_seconds else ""
+        print(f"  - {table}: {rows:,}{indexed}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Database layer for the AI-Powered eCommerce Database Assistant.
+
+Holds the MySQL settings and one process-wide connection pool that every
+DB helper in app.py (and the command line tools) checks connections out of,
+instead of paying a TCP + auth handshake per query.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_NAME = os.environ.get("DB_NAME", "online_store")
+DB_USER = os.environ.get("DB_USER", "root")
+DB_PASS = os.environ.get("DB_PASS", "")
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+
+# Pool settings (override through the environment / .env file)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))
+DB_POOL_RECYCLE = float(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PING = os.environ.get("DB_POOL_PING", "1") not in ("0", "false", "False")
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+def connect():
+    """Open a brand new MySQL connection with the configured settings"""
+    # autocommit keeps a pooled connection from pinning an old REPEATABLE READ
+    # snapshot, so every query sees fresh data just like a new connection did.
+    return mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASS,
+        database=DB_NAME,
+        autocommit=True
+    )
+
+
+class ConnectionPool:
+    """Thread-safe, lazily filled pool of MySQL connections.
+
+    Args:
+        connect (callable): Factory returning a new DB-API connection
+        size (int): Maximum number of open connections
+        timeout (float): Seconds a checkout waits for a free connection
+        recycle (float): Connections older than this many seconds are reopened (0 disables)
+        ping (bool): Check liveness of an idle connection before handing it out
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, recycle=1800.0, ping=True):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping = ping
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (connection, created_at) pairs, most recent last
+        self._created_at = {}         # id(connection) -> created_at for checked out connections
+        self._open = 0
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self):
+        """Check a connection out of the pool, waiting up to `timeout` seconds"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    # Reserve a slot now, the connection is opened outside the lock
+                    self._open += 1
+                    conn, created_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.timeout}s "
+                        f"({self._in_use}/{self.size} in use)"
+                    )
+                self._cond.wait(remaining)
+
+            waited = time.monotonic() - start
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if conn is None:
+                conn, created_at = self._connect(), time.monotonic()
+            else:
+                conn, created_at = self._revive(conn, created_at)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created_at[id(conn)] = created_at
+        return conn
+
+    def _revive(self, conn, created_at):
+        """Recycle stale connections and replace dead ones before reuse"""
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            self._close_quietly(conn)
+            with self._cond:
+                self._recycled += 1
+            return self._connect(), time.monotonic()
+
+        if self.ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(conn)
+                with self._cond:
+                    self._ping_failures += 1
+                return self._connect(), time.monotonic()
+
+        return conn, created_at
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool; `discard` closes it instead"""
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._close_quietly(conn)
+
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append((conn, created_at))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError):
+            # The connection itself is broken, don't hand it to the next caller
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection (checked out ones close on release)"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Snapshot of pool usage for sizing under load"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                'size': self.size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'recycled': self._recycled,
+                'ping_failures': self._ping_failures,
+                'wait_ms_total': round(self._wait_total * 1000, 3),
+                'wait_ms_avg': round(self._wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                'wait_ms_max': round(self._wait_max * 1000, 3),
+            }
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    connect,
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    recycle=DB_POOL_RECYCLE,
+                    ping=DB_POOL_PING
+                )
+    return _pool
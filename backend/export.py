@@ -0,0 +1,305 @@
+"""
+Streaming export of query results as CSV, Arrow IPC or Parquet.
+
+Each writer takes a QueryResult (rows fetched in batches from an
+unbuffered cursor) and yields encoded bytes batch by batch, so the
+response is sent chunk by chunk and memory stays bounded by the fetch
+batch (plus one row group for Parquet) however many rows are exported.
+At most `max_rows` rows are written; a file cut off there says so at its
+end (a `#TRUNCATED` line in CSV, `export.truncated` metadata in Arrow and
+Parquet), since the status line and headers are long gone by then.
+
+Only SQL this server issued can be exported: /ask hands out an HMAC
+`export_token` with every query it ran, and the export route checks it.
+Whatever its origin, the statement must read only tables of the
+application schema and call no file, lock, sleep or system functions.
+
+Arrow and Parquet need pyarrow, which is optional: without it only CSV
+is available.
+"""
+
+import csv
+import hashlib
+import hmac
+import io
+import logging
+import os
+import secrets
+
+from mysql.connector import FieldType
+
+import metrics
+import sql_normalize
+from logs import log_event
+from sql_guard import is_timeout_error
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Arrow / Parquet export disabled
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Metadata key marking an Arrow / Parquet export cut off at max_rows; the value is max_rows
+TRUNCATED_KEY = 'export.truncated'
+
+# Rows per Parquet row group; fetched batches are held until a group is full
+EXPORT_PARQUET_ROW_GROUP = int(os.environ.get("EXPORT_PARQUET_ROW_GROUP", 100000))
+
+# format -> (mimetype, file extension, needs pyarrow)
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv', False),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows', True),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', True),
+}
+
+EXPORT_ROWS = metrics.REGISTRY.counter('app_export_rows_total', "Rows written by exports", ['format'])
+EXPORT_TRUNCATED = metrics.REGISTRY.counter('app_export_truncated_total', "Exports cut off at the row ceiling",
+                                            ['format'])
+EXPORT_ABORTED = metrics.REGISTRY.counter('app_export_aborted_total', "Exports that failed while streaming",
+                                          ['format'])
+
+# Signs the SQL /ask returns. Set it explicitly when several workers serve
+# /ask/export, otherwise each process only accepts tokens it issued itself.
+EXPORT_SIGNING_KEY = os.environ.get("EXPORT_SIGNING_KEY", "").encode('utf-8') or secrets.token_bytes(32)
+
+# Functions that read files, take locks, stall the server or describe it
+FORBIDDEN_FUNCTIONS = frozenset({
+    'LOAD_FILE', 'SLEEP', 'BENCHMARK', 'GET_LOCK', 'RELEASE_LOCK', 'RELEASE_ALL_LOCKS', 'IS_FREE_LOCK',
+    'IS_USED_LOCK', 'MASTER_POS_WAIT', 'SOURCE_POS_WAIT', 'WAIT_FOR_EXECUTED_GTID_SET',
+    'USER', 'CURRENT_USER', 'SESSION_USER', 'SYSTEM_USER', 'CURRENT_ROLE', 'DATABASE', 'SCHEMA', 'VERSION',
+    'CONNECTION_ID', 'SYS_EXEC', 'SYS_EVAL',
+})
+
+INT_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG, FieldType.INT24,
+             FieldType.YEAR, FieldType.BIT}
+FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL}
+DATE_TYPES = {FieldType.DATE, FieldType.NEWDATE}
+DATETIME_TYPES = {FieldType.DATETIME, FieldType.TIMESTAMP}
+# Columns that may come back as bytes
+BYTES_TYPES = {FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB, FieldType.BLOB,
+               FieldType.JSON, FieldType.GEOMETRY, FieldType.STRING, FieldType.VAR_STRING}
+
+
+class ExportError(ValueError):
+    """Raised for an export that cannot be produced (bad SQL, unavailable format)"""
+
+
+def check_format(fmt):
+    """Return the (mimetype, extension) of `fmt`; raises ExportError when unknown or unavailable"""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    mimetype, extension, needs_arrow = FORMATS[fmt]
+    if needs_arrow and pyarrow is None:
+        raise ExportError(f"{fmt} export needs pyarrow, which is not installed; use csv")
+    return mimetype, extension
+
+
+def sign_sql(sql):
+    """Export token for a statement this server issued"""
+    text = sql_normalize.parse(sql).sql
+    return hmac.new(EXPORT_SIGNING_KEY, text.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def verify_sql(sql, token):
+    """Whether `token` was issued by sign_sql() for `sql`"""
+    return isinstance(token, str) and hmac.compare_digest(sign_sql(sql), token)
+
+
+def check_export_sql(sql, tables, database):
+    """Normalized single SELECT over the app schema, else ExportError.
+
+    `tables` are the application's table names; a qualified name must be in `database`.
+    """
+    parsed = sql_normalize.parse(sql)
+    if parsed.statements != 1 or parsed.kind != 'SELECT':
+        raise ExportError("Only a single SELECT statement can be exported")
+    if parsed.has_into:
+        raise ExportError("SELECT ... INTO OUTFILE / DUMPFILE cannot be exported")
+    if parsed.has_variables:
+        raise ExportError("Queries reading or setting variables cannot be exported")
+    forbidden = [name for name in parsed.functions if name in FORBIDDEN_FUNCTIONS]
+    if forbidden:
+        raise ExportError(f"Function not allowed in exports: {', '.join(forbidden)}")
+    known = {table.lower() for table in tables}
+    for name in parsed.tables:
+        schema, _, table = name.rpartition('.')
+        if (schema and schema.lower() != database.lower()) or table.lower() not in known:
+            raise ExportError(f"Table not allowed in exports: {name}")
+    return parsed.sql
+
+
+def limited_batches(result, max_rows, fmt, state=None):
+    """Batches of `result`, stopping after `max_rows` rows; closes the result.
+
+    Sets state['truncated'] when rows were left out.
+    """
+    written = 0
+    try:
+        with result:
+            for batch in result.iter_batches():
+                if written + len(batch) > max_rows:
+                    batch = batch[:max_rows - written]
+                    written += len(batch)
+                    if batch:
+                        yield batch
+                    if state is not None:
+                        state['truncated'] = True
+                    EXPORT_TRUNCATED.inc((fmt,))
+                    log_event(logger, logging.WARNING, 'export.truncated', format=fmt, max_rows=max_rows)
+                    return
+                written += len(batch)
+                yield batch
+    finally:
+        EXPORT_ROWS.inc((fmt,), written)
+
+
+def _bytes_columns(result):
+    return [i for i, code in enumerate(result.type_codes or ()) if code in BYTES_TYPES]
+
+
+def _decode(row, indexes):
+    row = list(row)
+    for i in indexes:
+        if isinstance(row[i], (bytes, bytearray)):
+            row[i] = row[i].decode('utf-8', 'replace')
+    return row
+
+
+def csv_stream(result, max_rows):
+    """Header line, then one CSV chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    bytes_columns = _bytes_columns(result)
+
+    state = {'truncated': False}
+    writer.writerow(result.columns)
+    for batch in limited_batches(result, max_rows, 'csv', state):
+        if bytes_columns:
+            batch = [_decode(row, bytes_columns) for row in batch]
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if state['truncated']:
+        buffer.write(f"#TRUNCATED export stopped at {max_rows} rows\n")
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def arrow_type(type_code):
+    if type_code in INT_TYPES:
+        return pyarrow.int64()
+    if type_code in FLOAT_TYPES:
+        return pyarrow.float64()
+    if type_code in DATE_TYPES:
+        return pyarrow.date32()
+    if type_code in DATETIME_TYPES:
+        return pyarrow.timestamp('us')
+    if type_code == FieldType.TIME:
+        return pyarrow.duration('us')
+    return pyarrow.string()
+
+
+def arrow_schema(result):
+    type_codes = result.type_codes or [None] * len(result.columns)
+    return pyarrow.schema([(name, arrow_type(code)) for name, code in zip(result.columns, type_codes)])
+
+
+def to_record_batch(batch, schema, bytes_columns):
+    if bytes_columns:
+        batch = [_decode(row, bytes_columns) for row in batch]
+    columns = list(zip(*batch))
+    return pyarrow.record_batch([pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema)
+
+
+class _Pipe(io.RawIOBase):
+    """Write-only file that hands out whatever was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_stream(result, max_rows):
+    """Arrow IPC stream: the schema, then one record batch per fetched batch"""
+    schema = arrow_schema(result)
+    bytes_columns = _bytes_columns(result)
+    pipe = _Pipe()
+    state = {'truncated': False}
+    with pyarrow.ipc.new_stream(pipe, schema) as writer:
+        for batch in limited_batches(result, max_rows, 'arrow', state):
+            writer.write_batch(to_record_batch(batch, schema, bytes_columns))
+            yield pipe.drain()
+        if state['truncated']:
+            # The schema went out first, so the marker rides on an empty last batch
+            empty = pyarrow.record_batch([pyarrow.array([], type=field.type) for field in schema], schema=schema)
+            writer.write_batch(empty, custom_metadata={TRUNCATED_KEY: str(max_rows)})
+    yield pipe.drain()
+
+
+def parquet_stream(result, max_rows, row_group_rows=EXPORT_PARQUET_ROW_GROUP):
+    """Parquet file written a row group at a time; the footer goes out last"""
+    schema = arrow_schema(result)
+    bytes_columns = _bytes_columns(result)
+    pipe = _Pipe()
+    pending, pending_rows = [], 0
+    state = {'truncated': False}
+    with pyarrow.parquet.ParquetWriter(pipe, schema) as writer:
+        for batch in limited_batches(result, max_rows, 'parquet', state):
+            pending.append(to_record_batch(batch, schema, bytes_columns))
+            pending_rows += len(batch)
+            if pending_rows >= row_group_rows:
+                writer.write_table(pyarrow.Table.from_batches(pending, schema=schema))
+                pending, pending_rows = [], 0
+                yield pipe.drain()
+        if pending:
+            writer.write_table(pyarrow.Table.from_batches(pending, schema=schema))
+        if state['truncated']:
+            writer.add_key_value_metadata({TRUNCATED_KEY: str(max_rows)})
+    yield pipe.drain()
+
+
+WRITERS = {'csv': csv_stream, 'arrow': arrow_stream, 'parquet': parquet_stream}
+
+
+def stream(result, fmt, max_rows):
+    """Encoded chunks of `result` in `fmt`; empty chunks are skipped.
+
+    A failure after the first chunk (MAX_EXECUTION_TIME, lost connection) can no
+    longer become an error status: CSV gets a final `#ERROR` line, and the error
+    is re-raised so the chunked response ends without its terminating chunk and
+    clients see the download as incomplete.
+    """
+    try:
+        for chunk in WRITERS[fmt](result, max_rows):
+            if chunk:
+                yield chunk
+    except Exception as e:
+        reason = "the query exceeded its time limit" if is_timeout_error(e) else str(e)
+        EXPORT_ABORTED.inc((fmt,))
+        log_event(logger, logging.ERROR, 'export.aborted', format=fmt, error=str(e))
+        if fmt == 'csv':
+            yield f"#ERROR export incomplete: {reason}\n".encode('utf-8')
+        raise
@@ -0,0 +1,111 @@
+"""
+Intent router that answers common questions without the LLM.
+
+Questions like "total revenue", "top 5 selling products" or "orders by
+status" are things the analytics endpoints already compute. Each Intent
+pairs a few regular expressions (matched against the normalized question)
+with an answer function that returns (columns, rows) from pre-validated,
+parameterized SQL or the analytics cache. Anything that does not match
+falls through to Gemini. The router keeps hit counts and timings so the
+latency it saves can be reported.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+from logs import log_event
+from question_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Filler people put in front of a question ("what is the", "show me all"...)
+ASK = r"(?:(?:what|which) (?:is|are|were) |whats |what s |show(?: me)? |give me |tell me |list |get |find |how much is )?(?:the |our |all |all the |my )?"
+
+Intent = namedtuple('Intent', [
+    'name',      # reported in responses and stats
+    'patterns',  # regexes matched in full against the normalized question; named groups become params
+    'answer',    # callable(**params) -> (columns, rows)
+])
+
+
+def intent(name, patterns, answer):
+    """Build an Intent, prefixing every pattern with the optional question filler"""
+    return Intent(name, [re.compile(ASK + pattern) for pattern in patterns], answer)
+
+
+class FastPathRouter:
+    """Matches questions to intents and tracks what skipping the LLM saved.
+
+    Args:
+        intents (list): Intent tuples, tried in order
+    """
+
+    def __init__(self, intents):
+        self.intents = list(intents)
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = Counter()
+        self._errors = 0
+        self._fast_ms = 0.0
+        self._slow_requests = 0
+        self._slow_ms = 0.0
+
+    def match(self, question):
+        """Return (intent, params) for the first matching intent, else None"""
+        text = normalize_question(question)
+        for candidate in self.intents:
+            for pattern in candidate.patterns:
+                found = pattern.fullmatch(text)
+                if found:
+                    params = {k: v for k, v in found.groupdict().items() if v is not None}
+                    return candidate, params
+        return None
+
+    def answer(self, question):
+        """Return (intent name, columns, rows) when an intent answers the question, else None"""
+        started = time.perf_counter()
+        matched = self.match(question)
+        with self._lock:
+            self._lookups += 1
+        if matched is None:
+            return None
+
+        found, params = matched
+        try:
+            columns, rows = found.answer(**params)
+        except Exception as e:
+            # Let the LLM path have a go rather than fail the question
+            log_event(logger, logging.WARNING, 'fast_path.failed', intent=found.name, error=str(e))
+            with self._lock:
+                self._errors += 1
+            return None
+
+        with self._lock:
+            self._hits[found.name] += 1
+            self._fast_ms += (time.perf_counter() - started) * 1000
+        return found.name, columns, rows
+
+    def record_slow_path(self, elapsed_ms):
+        """Record how long a question that went to the LLM took end to end"""
+        with self._lock:
+            self._slow_requests += 1
+            self._slow_ms += elapsed_ms
+
+    def stats(self):
+        with self._lock:
+            hits = sum(self._hits.values())
+            avg_fast = self._fast_ms / hits if hits else 0.0
+            avg_slow = self._slow_ms / self._slow_requests if self._slow_requests else None
+            return {
+                'lookups': self._lookups,
+                'hits': hits,
+                'hit_rate': round(hits / self._lookups, 4) if self._lookups else 0.0,
+                'hits_by_intent': dict(self._hits),
+                'errors': self._errors,
+                'avg_fast_path_ms': round(avg_fast, 2),
+                'avg_llm_path_ms': round(avg_slow, 2) if avg_slow is not None else None,
+                'saved_ms_est': round(hits * (avg_slow - avg_fast), 1) if avg_slow is not None else None,
+            }
@@ -0,0 +1,80 @@
+"""
+JSON encoding for API responses.
+
+Query results are full of Decimal, date and datetime values. Instead of
+walking every payload to convert them before serializing, the encoder
+handles them itself in the same pass: Decimal becomes a float, dates and
+datetimes ISO 8601 strings. orjson is used when it is installed (it
+encodes dates natively and calls back only for Decimal), otherwise the
+stdlib encoder with the same output.
+"""
+
+import datetime
+import decimal
+import json
+import os
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+# "auto" picks orjson when available; "stdlib" forces the json module
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+
+def encode_default(obj):
+    """Fallback for values the JSON backend cannot encode by itself"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        # MySQL TIME columns come back as timedelta
+        return obj.total_seconds()
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode('utf-8', 'replace')
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def use_orjson(backend=None):
+    backend = backend or JSON_BACKEND
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+    return orjson is not None and backend in ('auto', 'orjson')
+
+
+def dumps_bytes(obj, backend=None):
+    """Serialize to UTF-8 encoded JSON bytes"""
+    if use_orjson(backend):
+        return orjson.dumps(obj, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=encode_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj, backend=None):
+    """Serialize to a JSON string"""
+    if use_orjson(backend):
+        return dumps_bytes(obj, backend).decode('utf-8')
+    return json.dumps(obj, default=encode_default, ensure_ascii=False, separators=(',', ':'))
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider (`jsonify`, `request.json`) backed by `dumps_bytes`"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if use_orjson():
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,181 @@
+"""
+Server push for the analytics dashboard.
+
+One producer thread per process polls the table watermarks (the same
+probe the analytics cache uses) and recomputes a section only when one of
+its source tables moved, the day rolled over, or `max_age` passed (which
+bounds staleness for in-place updates the watermarks cannot see). A
+section whose data actually changed is pushed to every subscriber as a
+delta, so the database sees the same load for one open dashboard as for a
+hundred, and none at all while nobody is watching.
+
+Each subscriber holds at most one pending payload per section: a slow
+client that misses several updates of a section only receives the latest
+one, so memory per subscriber is bounded.
+"""
+
+import logging
+import threading
+import time
+from datetime import date
+
+from logs import log_event
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    def __init__(self, names):
+        self.names = names
+        self.pending = {}   # section name -> (version, data)
+
+
+class LiveDashboard:
+    """Recompute dashboard sections on watermark changes and fan them out to subscribers.
+
+    Args:
+        sections (dict): Section name -> (fetch callable, tuple of source table names)
+        watermarks (callable): Returns a dict of table name -> watermark, or None if unavailable
+        interval (float): Seconds between producer passes while anyone is subscribed
+        max_age (float): Seconds after which a section is recomputed even if its watermarks did not move
+        keepalive (float): Seconds of silence after which a subscriber stream yields a keepalive
+    """
+
+    def __init__(self, sections, watermarks, interval=2.0, max_age=60.0, keepalive=15.0):
+        self.sections = sections
+        self._watermarks = watermarks
+        self.interval = interval
+        self.max_age = max_age
+        self.keepalive = keepalive
+
+        self._cond = threading.Condition()
+        self._subscribers = set()
+        self._state = {}   # name -> (key, data, computed_at, version)
+        self._version = 0
+        self._thread = None
+
+        self._ticks = 0
+        self._probe_failures = 0
+        self._recomputes = 0
+        self._unchanged = 0
+        self._published = 0
+        self._deliveries = 0
+        self._coalesced = 0
+        self._errors = 0
+
+    def start(self):
+        """Run the producer in a daemon thread; it idles while there are no subscribers"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='live-dashboard')
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._subscribers)
+            try:
+                self.tick()
+            except Exception as e:
+                log_event(logger, logging.WARNING, 'live.tick_failed', error=str(e))
+            time.sleep(self.interval)
+
+    def tick(self):
+        """One producer pass; returns the names of the sections that were published"""
+        with self._cond:
+            self._ticks += 1
+            wanted = set().union(*(sub.names for sub in self._subscribers)) if self._subscribers else set()
+        with span('live.watermarks'):
+            marks = self._watermarks()
+        if marks is None:
+            with self._cond:
+                self._probe_failures += 1
+            return []
+
+        today = date.today().isoformat()
+        published = []
+        for name, (fetch, sources) in self.sections.items():
+            if name not in wanted:
+                continue
+            key = (tuple(marks.get(table) for table in sources), today)
+            previous = self._state.get(name)
+            if previous is not None and previous[0] == key and time.monotonic() - previous[2] < self.max_age:
+                continue
+            try:
+                with span(f'live.{name}'):
+                    data = fetch()
+            except Exception as e:
+                with self._cond:
+                    self._errors += 1
+                log_event(logger, logging.WARNING, 'live.section_failed', section=name, error=str(e))
+                continue
+            with self._cond:
+                self._recomputes += 1
+                if previous is not None and previous[1] == data:
+                    self._unchanged += 1
+                    self._state[name] = (key, data, time.monotonic(), previous[3])
+                    continue
+                self._version += 1
+                self._state[name] = (key, data, time.monotonic(), self._version)
+                self._publish(name, self._version, data)
+            published.append(name)
+        return published
+
+    def _publish(self, name, version, data):
+        # Called with self._cond held
+        self._published += 1
+        for sub in self._subscribers:
+            if name in sub.names:
+                if name in sub.pending:
+                    self._coalesced += 1
+                sub.pending[name] = (version, data)
+        self._cond.notify_all()
+
+    def subscribe(self, names=None):
+        """Register a subscriber; returns it with the current snapshot of its sections"""
+        sub = _Subscriber(frozenset(names or self.sections))
+        with self._cond:
+            snapshot = {name: state[1] for name, state in self._state.items() if name in sub.names}
+            self._subscribers.add(sub)
+            self._cond.notify_all()
+            return sub, {'version': self._version, 'sections': snapshot}
+
+    def unsubscribe(self, sub):
+        with self._cond:
+            self._subscribers.discard(sub)
+
+    def events(self, names=None):
+        """Yield ('snapshot', ...), then ('section', ...) per update; (None, None) is a keepalive"""
+        sub, snapshot = self.subscribe(names)
+        try:
+            yield 'snapshot', snapshot
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: sub.pending, timeout=self.keepalive)
+                    pending, sub.pending = sub.pending, {}
+                    self._deliveries += len(pending)
+                if not pending:
+                    yield None, None
+                    continue
+                for name, (version, data) in sorted(pending.items(), key=lambda item: item[1][0]):
+                    yield 'section', {'name': name, 'version': version, 'data': data}
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self):
+        """Producer and fan-out counters for monitoring"""
+        with self._cond:
+            return {
+                'subscribers': len(self._subscribers),
+                'sections': len(self._state),
+                'version': self._version,
+                'ticks': self._ticks,
+                'probe_failures': self._probe_failures,
+                'recomputes': self._recomputes,
+                'unchanged': self._unchanged,
+                'published': self._published,
+                'deliveries': self._deliveries,
+                'coalesced': self._coalesced,
+                'errors': self._errors,
+            }
@@ -0,0 +1,122 @@
+"""
+Structured, leveled logging off the request path.
+
+Records go through a QueueHandler on the root logger; a QueueListener
+thread formats and writes them, so a slow stdout or log collector never
+blocks a request. Events are a name plus key=value fields:
+
+    log_event(logger, logging.INFO, 'sql_guard.decision', allowed=True, est_rows=120)
+
+Fields are only built when the level is enabled, and are cut to a bounded
+size (`brief`), so a large result or model reply costs a few hundred
+characters, not its full repr. Per-request debug payloads (questions, SQL,
+replies) go through `log_payload`, which additionally samples them at
+LOG_SAMPLE_RATE.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+from json_encoding import dumps as json_dumps
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# text: "time LEVEL logger event key=value ...", json: one object per line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+# Longest string kept in a field, and most list/dict items kept
+LOG_PAYLOAD_CHARS = int(os.environ.get("LOG_PAYLOAD_CHARS", 500))
+LOG_PAYLOAD_ITEMS = int(os.environ.get("LOG_PAYLOAD_ITEMS", 5))
+# Fraction of log_payload events that are written
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1.0))
+
+
+def brief(value, limit=LOG_PAYLOAD_CHARS, items=LOG_PAYLOAD_ITEMS):
+    """Bounded copy of a field value; only the kept part is ever rendered"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= limit else f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if isinstance(value, (list, tuple)):
+        kept = [brief(v, limit, items) for v in value[:items]]
+        if len(value) > items:
+            kept.append(f"...(+{len(value) - items} more)")
+        return kept
+    if isinstance(value, dict):
+        kept = {str(k): brief(v, limit, items) for k, v in list(value.items())[:items]}
+        if len(value) > items:
+            kept['...'] = f"+{len(value) - items} more"
+        return kept
+    return brief(str(value), limit, items)
+
+
+def log_event(logger, level, event, untrimmed=(), **fields):
+    """Log `event` with key=value fields, building nothing when `level` is disabled.
+
+    Fields named in `untrimmed` are written whole instead of through brief().
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': {k: v if k in untrimmed else brief(v) for k, v in fields.items()}})
+
+
+def log_payload(logger, event, **fields):
+    """Debug event carrying request payloads, sampled at LOG_SAMPLE_RATE"""
+    if logger.isEnabledFor(logging.DEBUG) and (LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE):
+        logger.debug(event, extra={'fields': {k: brief(v) for k, v in fields.items()}})
+
+
+def _text_value(value):
+    if isinstance(value, str) and value and not any(c in value for c in ' "=\n'):
+        return value
+    return json_dumps(value)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as text key=value lines or JSON objects"""
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if self.json_lines:
+            return json_dumps(entry)
+        head = f"{entry.pop('ts')} {entry.pop('level'):<7} {entry.pop('logger')} {entry.pop('event')}"
+        return " ".join([head] + [f"{key}={_text_value(value)}" for key, value in entry.items()])
+
+
+_listener = None
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """Route the root logger through a background queue listener (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(StructuredFormatter(json_lines=(fmt == 'json')))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on shutdown
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,245 @@
+"""
+Request tracing and Prometheus metrics.
+
+`span(name)` times one step of a request (a query, the Gemini call, answer
+formatting...). Every span feeds a latency histogram and, when it runs
+inside a request, is added to that request's trace so slow requests can be
+logged with their full breakdown. The trace lives in a ContextVar, so work
+handed to a thread pool through `contextvars.copy_context().run` keeps
+reporting into the request that started it.
+
+Metrics are kept in-process and rendered in the Prometheus text format by
+`REGISTRY.render()`; stats() dicts of other components (pool, caches) are
+exported as gauges at scrape time.
+"""
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from logs import log_event
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans range from sub-millisecond cache hits to multi-second model calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = [f'le="{bound}"']
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                le = ['le="+Inf"']
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Counters and histograms plus stats() callables exported as gauges"""
+
+    def __init__(self):
+        self._metrics = []
+        self._stats = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix, stats):
+        """Export every numeric value of `stats()` as gauge app_<prefix>_<key>"""
+        self._stats.append((prefix, stats))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, stats in self._stats:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"app_{prefix}_{key}"
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+SPAN_SECONDS = REGISTRY.histogram('app_span_duration_seconds', "Time spent in each request pipeline step", ['span'])
+SPAN_ERRORS = REGISTRY.counter('app_span_errors_total', "Pipeline steps that raised", ['span'])
+REQUEST_SECONDS = REGISTRY.histogram('app_http_request_duration_seconds', "HTTP request latency, streaming included",
+                                     ['endpoint', 'method'])
+REQUESTS = REGISTRY.counter('app_http_requests_total', "HTTP requests by status", ['endpoint', 'method', 'status'])
+REQUEST_ERRORS = REGISTRY.counter('app_http_request_errors_total', "HTTP requests answered with a 5xx", ['endpoint'])
+
+
+class Trace:
+    """Spans recorded during one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []   # (name, offset_ms, duration_ms, failed)
+
+    def add(self, name, start, elapsed, failed):
+        self.spans.append((name, round((start - self.started) * 1000, 2), round(elapsed * 1000, 2), failed))
+
+    def breakdown(self):
+        return " ".join(
+            f"{name}={duration}ms@{offset}{'!' if failed else ''}"
+            for name, offset, duration, failed in sorted(self.spans, key=lambda s: s[1])
+        )
+
+
+_trace = ContextVar('trace', default=None)
+
+
+def current_trace():
+    return _trace.get()
+
+
+class Span:
+    """Handle yielded by span(); set `failed` for errors the block handles itself"""
+
+    def __init__(self, name):
+        self.name = name
+        self.failed = False
+
+
+@contextmanager
+def span(name):
+    """Time a block as pipeline step `name`"""
+    start = time.perf_counter()
+    current = Span(name)
+    try:
+        yield current
+    except GeneratorExit:
+        # A streamed response closed early; not a failure of the step
+        raise
+    except BaseException:
+        current.failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe((name,), elapsed)
+        if current.failed:
+            SPAN_ERRORS.inc((name,))
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, start, elapsed, current.failed)
+
+
+def timed(name):
+    """Decorator form of span() for plain (non-generator) functions"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_app(app, slow_request_ms=0):
+    """Trace every request of a Flask app and record its latency.
+
+    Timing stops when the response is closed, so streamed responses count
+    their whole body. Requests slower than `slow_request_ms` (0 disables)
+    are logged as a `request.slow` warning with their span breakdown.
+    """
+    from flask import request
+
+    @app.before_request
+    def start_trace():
+        _trace.set(Trace())
+
+    @app.after_request
+    def finish_trace(response):
+        trace = _trace.get()
+        if trace is None:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        method = request.method
+        status = response.status_code
+
+        def finish():
+            elapsed = time.perf_counter() - trace.started
+            REQUEST_SECONDS.observe((endpoint, method), elapsed)
+            REQUESTS.inc((endpoint, method, str(status)))
+            if status >= 500:
+                REQUEST_ERRORS.inc((endpoint,))
+            if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+                # The whole breakdown is the point of this event, it is not cut down
+                log_event(logger, logging.WARNING, 'request.slow', untrimmed=('spans',),
+                          method=method, endpoint=endpoint, status=status,
+                          ms=round(elapsed * 1000, 1), spans=trace.breakdown())
+
+        response.call_on_close(finish)
+        return response
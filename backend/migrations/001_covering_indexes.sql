@@ -0,0 +1,45 @@
+-- Covering indexes for the paged analytics queries.
+--
+-- Every paged query (limit / cursor / from / to on the analytics endpoints)
+-- can then be answered from index entries alone, without reading table rows.
+-- The keyset cursor turns each page into a seek instead of an OFFSET scan
+-- for the row listings (sales trend, low stock). The aggregate listings (top
+-- products, top customers, product ratings) filter on the cursor in HAVING,
+-- so every page still recomputes the whole GROUP BY; the indexes make that
+-- an index scan, but deep pages cost as much as the first, not less.
+--
+-- Run once against the application database:
+--     mysql -u root -p online_store < backend/migrations/001_covering_indexes.sql
+-- The indexes are built online (INPLACE, LOCK=NONE), so reads and writes continue.
+
+-- Sales trend: range on order_date, filter on status, sum of total_amount.
+-- order_date leads because it is the range; a leading `status != 'Cancelled'`
+-- would be a range too and leave order_date unusable for seeking.
+ALTER TABLE orders
+    ADD INDEX idx_orders_date_status_amount (order_date, status, total_amount),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Top customers: orders grouped per user, optionally within a date range
+ALTER TABLE orders
+    ADD INDEX idx_orders_user_status_date_amount (user_id, status, order_date, total_amount),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Top products: items reached from (date-filtered) orders, summed per variant
+ALTER TABLE order_items
+    ADD INDEX idx_order_items_order_variant_qty_price (order_id, variant_id, quantity, price),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Product ratings: reviews per product, optionally within a date range
+ALTER TABLE reviews
+    ADD INDEX idx_reviews_product_created_rating (product_id, created_at, rating),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Rating distribution within a date range
+ALTER TABLE reviews
+    ADD INDEX idx_reviews_created_rating (created_at, rating),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Already covering, no change needed:
+--   low stock:            inventory.idx_quantity (quantity), which carries the variant_id primary key
+--   variants per product: product_variants.idx_product (product_id), which carries variant_id
+--   customer acquisition: users.idx_created_at (created_at)
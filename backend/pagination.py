@@ -0,0 +1,110 @@
+"""
+Keyset pagination and date ranges for the analytics endpoints.
+
+Pages are addressed by an opaque cursor holding the sort key of the last
+row served, and the next page seeks past it with a row comparison such as
+`(total_sold, product_id) < (%s, %s)`. Unlike OFFSET, the database never
+reads and throws away the rows of earlier pages, so page 50 costs what
+page 1 does, and rows inserted meanwhile do not shift the pages.
+"""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+MAX_PAGE_LIMIT = 500
+
+PageArgs = namedtuple('PageArgs', ['limit', 'cursor', 'start', 'end'])
+
+
+class PageArgError(ValueError):
+    """Invalid limit / cursor / from / to query parameter"""
+
+
+def encode_cursor(values):
+    """Opaque cursor for a row's sort key"""
+    plain = [str(v) if isinstance(v, Decimal) else v.isoformat() if isinstance(v, date) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(plain, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Sort key values from a cursor made by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise PageArgError("Invalid cursor")
+    if (not isinstance(values, list) or len(values) != size
+            or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values)):
+        raise PageArgError("Invalid cursor")
+    return tuple(values)
+
+
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise PageArgError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def parse_page_args(args, default_limit, cursor_size, dates=True, max_limit=MAX_PAGE_LIMIT):
+    """Validate `limit`, `cursor`, `from` and `to` from a request's query string"""
+    raw_limit = args.get('limit')
+    if raw_limit is None:
+        limit = default_limit
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise PageArgError("'limit' must be an integer")
+        if not 1 <= limit <= max_limit:
+            raise PageArgError(f"'limit' must be between 1 and {max_limit}")
+
+    cursor = decode_cursor(args['cursor'], cursor_size) if args.get('cursor') else None
+
+    start = end = None
+    if not dates and (args.get('from') or args.get('to')):
+        raise PageArgError("This endpoint does not take 'from' / 'to'")
+    if args.get('from'):
+        start = parse_date(args['from'], 'from')
+    if args.get('to'):
+        end = parse_date(args['to'], 'to')
+    if start and end and start > end:
+        raise PageArgError("'from' must not be after 'to'")
+
+    return PageArgs(limit, cursor, start, end)
+
+
+def date_range_conditions(column, start, end):
+    """Sargable conditions and params for an inclusive date range on `column`"""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} < %s")
+        params.append(end + timedelta(days=1))
+    return conditions, params
+
+
+def where_clause(conditions):
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def keyset_condition(columns, cursor, descending=True):
+    """Row comparison seeking past `cursor` in (columns) order, or None on the first page"""
+    if cursor is None:
+        return None, []
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"({', '.join(columns)}) {'<' if descending else '>'} ({placeholders})", list(cursor)
+
+
+def split_page(rows, limit, key):
+    """Trim a LIMIT limit+1 result to a page; returns (rows, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
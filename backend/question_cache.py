@@ -0,0 +1,170 @@
+"""
+Question -> answer cache for the /ask pipeline.
+
+Repeated questions skip the Gemini round trip: the validated SQL (or the
+conversational reply) is stored under a normalized form of the question,
+in a small SQLite file so entries survive restarts and are shared by
+every worker on the host. An in-memory LRU in front of it answers hits
+without touching SQLite; an entry is checked against its row again once
+it is `revalidate` seconds old, so a purge or eviction by another worker
+shows up within that time. Writes prune expired rows and keep at most
+`max_stored` of them.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Puts between two prunes of the SQLite table
+PRUNE_EVERY = 64
+
+# Sentence punctuation that never changes what is being asked. Comparison
+# operators, currency and percent signs stay, they change the query.
+_PUNCTUATION = re.compile(r"[!?;:\"'`()\[\]{}]|(?<!\d)[.,]|[.,](?!\d)")
+
+
+def normalize_question(question):
+    """Case-fold, drop sentence punctuation and collapse whitespace"""
+    text = unicodedata.normalize('NFKC', question).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return " ".join(text.split())
+
+
+class QuestionCache:
+    """LRU + SQLite cache of answers keyed by normalized question.
+
+    Args:
+        path (str): SQLite file for the persistent store (":memory:" for none)
+        ttl (float): Seconds an answer stays valid (0 disables the cache)
+        max_entries (int): Size of the in-memory LRU in front of SQLite
+        max_stored (int): Rows kept in SQLite, oldest pruned first (0 for no bound)
+        revalidate (float): Seconds a memory entry is served before its row is checked again
+    """
+
+    def __init__(self, path, ttl=86400.0, max_entries=1024, max_stored=100000, revalidate=5.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_stored = max_stored
+        self.revalidate = revalidate
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (kind, payload, created_at, checked_at)
+        self._hits = 0
+        self._misses = 0
+        self._puts = 0
+        self._pruned = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS question_cache (
+                question TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS question_cache_created ON question_cache (created_at)")
+        self._db.commit()
+        with self._lock:
+            self._prune()
+
+    def get(self, question):
+        """Return (kind, payload) for a fresh cached answer, else None"""
+        if not self.ttl:
+            return None
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and time.monotonic() - entry[3] >= self.revalidate:
+                # Another worker may have purged or replaced the row since it was read
+                self._memory.pop(key)
+                entry = None
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT kind, payload, created_at FROM question_cache WHERE question = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = tuple(row) + (time.monotonic(),)
+                    self._remember(key, entry)
+            if entry is not None and now - entry[2] < self.ttl:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return entry[0], entry[1]
+            if entry is not None:
+                self._forget(key)
+            self._misses += 1
+            return None
+
+    def put(self, question, kind, payload):
+        """Store an answer; `kind` is 'sql' or 'text'"""
+        if not self.ttl:
+            return
+        key = normalize_question(question)
+        row = (kind, payload, time.time())
+        with self._lock:
+            self._remember(key, row + (time.monotonic(),))
+            self._db.execute(
+                "INSERT OR REPLACE INTO question_cache (question, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+                (key,) + row
+            )
+            self._db.commit()
+            self._puts += 1
+            if self._puts % PRUNE_EVERY == 0:
+                self._prune()
+
+    def evict(self, question):
+        """Drop the answer for one question, e.g. cached SQL that no longer runs"""
+        with self._lock:
+            self._forget(normalize_question(question))
+
+    def purge(self):
+        """Remove every cached answer; returns how many were stored"""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM question_cache").rowcount
+            self._db.commit()
+            self._memory.clear()
+            return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            stored = self._db.execute("SELECT COUNT(*) FROM question_cache").fetchone()[0]
+            return {
+                'entries': stored,
+                'memory_entries': len(self._memory),
+                'ttl_seconds': self.ttl,
+                'pruned': self._pruned,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self):
+        """Delete expired rows, then the oldest beyond max_stored"""
+        removed = 0
+        if self.ttl:
+            removed += self._db.execute(
+                "DELETE FROM question_cache WHERE created_at <= ?", (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_stored:
+            removed += self._db.execute(
+                "DELETE FROM question_cache WHERE question IN "
+                "(SELECT question FROM question_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_stored,)
+            ).rowcount
+        self._db.commit()
+        self._pruned += removed
+
+    def _forget(self, key):
+        self._memory.pop(key, None)
+        self._db.execute("DELETE FROM question_cache WHERE question = ?", (key,))
+        self._db.commit()
@@ -0,0 +1,359 @@
+"""
+Deadline, retry, hedging and circuit breaking for calls to a remote model.
+
+`ResilientCaller.call(fn, *args)` runs `fn` on a worker thread and gives up
+waiting after a fixed deadline, so a hung request never ties up the caller.
+Within the deadline:
+
+- a failed attempt is retried (at most `attempts` times) after an
+  exponential backoff with full jitter, if `retryable(error)` says so;
+- when hedging is on, an attempt still running after the p95 of recent
+  successful latencies gets a second identical request, and whichever
+  answers first wins;
+- a circuit breaker counts consecutive failed calls and, once open,
+  rejects calls immediately for `reset_seconds`, then lets a single probe
+  through to decide whether to close again.
+
+`ResilientCaller.stream(fn, *args)` iterates a streaming call on a worker
+thread instead, with a deadline on the first chunk and on each gap between
+chunks. Streams are not retried or hedged (chunks may already be out), but
+their failures count against the same breaker.
+
+Abandoned attempts keep running on their thread until the client's own
+HTTP timeout ends them; their result is discarded.
+"""
+
+import contextvars
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+ATTEMPTS = metrics.REGISTRY.counter('app_resilience_attempts_total', "Model call attempts by outcome",
+                                    ['caller', 'outcome'])
+
+
+# Marks the end of a stream on the chunk queue
+_END = object()
+
+
+class ModelUnavailable(Exception):
+    """The call did not produce an answer: deadline exceeded, retries exhausted or circuit open"""
+
+
+class CircuitOpen(ModelUnavailable):
+    """Rejected without calling, the breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; one probe is let through after `reset_seconds`
+
+    Args:
+        failure_threshold (int): Consecutive failed calls that open the circuit (0 disables the breaker)
+        reset_seconds (float): Time the circuit stays open before a probe is allowed
+        probe_timeout (float): Seconds after which a probe that never reported back is replaced
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0, probe_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self._state
+
+    def allow(self):
+        """Whether a call may go out now; a half-open circuit admits exactly one probe"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            probe_lost = self._state == self.HALF_OPEN and time.monotonic() - self._probe_at >= self.probe_timeout
+            if state == self.HALF_OPEN and (self._state == self.OPEN or probe_lost):
+                # Claim the probe; everyone else keeps failing fast until it reports back
+                self._state = self.HALF_OPEN
+                self._probe_at = time.monotonic()
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_abandoned(self):
+        """The call ended without telling whether the model is healthy; a probe goes back to open"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                # Still past reset_seconds, so the next call becomes the probe
+                self._state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                    self.failure_threshold and self._failures >= self.failure_threshold and self._state == self.CLOSED):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._opened += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'opened': self._opened,
+                'rejected': self._rejected,
+            }
+
+
+class LatencyWindow:
+    """Recent successful latencies, for the hedging delay"""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    """Runs a blocking call under a deadline with retries, optional hedging and a circuit breaker.
+
+    Args:
+        name (str): Label for counters and stats
+        deadline (float): Seconds the caller waits in total, across retries and hedges
+        attempts (int): Attempts per call, including the first (hedges are not counted)
+        backoff (float): Base backoff in seconds; attempt n sleeps uniform(0, backoff * 2**n)
+        hedge (bool): Send a second request when an attempt outlives the p95 latency
+        hedge_min_delay (float): Lower bound of the hedging delay, in seconds
+        hedge_min_samples (int): Successful calls observed before hedging starts
+        retryable (callable): error -> whether it is worth another attempt (and counts against the breaker)
+        breaker (CircuitBreaker): Shared breaker, or None for no circuit breaking
+        max_workers (int): Threads available to attempts in flight (hung ones included)
+    """
+
+    def __init__(self, name, deadline=20.0, attempts=3, backoff=0.25, hedge=False, hedge_min_delay=0.5,
+                 hedge_min_samples=20, retryable=lambda error: True, breaker=None, max_workers=32):
+        self.name = name
+        self.deadline = deadline
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.retryable = retryable
+        self.breaker = breaker
+        self.latency = LatencyWindow()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._counts = {'calls': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'hedges': 0,
+                        'hedge_wins': 0, 'deadline_exceeded': 0, 'rejected': 0}
+
+    def _count(self, key, outcome=None):
+        with self._lock:
+            self._counts[key] += 1
+        if outcome:
+            ATTEMPTS.inc((self.name, outcome))
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while hedging is off or unwarmed"""
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(0.95))
+
+    def _submit(self, fn, args, kwargs):
+        started = time.monotonic()
+        future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        future.started = started
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs), or ModelUnavailable when no attempt answers in time"""
+        self._count('calls')
+        if self.breaker is not None and not self.breaker.allow():
+            self._count('rejected', 'rejected')
+            raise CircuitOpen(f"{self.name} circuit is open")
+
+        try:
+            value = self._call(fn, args, kwargs)
+        except ModelUnavailable:
+            self._count('failed')
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        except Exception:
+            # Not retryable: our request was bad, the model is not unhealthy
+            self._count('failed')
+            if self.breaker is not None:
+                self.breaker.record_success()
+            raise
+        self._count('succeeded')
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return value
+
+    def stream(self, fn, *args, first_chunk=None, between_chunks=None, **kwargs):
+        """Chunks of fn(*args, **kwargs), or ModelUnavailable when one is late.
+
+        `first_chunk` and `between_chunks` are seconds to wait for the first
+        chunk and for each one after it; both default to the deadline.
+        """
+        self._count('calls')
+        if self.breaker is not None and not self.breaker.allow():
+            self._count('rejected', 'rejected')
+            raise CircuitOpen(f"{self.name} circuit is open")
+
+        chunks = queue.Queue()
+        abandoned = threading.Event()
+
+        def produce():
+            try:
+                for chunk in fn(*args, **kwargs):
+                    if abandoned.is_set():
+                        return
+                    chunks.put((chunk, None))
+            except Exception as error:
+                chunks.put((_END, error))
+            else:
+                chunks.put((_END, None))
+
+        self._submit(produce, (), {})
+        timeout = first_chunk or self.deadline
+        delivered = 0
+        try:
+            while True:
+                try:
+                    chunk, error = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    self._count('deadline_exceeded', 'deadline')
+                    raise ModelUnavailable(f"{self.name} sent nothing for {timeout:g}s") from None
+                if chunk is _END:
+                    break
+                yield chunk
+                delivered += 1
+                timeout = between_chunks or self.deadline
+        except ModelUnavailable:
+            self._count('failed')
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        except GeneratorExit:
+            # The consumer went away (a client disconnect); a held probe must still be released
+            if self.breaker is not None:
+                if delivered:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_abandoned()
+            raise
+        finally:
+            abandoned.set()
+
+        if error is not None:
+            self._count('failed')
+            if self.retryable(error):
+                ATTEMPTS.inc((self.name, 'error'))
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+            else:
+                ATTEMPTS.inc((self.name, 'fatal'))
+                if self.breaker is not None:
+                    self.breaker.record_success()
+            raise error
+        ATTEMPTS.inc((self.name, 'ok'))
+        self._count('succeeded')
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _call(self, fn, args, kwargs):
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+        for attempt in range(self.attempts):
+            if attempt:
+                pause = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                if time.monotonic() + pause >= deadline:
+                    break
+                time.sleep(pause)
+                self._count('retries')
+
+            pending = {self._submit(fn, args, kwargs)}
+            hedge_at = self.hedge_delay()
+            hedged = False
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._count('deadline_exceeded', 'deadline')
+                    raise ModelUnavailable(f"{self.name} gave no answer within {self.deadline:g}s") from last_error
+                timeout = remaining
+                if hedge_at is not None and not hedged:
+                    timeout = min(timeout, max(0.0, hedge_at - (time.monotonic() - min(f.started for f in pending))))
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        self.latency.add(time.monotonic() - future.started)
+                        ATTEMPTS.inc((self.name, 'ok'))
+                        if getattr(future, 'hedge', False):
+                            self._count('hedge_wins')
+                        return future.result()
+                    last_error = error
+                    if not self.retryable(error):
+                        ATTEMPTS.inc((self.name, 'fatal'))
+                        raise error
+                    ATTEMPTS.inc((self.name, 'error'))
+
+                if not done and hedge_at is not None and not hedged and pending:
+                    hedged = True
+                    future = self._submit(fn, args, kwargs)
+                    future.hedge = True
+                    pending.add(future)
+                    self._count('hedges', 'hedge')
+
+        raise ModelUnavailable(f"{self.name} failed after {self.attempts} attempts: {last_error}") from last_error
+
+    def stats(self):
+        """Attempt, hedge and breaker counters for monitoring"""
+        with self._lock:
+            stats = dict(self._counts)
+        p95 = self.latency.percentile(0.95)
+        stats['latency_p95_ms'] = round(p95 * 1000, 2) if p95 is not None else 0.0
+        delay = self.hedge_delay()
+        stats['hedge_delay_ms'] = round(delay * 1000, 2) if delay is not None else 0.0
+        if self.breaker is not None:
+            stats.update({f'breaker_{key}': value for key, value in self.breaker.stats().items()})
+            stats['breaker_open'] = int(stats['breaker_state'] != CircuitBreaker.CLOSED)
+        return stats
@@ -0,0 +1,415 @@
+"""
+Daily rollup tables for the sales, product and category analytics.
+
+get_sales_trend, get_top_products and get_category_performance join orders,
+order_items, product_variants and products over all history. The rollups
+keep per-day aggregates instead, so those endpoints read a few rows per day.
+
+Maintenance is incremental: `refresh` only recomputes the days touched by
+orders newer than the stored order_id watermark, plus the days of recent
+orders whose status or amount changed (e.g. cancellations), detected against
+a snapshot of orders inside a lookback window.
+
+Usage (from backend/):
+    python rollups.py backfill              # rebuild every rollup from scratch
+    python rollups.py refresh [--every 60]  # incremental refresh (once, or in a loop)
+    python rollups.py verify                # compare rollups with the raw tables
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+from db import get_pool
+
+# Days of recent orders whose status/amount changes are tracked
+ROLLUP_LOOKBACK_DAYS = int(os.environ.get("ROLLUP_LOOKBACK_DAYS", 90))
+
+SCHEMA_SQL = [
+    """CREATE TABLE IF NOT EXISTS rollup_daily_sales (
+        day DATE PRIMARY KEY,
+        orders INT NOT NULL,
+        revenue DECIMAL(14,2) NOT NULL,
+        cancelled_orders INT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS rollup_daily_product_sales (
+        day DATE NOT NULL,
+        product_id INT NOT NULL,
+        total_sold INT NOT NULL,
+        revenue DECIMAL(14,2) NOT NULL,
+        PRIMARY KEY (day, product_id),
+        INDEX idx_product (product_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS rollup_daily_category_sales (
+        day DATE NOT NULL,
+        category_id INT NOT NULL,
+        total_sold INT NOT NULL,
+        revenue DECIMAL(14,2) NOT NULL,
+        PRIMARY KEY (day, category_id),
+        INDEX idx_category (category_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS rollup_order_snapshot (
+        order_id INT PRIMARY KEY,
+        day DATE NOT NULL,
+        status VARCHAR(20),
+        total_amount DECIMAL(10,2),
+        INDEX idx_day (day)
+    )""",
+    """CREATE TABLE IF NOT EXISTS rollup_state (
+        name VARCHAR(50) PRIMARY KEY,
+        last_order_id INT NOT NULL,
+        refreshed_at TIMESTAMP(6) NOT NULL
+    )""",
+]
+
+ROLLUP_TABLES = ['rollup_daily_sales', 'rollup_daily_product_sales', 'rollup_daily_category_sales']
+
+# Watermark probe for the analytics cache; bumps whenever a refresh changed something
+WATERMARK_PROBE = "SELECT MAX(refreshed_at) FROM rollup_state"
+
+# Aggregations shared by the full backfill and the per-day refresh. `{condition}`
+# restricts the orders scanned (an order_id bound or a set of day ranges).
+# Cancelled orders are excluded like in the endpoints they replace; the
+# category rollup keeps them because get_category_performance's LEFT JOIN on
+# orders only drops the order row, never the order item.
+DAILY_SALES_INSERT = """
+    INSERT INTO rollup_daily_sales (day, orders, revenue, cancelled_orders)
+    SELECT
+        DATE(o.order_date),
+        COUNT(CASE WHEN o.status != 'Cancelled' THEN 1 END),
+        COALESCE(SUM(CASE WHEN o.status != 'Cancelled' THEN o.total_amount END), 0),
+        COUNT(CASE WHEN o.status = 'Cancelled' THEN 1 END)
+    FROM orders o
+    WHERE {condition}
+    GROUP BY DATE(o.order_date)
+"""
+
+DAILY_PRODUCT_INSERT = """
+    INSERT INTO rollup_daily_product_sales (day, product_id, total_sold, revenue)
+    SELECT
+        DATE(o.order_date),
+        pv.product_id,
+        SUM(oi.quantity),
+        SUM(oi.quantity * oi.price)
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.order_id
+    JOIN product_variants pv ON pv.variant_id = oi.variant_id
+    WHERE {condition}
+    AND o.status != 'Cancelled'
+    GROUP BY DATE(o.order_date), pv.product_id
+"""
+
+DAILY_CATEGORY_INSERT = """
+    INSERT INTO rollup_daily_category_sales (day, category_id, total_sold, revenue)
+    SELECT
+        DATE(o.order_date),
+        p.category_id,
+        SUM(oi.quantity),
+        SUM(oi.quantity * oi.price)
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.order_id
+    JOIN product_variants pv ON pv.variant_id = oi.variant_id
+    JOIN products p ON p.product_id = pv.product_id
+    WHERE {condition}
+    GROUP BY DATE(o.order_date), p.category_id
+"""
+
+SNAPSHOT_INSERT = """
+    INSERT INTO rollup_order_snapshot (order_id, day, status, total_amount)
+    SELECT o.order_id, DATE(o.order_date), o.status, o.total_amount
+    FROM orders o
+    WHERE o.order_date >= CURDATE() - INTERVAL %s DAY
+    AND {condition}
+"""
+
+# Read paths used by app.py when ANALYTICS_USE_ROLLUPS is enabled; they
+# return the same columns and take the same parameters / {placeholders} as
+# the raw queries they replace.
+SALES_TREND_QUERY = """
+    SELECT
+        day as date,
+        orders,
+        revenue
+    FROM rollup_daily_sales
+    WHERE day >= %s
+    AND day < %s
+    AND orders > 0
+    ORDER BY day
+    LIMIT %s
+"""
+
+TOP_PRODUCTS_QUERY = """
+    SELECT
+        p.product_id,
+        p.name,
+        p.brand,
+        SUM(r.total_sold) as total_sold,
+        SUM(r.revenue) as revenue
+    FROM rollup_daily_product_sales r
+    JOIN products p ON p.product_id = r.product_id
+    {where}
+    GROUP BY p.product_id, p.name, p.brand
+    {having}
+    ORDER BY total_sold DESC, p.product_id DESC
+    LIMIT %s
+"""
+
+CATEGORY_PERFORMANCE_QUERY = """
+    SELECT
+        c.name as category,
+        COALESCE(pc.product_count, 0) as product_count,
+        COALESCE(r.total_sold, 0) as total_sold,
+        COALESCE(r.revenue, 0) as revenue
+    FROM categories c
+    LEFT JOIN (
+        SELECT category_id, COUNT(*) as product_count
+        FROM products
+        GROUP BY category_id
+    ) pc ON pc.category_id = c.category_id
+    LEFT JOIN (
+        SELECT category_id, SUM(total_sold) as total_sold, SUM(revenue) as revenue
+        FROM rollup_daily_category_sales
+        GROUP BY category_id
+    ) r ON r.category_id = c.category_id
+    ORDER BY revenue DESC
+"""
+
+# Raw-table equivalents for `verify`, over the whole history
+RAW_DAILY_SALES = """
+    SELECT DATE(order_date) as day, COUNT(*) as quantity, SUM(total_amount) as revenue
+    FROM orders
+    WHERE status != 'Cancelled'
+    GROUP BY DATE(order_date)
+"""
+
+ROLLUP_DAILY_SALES = """
+    SELECT day, orders as quantity, revenue FROM rollup_daily_sales WHERE orders > 0
+"""
+
+RAW_PRODUCT_TOTALS = """
+    SELECT pv.product_id, SUM(oi.quantity) as quantity, SUM(oi.quantity * oi.price) as revenue
+    FROM product_variants pv
+    JOIN order_items oi ON pv.variant_id = oi.variant_id
+    JOIN orders o ON oi.order_id = o.order_id
+    WHERE o.status != 'Cancelled'
+    GROUP BY pv.product_id
+"""
+
+ROLLUP_PRODUCT_TOTALS = """
+    SELECT product_id, SUM(total_sold) as quantity, SUM(revenue) as revenue
+    FROM rollup_daily_product_sales
+    GROUP BY product_id
+"""
+
+RAW_CATEGORY_TOTALS = """
+    SELECT p.category_id, SUM(oi.quantity) as quantity, SUM(oi.quantity * oi.price) as revenue
+    FROM products p
+    JOIN product_variants pv ON p.product_id = pv.product_id
+    JOIN order_items oi ON pv.variant_id = oi.variant_id
+    JOIN orders o ON oi.order_id = o.order_id
+    GROUP BY p.category_id
+"""
+
+ROLLUP_CATEGORY_TOTALS = """
+    SELECT category_id, SUM(total_sold) as quantity, SUM(revenue) as revenue
+    FROM rollup_daily_category_sales
+    GROUP BY category_id
+"""
+
+
+def _fetch(conn, query, params=()):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _execute(conn, query, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def create_tables(conn):
+    """Create the rollup tables if they do not exist yet"""
+    for statement in SCHEMA_SQL:
+        _execute(conn, statement)
+
+
+def _day_condition(days):
+    """Condition (and params) selecting orders placed on any of `days`, index friendly"""
+    ranges = " OR ".join("(o.order_date >= %s AND o.order_date < %s)" for _ in days)
+    params = []
+    for day in days:
+        params.extend([day, day + timedelta(days=1)])
+    return f"({ranges})", tuple(params)
+
+
+def _rebuild_days(conn, days):
+    """Recompute every rollup row (and the order snapshot) for the given days"""
+    placeholders = ", ".join(["%s"] * len(days))
+    condition, params = _day_condition(days)
+
+    for table in ROLLUP_TABLES:
+        _execute(conn, f"DELETE FROM {table} WHERE day IN ({placeholders})", tuple(days))
+    _execute(conn, DAILY_SALES_INSERT.format(condition=condition), params)
+    _execute(conn, DAILY_PRODUCT_INSERT.format(condition=condition), params)
+    _execute(conn, DAILY_CATEGORY_INSERT.format(condition=condition), params)
+
+    _execute(conn, f"DELETE FROM rollup_order_snapshot WHERE day IN ({placeholders})", tuple(days))
+    _execute(conn, SNAPSHOT_INSERT.format(condition=condition), (ROLLUP_LOOKBACK_DAYS,) + params)
+
+
+def _set_state(conn, last_order_id):
+    _execute(conn, """
+        INSERT INTO rollup_state (name, last_order_id, refreshed_at)
+        VALUES ('daily', %s, NOW(6))
+        ON DUPLICATE KEY UPDATE last_order_id = VALUES(last_order_id), refreshed_at = VALUES(refreshed_at)
+    """, (last_order_id,))
+
+
+def _max_order_id(conn):
+    return _fetch(conn, "SELECT COALESCE(MAX(order_id), 0) as max_id FROM orders")[0]['max_id']
+
+
+def backfill(conn):
+    """Rebuild all rollups from the raw tables"""
+    create_tables(conn)
+    max_order_id = _max_order_id(conn)
+    conn.start_transaction()
+    try:
+        for table in ROLLUP_TABLES + ['rollup_order_snapshot']:
+            _execute(conn, f"DELETE FROM {table}")
+        condition = "o.order_id <= %s"
+        _execute(conn, DAILY_SALES_INSERT.format(condition=condition), (max_order_id,))
+        _execute(conn, DAILY_PRODUCT_INSERT.format(condition=condition), (max_order_id,))
+        _execute(conn, DAILY_CATEGORY_INSERT.format(condition=condition), (max_order_id,))
+        _execute(conn, SNAPSHOT_INSERT.format(condition=condition), (ROLLUP_LOOKBACK_DAYS, max_order_id))
+        _set_state(conn, max_order_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'last_order_id': max_order_id}
+
+
+def dirty_days(conn, last_order_id, max_order_id):
+    """Days touched by new orders, or by tracked orders that changed or vanished"""
+    new_days = _fetch(conn, """
+        SELECT DISTINCT DATE(order_date) as day FROM orders
+        WHERE order_id > %s AND order_id <= %s
+    """, (last_order_id, max_order_id))
+
+    changed_days = _fetch(conn, """
+        SELECT DISTINCT s.day as day, DATE(o.order_date) as new_day
+        FROM rollup_order_snapshot s
+        LEFT JOIN orders o ON o.order_id = s.order_id
+        WHERE o.order_id IS NULL
+        OR o.status <> s.status
+        OR o.total_amount <> s.total_amount
+        OR DATE(o.order_date) <> s.day
+    """)
+
+    days = {row['day'] for row in new_days}
+    for row in changed_days:
+        days.add(row['day'])
+        if row['new_day'] is not None:
+            days.add(row['new_day'])
+    return sorted(days)
+
+
+def refresh(conn, batch_days=31):
+    """Incrementally bring the rollups up to date; returns what was processed"""
+    create_tables(conn)
+
+    # Serialise refreshes across processes (cron + manual runs)
+    if not _fetch(conn, "SELECT GET_LOCK('rollup_refresh', 0) as got")[0]['got']:
+        return {'skipped': 'another refresh is running'}
+    try:
+        state = _fetch(conn, "SELECT last_order_id FROM rollup_state WHERE name = 'daily'")
+        if not state:
+            result = backfill(conn)
+            result['backfilled'] = True
+            return result
+
+        last_order_id = state[0]['last_order_id']
+        max_order_id = _max_order_id(conn)
+        days = dirty_days(conn, last_order_id, max_order_id)
+
+        conn.start_transaction()
+        try:
+            for start in range(0, len(days), batch_days):
+                _rebuild_days(conn, days[start:start + batch_days])
+            # Old snapshots are outside the lookback window and no longer tracked
+            _execute(conn, "DELETE FROM rollup_order_snapshot WHERE day < CURDATE() - INTERVAL %s DAY",
+                     (ROLLUP_LOOKBACK_DAYS,))
+            if days or max_order_id != last_order_id:
+                _set_state(conn, max_order_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return {'last_order_id': max_order_id, 'new_orders': max_order_id - last_order_id, 'days_rebuilt': len(days)}
+    finally:
+        _fetch(conn, "SELECT RELEASE_LOCK('rollup_refresh') as released")
+
+
+def _index_rows(rows, key):
+    return {row[key]: (int(row['quantity']), row['revenue']) for row in rows}
+
+
+def verify(conn):
+    """Compare the rollups with the raw tables; returns a list of mismatch descriptions"""
+    checks = [
+        ('daily sales', 'day', RAW_DAILY_SALES, ROLLUP_DAILY_SALES),
+        ('product totals', 'product_id', RAW_PRODUCT_TOTALS, ROLLUP_PRODUCT_TOTALS),
+        ('category totals', 'category_id', RAW_CATEGORY_TOTALS, ROLLUP_CATEGORY_TOTALS),
+    ]
+    mismatches = []
+    for label, key, raw_query, rollup_query in checks:
+        raw = _index_rows(_fetch(conn, raw_query), key)
+        rolled = _index_rows(_fetch(conn, rollup_query), key)
+        for value in sorted(set(raw) | set(rolled), key=str):
+            if raw.get(value) != rolled.get(value):
+                mismatches.append(f"{label} [{key}={value}]: raw={raw.get(value)} rollup={rolled.get(value)}")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the daily analytics rollup tables")
+    parser.add_argument('command', choices=['backfill', 'refresh', 'verify'])
+    parser.add_argument('--every', type=float, default=0,
+                        help="with refresh: keep running, refreshing every N seconds")
+    args = parser.parse_args(argv)
+
+    with get_pool().connection() as conn:
+        if args.command == 'backfill':
+            result = backfill(conn)
+            print(f"✅ Rollups rebuilt up to order #{result['last_order_id']}")
+        elif args.command == 'refresh':
+            while True:
+                result = refresh(conn)
+                print(f"✅ Rollups refreshed: {result}")
+                if not args.every:
+                    break
+                time.sleep(args.every)
+        else:
+            mismatches = verify(conn)
+            if mismatches:
+                print(f"❌ {len(mismatches)} rollup mismatches:")
+                for line in mismatches:
+                    print(f"  - {line}")
+                return 1
+            print("✅ Rollups match the raw tables")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
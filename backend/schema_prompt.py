@@ -0,0 +1,350 @@
+"""
+Per-question schema prompts for the Gemini SQL generator.
+
+The schema is read from information_schema (columns and foreign keys) and
+kept in memory, re-read every `refresh_interval` seconds or sooner when a
+generated query hits an unknown table or column. For each question only the
+relevant tables go into the prompt: tables named by the question (directly,
+through a column name, or through a synonym such as "revenue" or "stock"),
+plus the tables on the foreign-key paths needed to join them, which are
+listed with their key columns only. Assembled prompts are cached per table
+selection, so building one is a dictionary lookup after the first time.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from logs import log_event
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_COLUMNS_QUERY = """
+    SELECT TABLE_NAME, COLUMN_NAME, COLUMN_KEY
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+SCHEMA_FOREIGN_KEYS_QUERY = """
+    SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+    FROM information_schema.KEY_COLUMN_USAGE
+    WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+"""
+
+# Used until information_schema can be read (e.g. the database is down at startup)
+FALLBACK_TABLES = {
+    'users': ['user_id', 'name', 'email', 'password_hash', 'phone', 'created_at', 'updated_at'],
+    'categories': ['category_id', 'name', 'description'],
+    'products': ['product_id', 'category_id', 'name', 'description', 'base_price', 'brand', 'image_url', 'created_at'],
+    'product_variants': ['variant_id', 'product_id', 'sku', 'color', 'size', 'additional_price'],
+    'inventory': ['variant_id', 'quantity', 'last_updated'],
+    'orders': ['order_id', 'user_id', 'order_date', 'status', 'total_amount', 'shipping_address'],
+    'order_items': ['order_item_id', 'order_id', 'variant_id', 'quantity', 'price'],
+    'payments': ['payment_id', 'order_id', 'payment_method', 'payment_status', 'paid_at'],
+    'shipping': ['shipping_id', 'order_id', 'carrier', 'tracking_number', 'status', 'estimated_delivery_date'],
+    'reviews': ['review_id', 'user_id', 'product_id', 'rating', 'comment', 'created_at'],
+}
+FALLBACK_FOREIGN_KEYS = [
+    ('products', 'category_id', 'categories', 'category_id'),
+    ('product_variants', 'product_id', 'products', 'product_id'),
+    ('inventory', 'variant_id', 'product_variants', 'variant_id'),
+    ('orders', 'user_id', 'users', 'user_id'),
+    ('order_items', 'order_id', 'orders', 'order_id'),
+    ('order_items', 'variant_id', 'product_variants', 'variant_id'),
+    ('payments', 'order_id', 'orders', 'order_id'),
+    ('shipping', 'order_id', 'orders', 'order_id'),
+    ('reviews', 'user_id', 'users', 'user_id'),
+    ('reviews', 'product_id', 'products', 'product_id'),
+]
+
+# Words people use for data that no table or column is named after
+KEYWORD_TABLES = {
+    'revenue': ('orders',),
+    'sale': ('orders', 'order_items'),
+    'sales': ('orders', 'order_items'),
+    'sold': ('order_items',),
+    'sell': ('order_items',),
+    'selling': ('order_items',),
+    'bestseller': ('order_items',),
+    'spent': ('orders',),
+    'spend': ('orders',),
+    'purchase': ('orders', 'order_items'),
+    'bought': ('orders', 'order_items'),
+    'ordered': ('orders',),
+    'customer': ('users',),
+    'buyer': ('users',),
+    'signup': ('users',),
+    'registered': ('users',),
+    'stock': ('inventory',),
+    'price': ('products',),
+    'cost': ('products',),
+    'rated': ('reviews',),
+    'paid': ('payments',),
+    'pay': ('payments',),
+    'delivery': ('shipping',),
+    'delivered': ('shipping',),
+    'shipped': ('shipping',),
+    'ship': ('shipping',),
+}
+
+# A column word shared by more tables than this (name, id, status...) selects none of them
+MAX_TABLES_PER_COLUMN_WORD = 2
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English and SQL identifiers)"""
+    return (len(text) + 3) // 4
+
+
+def singular(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('ses', 'xes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def words(text):
+    return {singular(w) for w in re.findall(r"[a-z0-9]+", text.lower())}
+
+
+class Schema:
+    """Tables, their columns and the foreign keys between them"""
+
+    def __init__(self, tables, primary_keys, foreign_keys, source):
+        self.tables = tables                # name -> [column, ...]
+        self.foreign_keys = foreign_keys    # [(table, column, ref_table, ref_column), ...]
+        self.source = source
+        self.fingerprint = hashlib.sha1(repr((sorted(tables.items()), sorted(foreign_keys))).encode()).hexdigest()[:12]
+
+        self.key_columns = defaultdict(list)
+        for table, columns in primary_keys.items():
+            self.key_columns[table].extend(columns)
+        self.graph = defaultdict(set)
+        for table, column, ref_table, ref_column in foreign_keys:
+            if table in tables and ref_table in tables:
+                self.graph[table].add(ref_table)
+                self.graph[ref_table].add(table)
+                self.key_columns[table].append(column)
+                self.key_columns[ref_table].append(ref_column)
+
+        self.word_tables = defaultdict(set)
+        table_words = {singular(table) for table in tables}
+        for table in tables:
+            self.word_tables[singular(table)].add(table)
+            # "variants" finds product_variants, but "product" only finds products
+            for part in table.split('_'):
+                if singular(part) not in table_words:
+                    self.word_tables[singular(part)].add(table)
+        column_words = defaultdict(set)
+        for table, columns in tables.items():
+            for column in columns:
+                for part in column.split('_'):
+                    column_words[singular(part)].add(table)
+        for word, owners in column_words.items():
+            if len(owners) <= MAX_TABLES_PER_COLUMN_WORD:
+                self.word_tables[word] |= owners
+
+    def join_path(self, start, goal):
+        """Tables on a shortest foreign-key path from start to goal (inclusive), or []"""
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            if table == goal:
+                path = []
+                while table is not None:
+                    path.append(table)
+                    table = previous[table]
+                return path[::-1]
+            for neighbour in sorted(self.graph[table]):
+                if neighbour not in previous:
+                    previous[neighbour] = table
+                    queue.append(neighbour)
+        return []
+
+
+class SchemaPrompter:
+    """Builds a compact system prompt per question from the live schema.
+
+    Args:
+        load (callable): Returns (columns rows, foreign key rows) as read by the two schema queries
+        instructions (str): Fixed instructions placed before the schema
+        refresh_interval (float): Seconds before the schema is read again
+        exclude_prefixes (tuple): Tables never shown to the model (internal rollups)
+        max_prompts (int): Assembled prompts kept, one per distinct table selection
+    """
+
+    def __init__(self, load, instructions, refresh_interval=300.0, exclude_prefixes=('rollup_',), max_prompts=256):
+        self._load = load
+        self.instructions = instructions.strip()
+        self.refresh_interval = refresh_interval
+        self.exclude_prefixes = exclude_prefixes
+        self.max_prompts = max_prompts
+
+        self._lock = threading.Lock()
+        self._schema = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._stale_marks = 0
+        self._prompts = OrderedDict()   # (fingerprint, direct, bridges) -> prompt
+        self._full_prompt_est = (None, 0)   # (fingerprint, tokens) of the whole-schema prompt
+
+        self._refreshes = 0
+        self._load_failures = 0
+        self._requests = 0
+        self._prompt_tokens = 0
+        self._full_prompt_tokens = 0
+        self._reported = 0
+        self._reported_tokens = 0
+
+    def schema(self):
+        """Current schema, re-read from the database when older than the refresh interval.
+
+        The read runs outside the lock; while one caller re-reads, the others keep
+        using the schema they have.
+        """
+        with self._lock:
+            if self._schema is not None and (
+                    self._refreshing or time.monotonic() - self._loaded_at < self.refresh_interval):
+                return self._schema
+            self._refreshing = True
+            stale_marks = self._stale_marks
+
+        schema, failed = None, False
+        try:
+            schema = self._read_schema()
+        except Exception as e:
+            failed = True
+            log_event(logger, logging.WARNING, 'schema.introspection_failed', error=str(e))
+        with self._lock:
+            self._refreshing = False
+            if failed:
+                self._load_failures += 1
+            elif schema is not None:
+                self._refreshes += 1
+            self._schema = schema or self._schema or Schema(
+                dict(FALLBACK_TABLES), {t: columns[:1] for t, columns in FALLBACK_TABLES.items()},
+                list(FALLBACK_FOREIGN_KEYS), 'fallback')
+            # Marked stale while reading: what was read may predate the change
+            self._loaded_at = time.monotonic() if stale_marks == self._stale_marks else 0.0
+            return self._schema
+
+    def mark_stale(self):
+        """Re-read the schema on next use (a generated query hit an unknown column or table)"""
+        with self._lock:
+            self._loaded_at = 0.0
+            self._stale_marks += 1
+
+    def clear(self):
+        """Drop assembled prompts and re-read the schema on next use"""
+        with self._lock:
+            self._prompts.clear()
+            self._loaded_at = 0.0
+
+    def record_prompt_tokens(self, count):
+        """Record the prompt token count the model reported for a request"""
+        with self._lock:
+            self._reported += 1
+            self._reported_tokens += count
+
+    def _read_schema(self):
+        """Schema from the loader, None when it reports no tables"""
+        column_rows, key_rows = self._load()
+        tables = defaultdict(list)
+        primary_keys = defaultdict(list)
+        for table, column, column_key in column_rows:
+            if not table.startswith(self.exclude_prefixes):
+                tables[table].append(column)
+                if column_key == 'PRI':
+                    primary_keys[table].append(column)
+        if not tables:
+            return None
+        return Schema(dict(tables), primary_keys, [tuple(row) for row in key_rows], 'information_schema')
+
+    def select_tables(self, question, schema=None):
+        """Return (direct, bridges): tables the question refers to and tables needed to join them"""
+        schema = schema or self.schema()
+        direct = set()
+        for word in words(question):
+            direct |= schema.word_tables.get(word, set())
+            direct |= {t for t in KEYWORD_TABLES.get(word, ()) if t in schema.tables}
+        if not direct:
+            # Nothing recognisable: let the model see everything
+            return frozenset(schema.tables), frozenset()
+
+        bridges = set()
+        ordered = sorted(direct)
+        for i, start in enumerate(ordered):
+            for goal in ordered[i + 1:]:
+                bridges.update(schema.join_path(start, goal))
+        return frozenset(direct), frozenset(bridges - direct)
+
+    def build(self, question):
+        """Return (prompt, info) where info has the selected tables and the prompt's token estimate"""
+        schema = self.schema()
+        direct, bridges = self.select_tables(question, schema)
+        key = (schema.fingerprint, direct, bridges)
+
+        with self._lock:
+            prompt = self._prompts.get(key)
+            if prompt is not None:
+                self._prompts.move_to_end(key)
+        if prompt is None:
+            prompt = self._assemble(schema, direct, bridges)
+            with self._lock:
+                self._prompts[key] = prompt
+                while len(self._prompts) > self.max_prompts:
+                    self._prompts.popitem(last=False)
+
+        full_tokens = self._full_prompt_tokens_est(schema)
+        prompt = prompt + f"\nUser Question: {question}\n"
+        tokens = estimate_tokens(prompt)
+        with self._lock:
+            self._requests += 1
+            self._prompt_tokens += tokens
+            self._full_prompt_tokens += full_tokens + estimate_tokens(f"\nUser Question: {question}\n")
+        return prompt, {'tables': sorted(direct | bridges), 'prompt_tokens_est': tokens}
+
+    def _full_prompt_tokens_est(self, schema):
+        """Token estimate of the whole-schema prompt, assembled once per schema version"""
+        with self._lock:
+            fingerprint, tokens = self._full_prompt_est
+        if fingerprint != schema.fingerprint:
+            tokens = estimate_tokens(self._assemble(schema, frozenset(schema.tables), frozenset()))
+            with self._lock:
+                self._full_prompt_est = (schema.fingerprint, tokens)
+        return tokens
+
+    def _assemble(self, schema, direct, bridges):
+        lines = [self.instructions, "", "SCHEMA (for database queries):"]
+        for table in sorted(direct | bridges):
+            if table in direct:
+                columns = schema.tables[table]
+            else:
+                columns = list(dict.fromkeys(schema.key_columns[table])) or schema.tables[table]
+            lines.append(f"- {table}({', '.join(columns)})")
+        return "\n".join(lines) + "\n"
+
+    def stats(self):
+        with self._lock:
+            schema = self._schema
+            return {
+                'source': schema.source if schema else None,
+                'tables': len(schema.tables) if schema else 0,
+                'fingerprint': schema.fingerprint if schema else None,
+                'refresh_interval_seconds': self.refresh_interval,
+                'refreshes': self._refreshes,
+                'load_failures': self._load_failures,
+                'cached_prompts': len(self._prompts),
+                'requests': self._requests,
+                'avg_prompt_tokens_est': round(self._prompt_tokens / self._requests, 1) if self._requests else 0.0,
+                'avg_full_prompt_tokens_est': round(self._full_prompt_tokens / self._requests, 1) if self._requests else 0.0,
+                'avg_prompt_tokens_reported': round(self._reported_tokens / self._reported, 1) if self._reported else None,
+            }
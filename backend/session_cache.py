@@ -0,0 +1,323 @@
+"""
+Per-conversation cache of recent result sets, for follow-up questions.
+
+Users refine the answer they just got: "now only for last month", "sort by
+revenue", "just the top 3". When the chat sends a session id, the rows
+behind each answer are kept (bounded per session and in total) and a
+follow-up phrased as one of a few refinements is answered by filtering,
+sorting or truncating those rows in-process, with no Gemini call and no
+database query. Anything else falls through to the normal pipeline.
+
+A refinement that needs every row (sorting, filtering, "bottom 5") is only
+served from a complete result: not from one cut off at the row limit, nor
+from a top-N slice (a query with its own LIMIT, or an earlier "top 3").
+"""
+
+import calendar
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from datetime import date, datetime, timedelta
+
+from question_cache import normalize_question
+
+CachedResult = namedtuple('CachedResult', [
+    'question',   # question the rows answer
+    'sql',        # statement they came from
+    'columns',    # column names
+    'rows',       # tuple of row tuples
+    'complete',   # every row of the answer is held (not cut off by a LIMIT or the row cap)
+    'size',       # estimated bytes held
+])
+
+Followup = namedtuple('Followup', ['kind', 'params'])
+
+LEAD = r"(?:(?:now|and|ok|okay|then|but|so) )?(?:(?:only|just|show me|show|give me) )*(?:the )?"
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+COUNT = r"\d+|" + "|".join(NUMBER_WORDS)
+# A named noun ("the last 5 orders") has to be what the previous answer was about
+NOUNS = r"(?: (?:ones|rows|results|of them|items|entries|(?P<noun>orders|products|customers|users|reviews|categories)))?"
+
+PERIOD = re.compile(LEAD + r"(?:(?:for|in|from|during|over|within) (?:the )?)?(?:"
+                    r"(?P<which>last|past|previous|this|current) (?:(?P<n>" + COUNT + r") )?"
+                    r"(?P<unit>day|week|month|year)s?|(?P<day>today|yesterday))" + NOUNS)
+# "last 5" is left to the model: it usually means the most recent, not the bottom of the list
+TRUNCATE = re.compile(LEAD + r"(?P<end>top|first|bottom) (?P<n>" + COUNT + r")" + NOUNS)
+SORT = re.compile(r"(?:(?:now|and|ok|okay|then|can you|please) )*(?:sort|order|rank)(?:ed)?"
+                  r"(?: (?:it|them|that|this|these|those|the results|the list|the rows))? by (?P<column>.+?)"
+                  r"(?: (?P<direction>asc|ascending|desc|descending|highest first|lowest first|largest first"
+                  r"|smallest first|high to low|low to high|a to z|z to a|in ascending order|in descending order))?")
+COMPARE = re.compile(LEAD + r"(?:(?:ones|rows|those|items) )?(?:(?:with|where|whose) )?(?P<column>[a-z0-9_ ]+?) "
+                     r"(?:(?:is|are) )?(?P<op>above|over|greater than|more than|at least|below|under|less than"
+                     r"|at most|>=|<=|>|<) \$?(?P<number>\d+(?:\.\d+)?)")
+VALUE = re.compile(r"(?:(?:now|and|ok|okay|then|but|so) )?(?:only|just) (?:show |show me )?(?:the )?"
+                   r"(?:(?P<column>[a-z0-9_ ]+?) (?:is|=|equals|of) )?(?P<value>.+?)" + NOUNS)
+
+ASCENDING = {'asc', 'ascending', 'lowest first', 'smallest first', 'low to high', 'a to z', 'in ascending order'}
+COMPARISONS = {
+    'above': float.__gt__, 'over': float.__gt__, 'greater than': float.__gt__, 'more than': float.__gt__,
+    '>': float.__gt__, 'at least': float.__ge__, '>=': float.__ge__, 'below': float.__lt__,
+    'under': float.__lt__, 'less than': float.__lt__, '<': float.__lt__, 'at most': float.__le__, '<=': float.__le__,
+}
+
+
+def parse_followup(question):
+    """Followup(kind, params) when the question reads as a refinement of the previous answer, else None"""
+    text = normalize_question(question)
+    for kind, pattern in (('period', PERIOD), ('truncate', TRUNCATE), ('sort', SORT),
+                          ('compare', COMPARE), ('value', VALUE)):
+        found = pattern.fullmatch(text)
+        if found:
+            return Followup(kind, {k: v for k, v in found.groupdict().items() if v is not None})
+    return None
+
+
+def _count(word):
+    return NUMBER_WORDS.get(word) or int(word)
+
+
+def _words(text):
+    return {word[:-1] if len(word) > 3 and word.endswith('s') else word
+            for word in re.split(r"[^a-z0-9]+", text.lower()) if word}
+
+
+def match_column(columns, phrase):
+    """Index of the column best matching a phrase like "revenue" or "total sold", else None"""
+    wanted = _words(phrase)
+    best, best_score = None, 0
+    for index, column in enumerate(columns):
+        have = _words(column)
+        score = len(wanted & have) + (0.5 if wanted == have else 0)
+        if score > best_score:
+            best, best_score = index, score
+    return best
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def period_bounds(params, today):
+    """[start, end) dates of a period follow-up"""
+    if 'day' in params:
+        day = today if params['day'] == 'today' else today - timedelta(days=1)
+        return day, day + timedelta(days=1)
+    unit, which = params['unit'], params['which']
+    tomorrow = today + timedelta(days=1)
+    if 'n' in params or which == 'past':
+        n = _count(params.get('n', '1'))
+        if unit == 'day':
+            return today - timedelta(days=n - 1), tomorrow
+        if unit == 'week':
+            return today - timedelta(weeks=n), tomorrow
+        if unit == 'month':
+            year, month = divmod(today.year * 12 + today.month - 1 - n, 12)
+            return date(year, month + 1, min(today.day, calendar.monthrange(year, month + 1)[1])), tomorrow
+        try:
+            return today.replace(year=today.year - n), tomorrow
+        except ValueError:  # 29 February
+            return today.replace(year=today.year - n, day=28), tomorrow
+
+    current = which in ('this', 'current')
+    if unit == 'day':
+        return (today, tomorrow) if current else (today - timedelta(days=1), today)
+    if unit == 'week':
+        start = today - timedelta(days=today.weekday())
+        return (start, tomorrow) if current else (start - timedelta(weeks=1), start)
+    if unit == 'month':
+        start = today.replace(day=1)
+        return (start, tomorrow) if current else ((start - timedelta(days=1)).replace(day=1), start)
+    start = date(today.year, 1, 1)
+    return (start, tomorrow) if current else (date(today.year - 1, 1, 1), start)
+
+
+def apply_followup(result, followup, today=None):
+    """Rows answering `followup` from a cached result, or None when it cannot be answered from them"""
+    columns, rows, params = result.columns, result.rows, followup.params
+    if 'noun' in params and not _words(params['noun']) <= _words(" ".join((result.question,) + columns)):
+        return None
+
+    if followup.kind == 'truncate':
+        n = _count(params['n'])
+        if params['end'] in ('top', 'first'):
+            return rows[:n] if n <= len(rows) or result.complete else None
+        return rows[-n:] if result.complete else None
+
+    if not result.complete:
+        return None
+
+    if followup.kind == 'period':
+        start, end = period_bounds(params, today or date.today())
+        for index in range(len(columns)):
+            values = [row[index] for row in rows if row[index] is not None]
+            if values and all(isinstance(value, date) for value in values):
+                def day(value):
+                    return value.date() if isinstance(value, datetime) else value
+                return tuple(row for row in rows if row[index] is not None and start <= day(row[index]) < end)
+        return None
+
+    if followup.kind == 'sort':
+        index = match_column(columns, params['column'])
+        if index is None:
+            return None
+        values = [row[index] for row in rows if row[index] is not None]
+        numeric = all(_is_number(value) for value in values)
+        direction = params.get('direction')
+        descending = direction not in ASCENDING if direction else numeric
+        present = [row for row in rows if row[index] is not None]
+        key = (lambda row: row[index]) if numeric else (lambda row: str(row[index]).casefold())
+        return tuple(sorted(present, key=key, reverse=descending)) + tuple(row for row in rows if row[index] is None)
+
+    if followup.kind == 'compare':
+        index = match_column(columns, params['column'])
+        if index is None or not all(_is_number(row[index]) for row in rows if row[index] is not None):
+            return None
+        compare, number = COMPARISONS[params['op']], float(params['number'])
+        return tuple(row for row in rows if row[index] is not None and compare(float(row[index]), number))
+
+    # value: the phrase has to be an exact cell of a text column, anything looser goes to the model
+    wanted = params['value']
+    candidates = range(len(columns))
+    if 'column' in params:
+        index = match_column(columns, params['column'])
+        if index is None:
+            return None
+        candidates = [index]
+    for index in candidates:
+        matching = tuple(row for row in rows if isinstance(row[index], str) and normalize_question(row[index]) == wanted)
+        if matching:
+            return matching
+    return None
+
+
+def estimate_size(columns, rows):
+    """Rough bytes held by a result"""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(column) for column in columns)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class SessionCache:
+    """Recent result sets per session id, with LRU eviction of whole sessions.
+
+    Args:
+        max_sessions (int): Sessions kept (0 disables the cache)
+        results_per_session (int): Recent results kept per session
+        max_rows (int): Rows kept per result; longer results are kept truncated and marked incomplete
+        max_bytes (int): Estimated memory cap over every session
+        ttl (float): Seconds a session is kept after its last turn
+    """
+
+    def __init__(self, max_sessions=1000, results_per_session=4, max_rows=1000, max_bytes=64 * 2 ** 20, ttl=1800.0):
+        self.max_sessions = max_sessions
+        self.results_per_session = results_per_session
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()   # session id -> (last used, [CachedResult, newest first])
+        self._bytes = 0
+
+        self._turns = 0
+        self._served = Counter()
+        self._unservable = 0
+        self._stored = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _results(self, session_id, now):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if now - entry[0] >= self.ttl:
+            self._drop(session_id)
+            self._expirations += 1
+            return None
+        self._sessions[session_id] = (now, entry[1])
+        self._sessions.move_to_end(session_id)
+        return entry[1]
+
+    def _drop(self, session_id):
+        _, results = self._sessions.pop(session_id)
+        self._bytes -= sum(result.size for result in results)
+
+    def answer(self, session_id, question, today=None):
+        """(follow-up kind, columns, rows) when a recent result answers the question, else None.
+
+        The answer becomes the session's newest result, so refinements chain.
+        """
+        if not self.max_sessions or not session_id:
+            return None
+        with self._lock:
+            self._turns += 1
+            results = self._results(session_id, time.monotonic())
+            results = list(results) if results else []
+        followup = parse_followup(question) if results else None
+        if followup is None:
+            return None
+
+        for result in results:
+            rows = apply_followup(result, followup, today)
+            if rows is not None:
+                # A top-N slice, like a LIMIT-ed query, only answers further truncations
+                self.put(session_id, question, result.sql, result.columns, rows,
+                         complete=result.complete and followup.kind != 'truncate')
+                with self._lock:
+                    self._served[followup.kind] += 1
+                return followup.kind, result.columns, list(rows)
+        with self._lock:
+            self._unservable += 1
+        return None
+
+    def put(self, session_id, question, sql, columns, rows, complete=True):
+        """Remember the rows behind an answer as the session's newest result"""
+        if not self.max_sessions or not session_id:
+            return
+        complete = complete and len(rows) <= self.max_rows
+        rows = tuple(tuple(row) for row in rows[:self.max_rows])
+        result = CachedResult(question, sql, tuple(columns), rows, complete, estimate_size(columns, rows))
+        if result.size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            results = self._results(session_id, now)
+            if results is None:
+                results = []
+                self._sessions[session_id] = (now, results)
+            results.insert(0, result)
+            self._bytes += result.size
+            for old in results[self.results_per_session:]:
+                self._bytes -= old.size
+            del results[self.results_per_session:]
+            self._stored += 1
+            while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._sessions)))
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Turns served from cached results, and memory held"""
+        with self._lock:
+            served = sum(self._served.values())
+            return {
+                'sessions': len(self._sessions),
+                'results': sum(len(results) for _, results in self._sessions.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'turns': self._turns,
+                'served': served,
+                'served_ratio': round(served / self._turns, 4) if self._turns else 0.0,
+                'served_by_kind': dict(self._served),
+                'unservable': self._unservable,
+                'stored': self._stored,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
@@ -0,0 +1,102 @@
+"""
+Request coalescing for identical concurrent calls.
+
+A dashboard opened by many users at once fires the same aggregate queries
+in the same few milliseconds, and a burst of identical /ask questions fires
+the same Gemini prompt. A Group lets the first caller for a key (the
+leader) run the call while every concurrent caller with that key waits for
+it and shares the result, or the exception. Nothing is kept once the call
+returns: this only merges calls that overlap in time, the caches handle
+reuse after that.
+"""
+
+import threading
+
+import metrics
+
+COALESCED = metrics.REGISTRY.counter('app_singleflight_coalesced_total',
+                                     "Calls answered by an identical call already in flight", ['group'])
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class Group:
+    """Runs at most one call per key at a time; duplicates wait and share its outcome.
+
+    Args:
+        name (str): Label for the coalesced counter and log fields
+        timeout (float): Seconds a follower waits before running the call itself (None waits forever)
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}   # key -> _Call in flight
+
+        self._executions = 0
+        self._coalesced = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._max_waiters = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing one execution among concurrent callers of `key`"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._executions += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                leader = False
+
+        if not leader:
+            COALESCED.inc((self.name,))
+            if not call.done.wait(self.timeout):
+                # The leader is stuck; do not let it take every follower down with it
+                with self._lock:
+                    self._timeouts += 1
+                return fn(*args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn(*args, **kwargs)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Execution/coalescing counters for monitoring"""
+        with self._lock:
+            calls = self._executions + self._coalesced
+            return {
+                'in_flight': len(self._calls),
+                'calls': calls,
+                'executions': self._executions,
+                'coalesced': self._coalesced,
+                'coalesced_ratio': round(self._coalesced / calls, 4) if calls else 0.0,
+                'max_waiters': self._max_waiters,
+                'timeouts': self._timeouts,
+                'errors': self._errors,
+            }
@@ -0,0 +1,131 @@
+"""
+Cost guard for model-generated SQL.
+
+Before a generated SELECT runs, its plan is read with EXPLAIN FORMAT=JSON.
+Statements the optimizer expects to touch too many rows, or that full-scan
+too many large tables (cross joins, unindexed joins or sorts over
+order_items), are rejected with an explanation. Everything that passes is
+rewritten with a MAX_EXECUTION_TIME optimizer hint, so a statement the
+estimate got wrong is still killed by the server at the deadline.
+"""
+
+import logging
+import re
+from collections import namedtuple
+
+from logs import log_event
+
+logger = logging.getLogger(__name__)
+
+# MySQL error raised when MAX_EXECUTION_TIME interrupts a statement
+ER_QUERY_TIMEOUT = 3024
+
+GuardDecision = namedtuple('GuardDecision', [
+    'allowed',        # bool
+    'sql',            # statement to run (with the deadline hint), None when rejected
+    'reason',         # why it was rejected, None when allowed
+    'est_rows',       # largest row estimate of any step in the plan
+    'full_scans',     # full scans of tables at or above the size floor
+    'query_cost',     # optimizer cost, None if the plan has none
+    'scanned_tables', # names of those fully scanned tables
+])
+
+
+def plan_tables(node):
+    """Yield every table access in an EXPLAIN FORMAT=JSON plan"""
+    if isinstance(node, dict):
+        if 'table_name' in node and 'access_type' in node:
+            yield node
+        for value in node.values():
+            yield from plan_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from plan_tables(value)
+
+
+def summarize_plan(plan, full_scan_min_rows=10000):
+    """Return (est_rows, full_scans, query_cost, scanned_tables) for a plan.
+
+    `rows_produced_per_join` already multiplies in the rows of the preceding
+    tables of a nested loop, so the largest figure is the size of the worst
+    intermediate result, which is what explodes on a cross join.
+    """
+    est_rows = 0
+    scanned_tables = []
+    for table in plan_tables(plan):
+        examined = int(table.get('rows_examined_per_scan', 0))
+        produced = int(table.get('rows_produced_per_join', 0))
+        est_rows = max(est_rows, examined, produced)
+        if table['access_type'] in ('ALL', 'index') and examined >= full_scan_min_rows:
+            scanned_tables.append(table['table_name'])
+
+    cost = plan.get('query_block', {}).get('cost_info', {}).get('query_cost')
+    return est_rows, len(scanned_tables), float(cost) if cost is not None else None, scanned_tables
+
+
+def add_execution_hint(sql, max_execution_ms):
+    """Attach a MAX_EXECUTION_TIME hint to the outermost SELECT"""
+    if not max_execution_ms or re.search(r'MAX_EXECUTION_TIME\s*\(', sql, re.IGNORECASE):
+        return sql
+    return re.sub(r'^\s*SELECT\b', f"SELECT /*+ MAX_EXECUTION_TIME({int(max_execution_ms)}) */",
+                  sql, count=1, flags=re.IGNORECASE)
+
+
+def is_timeout_error(error):
+    return getattr(error, 'errno', None) == ER_QUERY_TIMEOUT
+
+
+class QueryGuard:
+    """EXPLAIN-based admission check for generated SELECTs.
+
+    Args:
+        explain (callable): Returns the parsed EXPLAIN FORMAT=JSON plan for a statement
+        max_rows (int): Reject plans with a larger row estimate (0 disables)
+        max_full_scans (int): Reject plans full-scanning more large tables (-1 disables)
+        max_execution_ms (int): MAX_EXECUTION_TIME hint added to allowed statements (0 for none)
+        full_scan_min_rows (int): Full scans of smaller tables are not counted
+    """
+
+    def __init__(self, explain, max_rows=1000000, max_full_scans=2, max_execution_ms=5000,
+                 full_scan_min_rows=10000):
+        self._explain = explain
+        self.max_rows = max_rows
+        self.max_full_scans = max_full_scans
+        self.max_execution_ms = max_execution_ms
+        self.full_scan_min_rows = full_scan_min_rows
+
+    def check(self, sql):
+        """Explain `sql` and decide whether it may run; raises if EXPLAIN itself fails"""
+        plan = self._explain(sql)
+        est_rows, full_scans, cost, scanned = summarize_plan(plan, self.full_scan_min_rows)
+
+        reason = None
+        if self.max_rows and est_rows > self.max_rows:
+            reason = (f"it would have to go through about {est_rows:,} rows "
+                      f"(the limit is {self.max_rows:,})")
+        elif 0 <= self.max_full_scans < full_scans:
+            reason = (f"it would read {full_scans} large tables in full ({', '.join(scanned)}); "
+                      f"at most {self.max_full_scans} are allowed")
+
+        allowed = reason is None
+        log_event(logger, logging.INFO if allowed else logging.WARNING, 'sql_guard.decision',
+                  allowed=allowed, est_rows=est_rows, full_scans=full_scans, cost=cost,
+                  scanned=scanned, sql=sql)
+        return GuardDecision(
+            allowed=allowed,
+            sql=add_execution_hint(sql, self.max_execution_ms) if allowed else None,
+            reason=reason,
+            est_rows=est_rows,
+            full_scans=full_scans,
+            query_cost=cost,
+            scanned_tables=scanned,
+        )
+
+    def rejection_message(self, decision):
+        return (f"That question needs a query that is too expensive to run on the live database: "
+                f"{decision.reason}. Try narrowing it down, for example to a date range, "
+                f"a category or a specific product.")
+
+    def timeout_message(self):
+        return (f"The query for that question was stopped after {self.max_execution_ms / 1000:g} seconds. "
+                f"Try narrowing it down, for example to a date range, a category or a specific product.")
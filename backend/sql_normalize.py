@@ -0,0 +1,288 @@
+"""
+Parse-once normalization of generated SQL.
+
+Model replies used to go through a chain of separate steps:
+- a regex clean-up of the first line;
+- an sqlparse pass in is_safe_select;
+- a LIMIT regex that gave up as soon as any subquery had a LIMIT.
+
+`parse()` now lexes a statement once and returns a ParsedSQL with:
+- the normalized text: comments dropped, whitespace collapsed, no trailing ';';
+- a literal-free fingerprint, so `WHERE id = 7` and `WHERE id = 9` share one;
+- the statement type, the referenced tables, the functions called and the
+  outermost LIMIT.
+
+Repeat statements are served from an LRU keyed by their text. The shape of a
+statement (type, tables, INTO, functions) is memoized by fingerprint, so literal-only
+variants skip that walk too.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from sqlparse import tokens as T
+from sqlparse.lexer import tokenize
+
+ParsedSQL = namedtuple('ParsedSQL', [
+    'sql',          # normalized statement text, without the trailing ';'
+    'fingerprint',  # normalized text with literals replaced by ?
+    'digest',       # short hash of the fingerprint, for keys and log fields
+    'kind',         # SELECT, INSERT, ... of the first statement, UNKNOWN when there is none
+    'statements',   # number of statements in the input
+    'tables',       # tables read or written, in order of appearance, CTE names excluded
+    'has_into',     # SELECT ... INTO (OUTFILE, DUMPFILE or variables)
+    'functions',    # upper-cased names followed by '(', in order of appearance
+    'has_variables',  # reads or assigns @user or @@system variables
+    'limit',        # row count of the outermost LIMIT, None when absent or not a number
+    'has_limit',    # whether the outermost query has a LIMIT
+])
+
+# Keywords after which a table name follows
+_TABLE_KEYWORDS = re.compile(r'^(FROM|((NATURAL|STRAIGHT_JOIN|CROSS|INNER|(LEFT|RIGHT|FULL)( OUTER)?) )?JOIN'
+                             r'|STRAIGHT_JOIN|INTO|UPDATE|TABLE)$')
+# Keywords ending a FROM list; a comma before one of these does not introduce another table
+_CLAUSE_KEYWORDS = {'WHERE', 'GROUP BY', 'HAVING', 'ORDER BY', 'LIMIT', 'ON', 'USING', 'UNION', 'UNION ALL',
+                    'WINDOW', 'FOR', 'SET', 'VALUES', 'SELECT', 'EXCEPT', 'INTERSECT', 'LOCK'}
+_LITERALS = (T.Literal.String.Single, T.Literal.String.Symbol, T.Literal.Number)
+
+
+def _is_literal(ttype):
+    return any(ttype in literal for literal in _LITERALS)
+
+
+def extract_statement(reply):
+    """The first SQL statement of a model reply, without markdown fences or trailing prose"""
+    text = reply.strip()
+    fenced = re.search(r"```(?:sql|mysql)?\s*(.*?)```", text, re.IGNORECASE | re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    elif len(text) > 1 and text[0] == text[-1] == '`' and '`' not in text[1:-1]:
+        text = text[1:-1].strip()
+    text = re.sub(r"^(sql|mysql)\s*:\s*", "", text, flags=re.IGNORECASE)
+    # Prose after the statement starts on a new paragraph or after the ';'
+    text = re.split(r"\n\s*\n", text, maxsplit=1)[0]
+    depth, quote = 0, None
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ';' and depth <= 0:
+            return text[:i].strip()
+    return text.strip()
+
+
+def _lex(sql):
+    """(ttype, value, depth) of every meaningful token; comments are dropped, optimizer hints kept"""
+    depth = 0
+    for ttype, value in tokenize(sql):
+        if ttype in T.Whitespace or ttype in T.Newline or (ttype in T.Comment and ttype not in T.Comment.Multiline.Hint):
+            continue
+        if ttype in T.Punctuation and value == ')':
+            depth -= 1
+        yield ttype, value, depth
+        if ttype in T.Punctuation and value == '(':
+            depth += 1
+
+
+def _join(parts):
+    """Join (ttype, value) pairs with single spaces, none inside `a.b`, `f(x)` or before `,` / `)`"""
+    out = []
+    previous = None
+    for ttype, value in parts:
+        if previous is not None:
+            tight = (previous[1] in ('(', '.') or value in (')', ',', '.')
+                     or (value == '(' and previous[0] in T.Name))
+            if not tight:
+                out.append(" ")
+        out.append(value)
+        previous = (ttype, value)
+    return "".join(out)
+
+
+def _shape(tokens):
+    """(kind, statements, tables, has_into, functions, has_variables) of a lexed statement"""
+    statements, kind, fallback_kind = 0, None, None
+    tables, ctes = [], set()
+    functions = []
+    has_into = has_variables = False
+    in_statement = False
+    expect_table, after_with = False, False
+    from_depths = set()   # nesting depths inside a FROM list
+    previous = None
+    for index, (ttype, value, depth) in enumerate(tokens):
+        upper = " ".join(value.upper().split())
+        from_depths = {d for d in from_depths if d <= depth}
+        if ttype in T.Punctuation and value == ';':
+            in_statement = False
+            continue
+        if not in_statement:
+            statements += 1
+            in_statement = True
+        if ttype in T.Keyword.CTE:
+            after_with = True
+        elif ttype in T.Keyword.DML or ttype in T.Keyword.DDL:
+            fallback_kind = fallback_kind or upper
+            if depth == 0:
+                if kind is None and statements == 1:
+                    kind = upper
+                after_with = False
+        elif after_with and ttype in T.Name and depth == 0 and previous in (None, ',', 'WITH', 'RECURSIVE'):
+            ctes.add(value.strip('`').lower())
+
+        if ttype in T.Keyword and upper == 'INTO' and (kind or fallback_kind) == 'SELECT':
+            has_into = True
+        if ttype in T.Operator and value.startswith('@'):
+            has_variables = True
+        if ((ttype in T.Name or ttype in T.Keyword) and index + 1 < len(tokens) and tokens[index + 1][1] == '('
+                and upper not in functions):
+            functions.append(upper)
+
+        if expect_table:
+            expect_table = False
+            if ttype in T.Name or (ttype in T.Keyword and upper not in _CLAUSE_KEYWORDS):
+                name = value.strip('`')
+                following = tokens[index + 1:index + 3]
+                if len(following) == 2 and following[0][1] == '.' and following[1][0] in T.Name:
+                    name = f"{name}.{following[1][1].strip('`')}"
+                if name.lower() not in ctes and name not in tables:
+                    tables.append(name)
+        if ttype in T.Keyword and _TABLE_KEYWORDS.match(upper):
+            expect_table = upper != 'INTO' or kind in ('INSERT', 'REPLACE')
+            if upper == 'FROM' or 'JOIN' in upper:
+                from_depths.add(depth)
+        elif ttype in T.Keyword and upper in _CLAUSE_KEYWORDS:
+            from_depths.discard(depth)
+        elif value == ',' and depth in from_depths:
+            expect_table = True
+        previous = upper
+    return kind or fallback_kind or 'UNKNOWN', statements, tuple(tables), has_into, tuple(functions), has_variables
+
+
+class SQLNormalizer:
+    """Memoizing front end for parse(); thread safe.
+
+    Args:
+        max_entries (int): Statements kept by text, and shapes kept by fingerprint
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._parsed = OrderedDict()   # text -> ParsedSQL
+        self._shapes = OrderedDict()   # fingerprint -> (kind, ..., has_variables)
+        self._hits = 0
+        self._shape_hits = 0
+        self._misses = 0
+
+    def parse(self, sql):
+        """ParsedSQL of `sql`, from the memo when the same text was parsed before"""
+        with self._lock:
+            parsed = self._parsed.get(sql)
+            if parsed is not None:
+                self._parsed.move_to_end(sql)
+                self._hits += 1
+                return parsed
+
+        tokens = list(_lex(sql))
+        while tokens and tokens[-1][1] == ';':
+            tokens.pop()
+        # The text is the first statement only. The fingerprint covers everything,
+        # so "SELECT 1; DROP ..." never shares a memoized shape with "SELECT 1".
+        end = next((i for i, (ttype, value, depth) in enumerate(tokens) if value == ';' and depth == 0), len(tokens))
+        text, fingerprint = [], []   # (ttype, value) pairs
+        limit, has_limit = None, False
+        for i, (ttype, value, depth) in enumerate(tokens):
+            if ttype in T.Keyword:
+                value = " ".join(value.split())
+                if i < end and depth == 0 and value.upper() == 'LIMIT':
+                    has_limit = True
+                    limit = self._limit_rows(tokens[i + 1:end])
+            if i < end:
+                text.append((ttype, value))
+            if _is_literal(ttype):
+                # A run of literals in a list (IN (1, 2, 3)) folds into one
+                if len(fingerprint) >= 2 and fingerprint[-1][1] == ',' and fingerprint[-2][1] in ('?', '?+'):
+                    fingerprint[-2:] = [(T.Literal, '?+')]
+                else:
+                    fingerprint.append((T.Literal, '?'))
+            else:
+                fingerprint.append((ttype, value.upper() if ttype in T.Keyword else value))
+        # IN (?) and IN (?+) are the same query with a different list length
+        fingerprint = re.sub(r"\bIN \(\?\)", "IN (?+)", _join(fingerprint))
+        digest = hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+        with self._lock:
+            shape = self._shapes.get(fingerprint)
+            if shape is not None:
+                self._shapes.move_to_end(fingerprint)
+                self._shape_hits += 1
+        if shape is None:
+            shape = _shape(tokens)
+            with self._lock:
+                self._remember(self._shapes, fingerprint, shape)
+
+        parsed = ParsedSQL(_join(text), fingerprint, digest, *shape, limit, has_limit)
+        with self._lock:
+            self._misses += 1
+            self._remember(self._parsed, sql, parsed)
+        return parsed
+
+    @staticmethod
+    def _limit_rows(tokens):
+        """Row count of `LIMIT n`, `LIMIT offset, n` or `LIMIT n OFFSET m`"""
+        values = [value for ttype, value, _ in tokens[:3]]
+        if len(values) >= 3 and values[1] == ',':
+            values = values[2:]
+        return int(values[0]) if values and values[0].isdigit() else None
+
+    def _remember(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._parsed.clear()
+            self._shapes.clear()
+
+    def stats(self):
+        """Memo hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._parsed),
+                'fingerprints': len(self._shapes),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'shape_hits': self._shape_hits,
+            }
+
+
+normalizer = SQLNormalizer()
+
+
+def parse(sql):
+    """ParsedSQL of `sql` through the shared memo"""
+    return normalizer.parse(sql)
+
+
+def is_safe_select(parsed):
+    """A single SELECT that writes nothing (no INTO OUTFILE / DUMPFILE / variables)"""
+    return parsed.statements == 1 and parsed.kind == 'SELECT' and not parsed.has_into
+
+
+def add_limit(parsed, limit):
+    """Normalized SQL with `LIMIT limit` on the outermost query, unless it already has one"""
+    if parsed.has_limit:
+        return parsed.sql
+    return f"{parsed.sql} LIMIT {int(limit)}"
@@ -0,0 +1,97 @@
+"""
+Lightweight query results for the natural-language SQL path.
+
+A QueryResult is the column names plus a lazily fetched row iterator. Rows
+come from an unbuffered cursor in fetchmany() batches, so memory stays
+bounded by the batch size however large the result is, and DECIMAL columns
+are converted to float once, as each batch is read.
+"""
+
+from mysql.connector import FieldType
+
+DECIMAL_TYPES = (FieldType.DECIMAL, FieldType.NEWDECIMAL)
+
+
+def _decimals_to_float(row, indexes):
+    row = list(row)
+    for i in indexes:
+        if row[i] is not None:
+            row[i] = float(row[i])
+    return row
+
+
+class QueryResult:
+    """Column names plus a one-shot iterator over the result rows.
+
+    Args:
+        columns (list): Column names, in row order
+        batches (iterator): Yields lists of rows
+        on_close (callable): Called once with `exhausted` (bool) when the result is closed
+        type_codes (list): mysql.connector FieldType code per column, None when unknown
+
+    Iterate it (or `iter_batches()`) once; it closes itself when the rows run
+    out, and can be used as a context manager to close it early.
+    """
+
+    def __init__(self, columns, batches, on_close=None, type_codes=None):
+        self.columns = columns
+        self.type_codes = type_codes
+        self.rows_read = 0
+        self._batches = batches
+        self._on_close = on_close
+        self._rows = None
+        self._exhausted = False
+        self._closed = False
+
+    @classmethod
+    def from_cursor(cls, cursor, on_close=None, batch_size=500):
+        """Stream the rows of an executed (unbuffered) DB-API cursor"""
+        if cursor.description is None:
+            return cls([], iter(()), on_close)
+
+        columns = [desc[0] for desc in cursor.description]
+        decimal_indexes = [i for i, desc in enumerate(cursor.description) if desc[1] in DECIMAL_TYPES]
+
+        def batches():
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                if decimal_indexes:
+                    batch = [_decimals_to_float(row, decimal_indexes) for row in batch]
+                yield batch
+
+        return cls(columns, batches(), on_close, type_codes=[desc[1] for desc in cursor.description])
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """Wrap rows that are already in memory"""
+        return cls(list(columns), iter([list(rows)]) if rows else iter(()))
+
+    def iter_batches(self):
+        try:
+            for batch in self._batches:
+                self.rows_read += len(batch)
+                yield batch
+            self._exhausted = True
+        finally:
+            self.close()
+
+    def __iter__(self):
+        # One shared row iterator, so a partial read (islice) can be resumed
+        if self._rows is None:
+            self._rows = (row for batch in self.iter_batches() for row in batch)
+        return self._rows
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._on_close is not None:
+            self._on_close(self._exhausted)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,128 @@
+"""
+Shared pytest fixtures for the backend.
+
+Tests that need a real MySQL server use the `mysql_db` fixture, which is
+skipped unless TEST_MYSQL_HOST is set. It creates a scratch database
+(TEST_MYSQL_DB, default `online_store_test`) with the online_store tables
+and points the shared connection pool at it.
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# app.py refuses to import without a Gemini key; tests never call the real API
+os.environ.setdefault("GEMINI", "test-key")
+os.environ.setdefault("QUESTION_CACHE_PATH", ":memory:")
+
+SCHEMA_SQL = [
+    """CREATE TABLE users (
+        user_id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        phone VARCHAR(20),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE categories (
+        category_id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(255) NOT NULL,
+        description TEXT
+    )""",
+    """CREATE TABLE products (
+        product_id INT PRIMARY KEY AUTO_INCREMENT,
+        category_id INT NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        description TEXT,
+        base_price DECIMAL(10,2) NOT NULL,
+        brand VARCHAR(255),
+        image_url VARCHAR(500),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE product_variants (
+        variant_id INT PRIMARY KEY AUTO_INCREMENT,
+        product_id INT NOT NULL,
+        sku VARCHAR(100) UNIQUE NOT NULL,
+        color VARCHAR(50),
+        size VARCHAR(50),
+        additional_price DECIMAL(10,2) DEFAULT 0.00
+    )""",
+    """CREATE TABLE inventory (
+        variant_id INT PRIMARY KEY,
+        quantity INT NOT NULL DEFAULT 0,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE orders (
+        order_id INT PRIMARY KEY AUTO_INCREMENT,
+        user_id INT NOT NULL,
+        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status ENUM('pending', 'processing', 'shipped', 'delivered', 'cancelled') DEFAULT 'pending',
+        total_amount DECIMAL(10,2) NOT NULL,
+        shipping_address TEXT NOT NULL
+    )""",
+    """CREATE TABLE order_items (
+        order_item_id INT PRIMARY KEY AUTO_INCREMENT,
+        order_id INT NOT NULL,
+        variant_id INT NOT NULL,
+        quantity INT NOT NULL,
+        price DECIMAL(10,2) NOT NULL
+    )""",
+    """CREATE TABLE reviews (
+        review_id INT PRIMARY KEY AUTO_INCREMENT,
+        user_id INT NOT NULL,
+        product_id INT NOT NULL,
+        rating INT CHECK (rating >= 1 AND rating <= 5),
+        comment TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+
+@pytest.fixture
+def mysql_db(monkeypatch):
+    """Fresh scratch database wired into db.get_pool(); yields a raw connection"""
+    host = os.environ.get("TEST_MYSQL_HOST")
+    if not host:
+        pytest.skip("TEST_MYSQL_HOST not set, MySQL-backed test skipped")
+
+    import mysql.connector
+    import db
+
+    settings = dict(
+        host=host,
+        user=os.environ.get("TEST_MYSQL_USER", "root"),
+        password=os.environ.get("TEST_MYSQL_PASS", ""),
+    )
+    name = os.environ.get("TEST_MYSQL_DB", "online_store_test")
+
+    admin = mysql.connector.connect(autocommit=True, **settings)
+    cursor = admin.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cursor.execute(f"CREATE DATABASE `{name}`")
+    cursor.execute(f"USE `{name}`")
+    for statement in SCHEMA_SQL:
+        cursor.execute(statement)
+    cursor.close()
+
+    pool = db.ConnectionPool(
+        lambda: mysql.connector.connect(database=name, autocommit=True, **settings),
+        size=4
+    )
+    monkeypatch.setattr(db, "_pool", pool)
+
+    # Watermarks of a fresh scratch database can repeat, never reuse cached sections
+    import app
+    app.analytics_cache.clear()
+    try:
+        yield admin
+    finally:
+        pool.close_all()
+        cursor = admin.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        cursor.close()
+        admin.close()
@@ -0,0 +1,178 @@
+"""
+Tests for the streaming /ask/stream endpoint against a stubbed model stream.
+"""
+
+import json
+
+import pytest
+
+import app as backend
+import export
+import question_cache
+from question_cache import QuestionCache
+from sql_guard import QueryGuard
+from sql_result import QueryResult
+
+
+def stub_stream(*chunks):
+    """Replacement for stream_from_gemini yielding canned chunks"""
+    calls = []
+
+    def stream(user_question):
+        calls.append(user_question)
+        yield from chunks
+
+    stream.calls = calls
+    return stream
+
+
+def read_events(response):
+    """Parse an SSE body into a list of (event, data) pairs"""
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if not block.strip():
+            continue
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.fixture(autouse=True)
+def fresh_question_cache(monkeypatch):
+    monkeypatch.setattr(backend, 'question_cache', QuestionCache(":memory:"))
+
+
+@pytest.fixture(autouse=True)
+def cheap_plans(monkeypatch):
+    """Every statement explains as a small indexed lookup"""
+    plan = {'query_block': {'table': {'table_name': 'products', 'access_type': 'ref', 'rows_examined_per_scan': 3}}}
+    monkeypatch.setattr(backend, 'query_guard', QueryGuard(lambda sql: plan))
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+def test_conversational_reply_streams_tokens_as_they_arrive(monkeypatch, client):
+    monkeypatch.setattr(backend, 'stream_from_gemini', stub_stream("  Hello", " there,", " how can I help?"))
+
+    events = read_events(client.post('/ask/stream', json={'message': 'Hi'}))
+
+    assert [e for e, _ in events] == ['meta', 'token', 'token', 'token', 'answer', 'done']
+    assert [d['text'] for e, d in events if e == 'token'] == ["Hello", " there,", " how can I help?"]
+    assert events[-2][1]['text'] == "Hello there, how can I help?"
+    assert events[-1][1]['first_token_ms'] is not None
+
+
+def test_sql_reply_emits_sql_then_rows_then_answer(monkeypatch, client):
+    monkeypatch.setattr(backend, 'stream_from_gemini', stub_stream("SEL", "ECT name, brand ", "FROM products;"))
+    monkeypatch.setattr(backend, 'STREAM_ROW_BATCH', 2)
+    executed = []
+
+    rows = [['Phone', 'Acme'], ['Laptop', 'Zen'], ['Tablet', 'Acme']]
+
+    def run_sql(sql, batch_size):
+        executed.append(sql)
+        batches = (rows[i:i + batch_size] for i in range(0, len(rows), batch_size))
+        return QueryResult(['name', 'brand'], batches)
+
+    monkeypatch.setattr(backend, 'run_sql', run_sql)
+
+    events = read_events(client.post('/ask/stream', json={'message': 'List products'}))
+
+    assert [e for e, _ in events] == ['meta', 'sql', 'columns', 'rows', 'rows', 'answer', 'done']
+    assert events[1][1] == {'sql': 'SELECT name, brand FROM products',
+                            'export_token': export.sign_sql('SELECT name, brand FROM products')}
+    assert events[2][1] == {'columns': ['name', 'brand']}
+    assert events[3][1]['rows'] + events[4][1]['rows'] == [['Phone', 'Acme'], ['Laptop', 'Zen'], ['Tablet', 'Acme']]
+    assert executed == ['SELECT /*+ MAX_EXECUTION_TIME(5000) */ name, brand FROM products LIMIT 100;']
+
+
+def test_unsafe_sql_is_not_run(monkeypatch, client):
+    monkeypatch.setattr(backend, 'stream_from_gemini', stub_stream("SELECT 1 FROM users; DROP TABLE users"))
+    monkeypatch.setattr(backend, 'clean_sql', lambda reply: "DELETE FROM users;")
+    monkeypatch.setattr(backend, 'run_sql', lambda sql, **kwargs: pytest.fail("unsafe SQL executed"))
+
+    events = read_events(client.post('/ask/stream', json={'message': 'Remove users'}))
+
+    assert [e for e, _ in events] == ['meta', 'answer', 'done']
+    assert "valid SELECT" in events[1][1]['text']
+
+
+def test_short_and_select_like_replies_are_conversational(monkeypatch, client):
+    monkeypatch.setattr(backend, 'stream_from_gemini', stub_stream("Selecting a gift? ", "I can help."))
+
+    events = read_events(client.post('/ask/stream', json={'message': 'gift ideas'}))
+
+    assert [e for e, _ in events] == ['meta', 'token', 'answer', 'done']
+    assert events[1][1]['text'] == "Selecting a gift? I can help."
+
+
+def test_repeat_question_is_served_from_cache(monkeypatch, client):
+    stream = stub_stream("Hi!")
+    monkeypatch.setattr(backend, 'stream_from_gemini', stream)
+
+    client.post('/ask/stream', json={'message': 'Hello'}).get_data()
+    events = read_events(client.post('/ask/stream', json={'message': 'hello!'}))
+
+    assert len(stream.calls) == 1
+    assert events[0] == ('meta', {'cached': True})
+    assert events[1] == ('token', {'text': 'Hi!'})
+
+
+def test_failing_cached_sql_is_evicted_and_asked_again(monkeypatch, client):
+    backend.question_cache.put("List products", 'sql', "SELECT name FROM gone;")
+    monkeypatch.setattr(backend, 'fetch_sql_result', lambda sql: "Table 'gone' doesn't exist"
+                        if 'gone' in sql else QueryResult.from_rows(['name'], [('Phone',)]))
+    monkeypatch.setattr(backend, 'get_sql_from_gemini', lambda q: "SELECT name FROM products;")
+
+    response = client.post('/ask', json={'message': 'List products'}).get_json()
+
+    assert response['cached'] is False and response['sql'] == "SELECT name FROM products"
+    assert backend.question_cache.get("List products") == ('sql', "SELECT name FROM products;")
+
+
+def test_purge_by_another_worker_is_seen_once_memory_entries_revalidate(tmp_path, monkeypatch):
+    path = str(tmp_path / "questions.sqlite3")
+    mine, theirs = QuestionCache(path, revalidate=60), QuestionCache(path)
+    mine.put("Hello", 'text', "Hi!")
+    theirs.purge()
+
+    monkeypatch.setattr(mine, '_db', None)   # memory hits never touch SQLite
+    assert mine.get("hello") == ('text', "Hi!")
+    monkeypatch.undo()
+
+    mine.revalidate = 0
+    assert mine.get("hello") is None
+    theirs.put("Hello", 'text', "Hey!")
+    assert mine.get("hello") == ('text', "Hey!")
+
+
+def test_stored_answers_are_pruned_by_age_and_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(question_cache, 'PRUNE_EVERY', 1)
+    cache = QuestionCache(str(tmp_path / "questions.sqlite3"), ttl=60, max_stored=3)
+    cache._db.execute("INSERT INTO question_cache VALUES ('stale', 'text', 'old', 0)")
+    for i in range(5):
+        cache.put(f"question {i}", 'text', str(i))
+
+    assert cache.stats()['entries'] == 3 and cache.stats()['pruned'] == 3
+    stored = {row[0] for row in cache._db.execute("SELECT question FROM question_cache")}
+    assert stored == {"question 2", "question 3", "question 4"}
+
+
+def test_model_error_is_reported_as_event(monkeypatch, client):
+    def failing_stream(user_question):
+        yield "Hel"
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(backend, 'stream_from_gemini', failing_stream)
+
+    events = read_events(client.post('/ask/stream', json={'message': 'Hi'}))
+
+    assert ('error', {'message': 'model unavailable'}) in events
+    assert events[-1][0] == 'done'
+
+
+def test_missing_message_is_rejected(client):
+    assert client.post('/ask/stream', json={}).status_code == 400
@@ -0,0 +1,290 @@
+"""
+Tests for the columnar engine: every aggregate against a plain Python
+reference over datagen rows, and against the SQL it replaces when MySQL is
+available.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import columnar
+import datagen
+
+SCALE = datagen.Scale(users=200, products=40, orders=1500, reviews=0)
+END = date(2024, 6, 1)
+
+
+@pytest.fixture(scope='module')
+def tables():
+    generator = datagen.Generator(SCALE, seed=11, end=END, years=1)
+    rows = defaultdict(list)
+    for table, chunk in generator.chunks():
+        rows[table].extend(chunk)
+    return rows
+
+
+def cents(value):
+    return round(value * 100)
+
+
+def append(store, orders, items):
+    store.append(
+        {'order_id': [o[0] for o in orders], 'order_ts': [columnar.to_seconds(o[2]) for o in orders],
+         'status': [o[3] for o in orders], 'total_cents': [cents(o[4]) for o in orders]},
+        {'order_id': [i[1] for i in items], 'variant_id': [i[2] for i in items],
+         'quantity': [i[3] for i in items], 'price_cents': [cents(i[4]) for i in items]},
+    )
+
+
+def build(directory, tables, split=None):
+    """Store holding `tables`, appended in two steps when `split` (an order_id) is given"""
+    store = columnar.ColumnStore(str(directory))
+    store.reset()
+    store.replace_catalog(
+        [(c[0], c[1]) for c in tables['categories']],
+        [(p[0], p[1], p[2], p[5]) for p in tables['products']],
+        [(v[0], v[1]) for v in tables['product_variants']],
+    )
+    orders, items = tables['orders'], tables['order_items']
+    split = split or orders[-1][0]
+    append(store, [o for o in orders if o[0] <= split], [i for i in items if i[1] <= split])
+    if split < orders[-1][0]:
+        append(store, [o for o in orders if o[0] > split], [i for i in items if i[1] > split])
+    return store
+
+
+# Python reference versions of the dashboard SQL
+
+def ref_sales_trend(tables, start, end):
+    days = defaultdict(lambda: [0, 0])
+    for order_id, _, placed, status, total, _ in tables['orders']:
+        if status != 'cancelled' and start <= placed < end:
+            days[placed.date()][0] += 1
+            days[placed.date()][1] += cents(total)
+    return [{'date': day, 'orders': n, 'revenue': c / 100} for day, (n, c) in sorted(days.items())]
+
+
+def ref_top_products(tables, start=None, end=None):
+    orders = {o[0]: o for o in tables['orders']}
+    variant_product = {v[0]: v[1] for v in tables['product_variants']}
+    products = {p[0]: p for p in tables['products']}
+    totals = defaultdict(lambda: [0, 0])
+    for _, order_id, variant_id, quantity, price in tables['order_items']:
+        order = orders[order_id]
+        if order[3] == 'cancelled' or (start and order[2] < start) or (end and order[2] >= end):
+            continue
+        totals[variant_product[variant_id]][0] += quantity
+        totals[variant_product[variant_id]][1] += quantity * cents(price)
+    ranked = sorted(totals.items(), key=lambda item: (-item[1][0], -item[0]))
+    return [{'product_id': pid, 'name': products[pid][2], 'brand': products[pid][5], 'total_sold': sold,
+             'revenue': c / 100} for pid, (sold, c) in ranked]
+
+
+def ref_categories(tables):
+    variant_product = {v[0]: v[1] for v in tables['product_variants']}
+    product_category = {p[0]: p[1] for p in tables['products']}
+    rows = {c[0]: {'category': c[1], 'product_count': 0, 'total_sold': 0, 'revenue': 0} for c in tables['categories']}
+    for category_id in product_category.values():
+        rows[category_id]['product_count'] += 1
+    for _, _, variant_id, quantity, price in tables['order_items']:
+        row = rows[product_category[variant_product[variant_id]]]
+        row['total_sold'] += quantity
+        row['revenue'] += quantity * cents(price)
+    for row in rows.values():
+        row['revenue'] /= 100
+    return sorted(rows.values(), key=lambda row: row['category'])
+
+
+def test_aggregates_match_the_reference(tmp_path, tables):
+    snapshot = build(tmp_path, tables).snapshot()
+    start, end = datetime(2023, 11, 1), datetime(2024, 1, 15)
+
+    assert snapshot.sales_trend(start, end, 1000) == ref_sales_trend(tables, start, end)
+    assert snapshot.sales_trend(start, end, 5) == ref_sales_trend(tables, start, end)[:5]
+
+    statuses = defaultdict(lambda: [0, 0])
+    for order in tables['orders']:
+        statuses[order[3]][0] += 1
+        statuses[order[3]][1] += cents(order[4])
+    assert {row['status']: [row['count'], cents(row['revenue'])] for row in snapshot.order_status()} == statuses
+    counts = [row['count'] for row in snapshot.order_status()]
+    assert counts == sorted(counts, reverse=True)
+
+    assert snapshot.top_products(limit=1000) == ref_top_products(tables)
+    assert snapshot.top_products(start, end, limit=1000) == ref_top_products(tables, start, end)
+    assert sorted(snapshot.category_performance(), key=lambda row: row['category']) == ref_categories(tables)
+
+
+def test_top_products_keyset_pages_cover_the_ranking(tmp_path, tables):
+    snapshot = build(tmp_path, tables).snapshot()
+    pages, after = [], None
+    while True:
+        page = snapshot.top_products(after=after, limit=7)
+        if not page:
+            break
+        pages.extend(page)
+        after = (page[-1]['total_sold'], page[-1]['product_id'])
+    assert pages == ref_top_products(tables)
+
+
+def test_incremental_append_equals_full_build(tmp_path, tables):
+    full = build(tmp_path / 'full', tables).snapshot()
+    split = tables['orders'][len(tables['orders']) // 3][0]
+    store = build(tmp_path / 'split', tables, split=split)
+    snapshot = store.snapshot()
+
+    assert snapshot.last_order_id == tables['orders'][-1][0]
+    for name in columnar.COLUMNS['items']:
+        assert (snapshot.items[name] == full.items[name]).all()
+    assert snapshot.top_products(limit=1000) == full.top_products(limit=1000)
+
+    with pytest.raises(ValueError):
+        append(store, tables['orders'][:1], [])
+
+
+def test_status_updates_are_seen_by_every_reader(tmp_path, tables):
+    store = build(tmp_path, tables)
+    other_worker = columnar.ColumnStore(str(tmp_path))
+    delivered = [o for o in tables['orders'] if o[3] == 'delivered'][:10]
+    before = {row['status']: row['count'] for row in other_worker.snapshot().order_status()}
+
+    mapped = other_worker.snapshot()
+
+    changed = store.update_orders([o[0] for o in delivered], ['cancelled'] * 10, [cents(o[4]) for o in delivered])
+
+    assert changed == 10
+    after = {row['status']: row['count'] for row in other_worker.snapshot().order_status()}
+    assert after['delivered'] == before['delivered'] - 10
+    assert after['cancelled'] == before['cancelled'] + 10
+    # The snapshot mapped before the patch is left as it was
+    assert {row['status']: row['count'] for row in mapped.order_status()} == before
+    assert store.update_orders([o[0] for o in delivered], ['cancelled'] * 10, [cents(o[4]) for o in delivered]) == 0
+
+    too_many = [f"status {i}" for i in range(300)]
+    with pytest.raises(ValueError):
+        store.update_orders([delivered[0][0]] * 300, too_many, [0] * 300)
+
+
+class FakeConnection:
+    """Answers each query with the rows of the first (needle, rows) whose needle it contains"""
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def cursor(self):
+        return FakeCursor(self.answers)
+
+
+class FakeCursor:
+    def __init__(self, answers):
+        self.answers = answers
+        self.rows = []
+
+    def execute(self, query, params=()):
+        self.rows = list(next(rows for needle, rows in self.answers if needle in query))
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+def test_sync_patches_recent_orders_in_one_generation(tmp_path, tables, monkeypatch):
+    store = build(tmp_path, tables)
+    delivered = {o[0] for o in tables['orders'] if o[3] == 'delivered'}
+    # Spread over many fetch batches
+    cancelled = set(sorted(delivered)[::len(delivered) // 10][:10])
+    conn = FakeConnection([
+        ('MAX(category_id)', [(0, 0, 0, 0, 0, 0)]),
+        ('FROM categories', [(c[0], c[1]) for c in tables['categories']]),
+        ('FROM products', [(p[0], p[1], p[2], p[5]) for p in tables['products']]),
+        ('FROM product_variants', [(v[0], v[1]) for v in tables['product_variants']]),
+        ('order_date >= %s', [(o[0], 'cancelled' if o[0] in cancelled else o[3], cents(o[4]))
+                              for o in tables['orders']]),
+        ('MAX(order_id)', [(tables['orders'][-1][0],)]),
+    ])
+    forks = []
+    fork = store._fork
+    monkeypatch.setattr(store, '_fork', lambda meta, rewrite: forks.append(1) or fork(meta, rewrite))
+
+    result = columnar.sync(store, conn, batch_size=100)
+
+    assert result['updated_orders'] == 10 and len(forks) == 1
+    counts = {row['status']: row['count'] for row in store.snapshot().order_status()}
+    assert counts['delivered'] == len(delivered) - 10
+
+
+def test_engine_falls_back_while_the_snapshot_is_behind(tmp_path, tables):
+    store = build(tmp_path, tables)
+    watermark = {'orders': tables['orders'][-1][0]}
+    engine = columnar.ColumnarEngine(store, connection=None, watermark=lambda: watermark['orders'])
+
+    assert engine.query('order_status')
+    watermark['orders'] += 1
+    assert engine.query('order_status') is None
+    assert engine.stats()['served'] == 1 and engine.stats()['fallbacks'] == 1
+
+
+def test_engine_falls_back_when_the_snapshot_cannot_be_mapped(tmp_path, tables, monkeypatch):
+    store = build(tmp_path, tables)
+    engine = columnar.ColumnarEngine(store, connection=None)
+
+    def replaced_generation():
+        raise FileNotFoundError("generation removed by the writer")
+    monkeypatch.setattr(store, 'snapshot', replaced_generation)
+
+    assert engine.query('order_status') is None
+    monkeypatch.undo()
+    assert engine.stats()['fallbacks'] == 1 and engine.query('order_status')
+
+
+def test_sync_from_mysql_matches_the_sql_oracle(tmp_path, mysql_db):
+    """The SQL endpoints are the oracle: same answers from a snapshot of the same database"""
+    import app
+
+    generator = datagen.Generator(datagen.PRESETS['tiny'], seed=5, end=date.today())
+    datagen.run(generator, datagen.MySQLSink(mysql_db, method='executemany', replace=True))
+    store = columnar.ColumnStore(str(tmp_path))
+    engine = columnar.ColumnarEngine(store, app.get_pool().connection)
+    assert engine.refresh()['new_orders'] == datagen.PRESETS['tiny'].orders
+
+    def normalize(rows):
+        return sorted(({k: float(v) if isinstance(v, Decimal) else v for k, v in row.items()} for row in rows),
+                      key=lambda row: sorted(row.items(), key=str))
+
+    snapshot = store.snapshot()
+    start, end = date.today() - timedelta(days=60), date.today() + timedelta(days=1)
+    assert normalize(snapshot.sales_trend(start, end, 400)) == \
+        normalize(app.execute_query(app.SALES_TREND_QUERY, (start, end, 400)))
+    sql_top = app.execute_query(app.TOP_PRODUCTS_QUERY.format(where="WHERE o.status != 'Cancelled'", having=""), (10,))
+    assert normalize(snapshot.top_products(limit=10)) == normalize(sql_top)
+
+    # A cancellation inside the lookback window is picked up by the next refresh
+    cursor = mysql_db.cursor()
+    cursor.execute("UPDATE orders SET status = 'cancelled' WHERE status = 'delivered' ORDER BY order_id DESC LIMIT 3")
+    mysql_db.commit()
+    cursor.close()
+    assert engine.refresh()['updated_orders'] == 3
+
+
+def test_dashboard_routes_answer_from_the_snapshot(tmp_path, tables, monkeypatch):
+    import app
+    from analytics_cache import AnalyticsCache
+
+    engine = columnar.ColumnarEngine(build(tmp_path, tables), connection=None)
+    monkeypatch.setattr(app, 'columnar_engine', engine)
+    monkeypatch.setattr(app, 'analytics_cache', AnalyticsCache(lambda: None, ttl=0))
+    monkeypatch.setattr(app, 'execute_query', lambda *args: pytest.fail("SQL executed"))
+    client = app.app.test_client()
+
+    first = client.get('/api/analytics/top-products?limit=3').get_json()
+    second = client.get(f"/api/analytics/top-products?limit=3&cursor={first['next_cursor']}").get_json()
+    assert [row['product_id'] for row in first['data'] + second['data']] == \
+        [row['product_id'] for row in ref_top_products(tables)[:6]]
+    assert client.get('/api/analytics/order-status').get_json()['data'][0]['status'] == 'delivered'
+    assert engine.stats()['served'] == 3
@@ -0,0 +1,148 @@
+"""
+Tests for watermark ETags on the analytics routes and response compression.
+"""
+
+import gzip
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask, Response, jsonify
+
+import app as backend
+import compression
+from analytics_cache import AnalyticsCache
+from compression import Compressor
+
+ROWS = [{'status': f"status {i}", 'count': i, 'revenue': i * 10.5} for i in range(100)]
+
+
+@pytest.fixture
+def analytics(monkeypatch):
+    """Analytics routes over fake watermarks and a counted execute_query"""
+    state = {'marks': {'orders': 1}, 'queries': 0}
+    monkeypatch.setattr(backend, 'analytics_cache', AnalyticsCache(lambda: dict(state['marks']), probe_interval=0))
+
+    def execute_query(query, params=None):
+        state['queries'] += 1
+        return ROWS
+    monkeypatch.setattr(backend, 'execute_query', execute_query)
+    return state
+
+
+def test_unchanged_watermarks_answer_304_without_querying(analytics):
+    client = backend.app.test_client()
+    first = client.get('/api/analytics/order-status')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/"')
+
+    again = client.get('/api/analytics/order-status', headers={'If-None-Match': etag})
+    assert (again.status_code, again.data, again.headers['ETag']) == (304, b'', etag)
+    assert analytics['queries'] == 1
+
+    analytics['marks']['orders'] = 2
+    changed = client.get('/api/analytics/order-status', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert analytics['queries'] == 2
+
+
+def test_etags_differ_per_query_string_and_skip_errors(analytics, monkeypatch):
+    monkeypatch.setattr(backend, 'execute_query', lambda query, params=None: [])
+    client = backend.app.test_client()
+    first = client.get('/api/analytics/top-products?limit=5').headers.get('ETag')
+    second = client.get('/api/analytics/top-products?limit=6').headers.get('ETag')
+    assert first and second and first != second
+    assert 'ETag' not in client.get('/api/analytics/top-products?limit=x').headers
+
+    monkeypatch.setattr(backend, 'ANALYTICS_ETAGS', False)
+    assert 'ETag' not in client.get('/api/analytics/order-status').headers
+
+
+def test_failed_section_queries_are_not_cached(analytics, monkeypatch):
+    class BrokenCursor:
+        def execute(self, query, params):
+            raise RuntimeError("Lost connection to MySQL server")
+
+        def close(self):
+            pass
+
+    class BrokenConnection:
+        def cursor(self, dictionary=False):
+            return BrokenCursor()
+
+    @contextmanager
+    def broken_connection():
+        yield BrokenConnection()
+
+    monkeypatch.setattr(backend, 'get_db_connection', broken_connection)
+    monkeypatch.setattr(backend, 'execute_query', backend._execute_query)
+    client = backend.app.test_client()
+    failed = client.get('/api/analytics/order-status')
+    assert failed.status_code == 500 and 'ETag' not in failed.headers
+
+    monkeypatch.setattr(backend, 'execute_query', lambda query, params=None: ROWS)
+    assert client.get('/api/analytics/order-status').get_json()['data'] == ROWS
+
+
+def test_analytics_json_is_gzipped_when_accepted(analytics):
+    client = backend.app.test_client()
+    plain = client.get('/api/analytics/order-status')
+    zipped = client.get('/api/analytics/order-status', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert gzip.decompress(zipped.data) == plain.data
+    assert len(zipped.data) < len(plain.data) / 3
+
+
+@pytest.fixture
+def small_app():
+    app = Flask('compression-test')
+    compressor = Compressor(min_size=100, encodings=('br', 'gzip')).init_app(app)
+
+    @app.route('/big')
+    def big():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/events')
+    def events():
+        return Response("data: x\n\n" * 100, mimetype='text/event-stream')
+
+    @app.route('/export')
+    def export():
+        return Response((f"{i},row {i}\n" for i in range(5000)), mimetype='text/csv')
+
+    return app.test_client(), compressor
+
+
+def test_only_large_compressible_bodies_are_encoded(small_app):
+    client, compressor = small_app
+    headers = {'Accept-Encoding': 'gzip, br;q=0.5'}
+
+    assert 'Content-Encoding' not in client.get('/small', headers=headers).headers
+    assert 'Content-Encoding' not in client.get('/events', headers=headers).headers
+    assert 'Content-Encoding' not in client.get('/big', headers={'Accept-Encoding': 'identity'}).headers
+    assert client.get('/big', headers=headers).headers['Content-Encoding'] == 'gzip'
+    stats = compressor.stats()
+    assert stats['too_small'] == 1 and stats['compressed']['gzip'] == 1 and stats['ratio'] < 0.5
+
+
+def test_streamed_exports_are_compressed_chunk_by_chunk(small_app):
+    client, compressor = small_app
+    response = client.get('/export', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data).decode().splitlines()[-1] == "4999,row 4999"
+    assert compressor.stats()['streamed'] == 1
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli_is_preferred_when_installed(small_app):
+    client, _ = small_app
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert compression.brotli.decompress(response.data) == client.get('/big').data
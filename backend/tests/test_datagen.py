@@ -0,0 +1,110 @@
+"""Synthetic data generator: determinism, invariants and skew"""
+
+import csv
+import os
+from collections import Counter
+from datetime import date
+
+import datagen
+
+SCALE = datagen.Scale(users=300, products=60, orders=2000, reviews=400)
+END = date(2024, 6, 1)
+
+
+def collect(chunk_size=50000, seed=7):
+    generator = datagen.Generator(SCALE, seed=seed, end=END, years=1)
+    tables = {table: [] for table in datagen.TABLES}
+    for table, rows in generator.chunks(chunk_size):
+        tables[table].extend(rows)
+    return generator, tables
+
+
+def test_same_seed_same_rows_whatever_the_chunk_size():
+    _, whole = collect()
+    _, chunked = collect(chunk_size=97)
+    assert whole == chunked
+    _, other = collect(seed=8)
+    assert other['orders'] != whole['orders']
+
+
+def test_row_counts_and_referential_integrity():
+    generator, tables = collect()
+    assert len(tables['users']) == SCALE.users
+    assert len(tables['products']) == SCALE.products
+    assert len(tables['orders']) == SCALE.orders
+    assert len(tables['payments']) == SCALE.orders
+    assert 0 < len(tables['reviews']) <= SCALE.reviews
+    assert len(tables['inventory']) == len(tables['product_variants'])
+    assert 2 < len(tables['order_items']) / SCALE.orders < 4
+
+    for table, rows in tables.items():
+        assert all(len(row) == len(datagen.TABLES[table]) for row in rows)
+        assert [row[0] for row in rows] == list(range(1, len(rows) + 1))
+
+    variants = len(tables['product_variants'])
+    assert all(1 <= item[2] <= variants for item in tables['order_items'])
+    assert len({row[2] for row in tables['product_variants']}) == variants  # unique SKUs
+    assert len({row[2] for row in tables['users']}) == SCALE.users  # unique emails
+    assert len({(row[1], row[2]) for row in tables['reviews']}) == len(tables['reviews'])
+    assert all(1 <= row[3] <= 5 for row in tables['reviews'])
+
+
+def test_orders_are_consistent_and_in_date_order():
+    generator, tables = collect()
+    signup = {row[0]: row[5].date() for row in tables['users']}
+    totals = Counter()
+    for _, order_id, _, quantity, price in tables['order_items']:
+        totals[order_id] += quantity * price
+
+    dates = [row[2] for row in tables['orders']]
+    assert dates == sorted(dates)
+    assert generator.start <= dates[0].date() and dates[-1].date() < END
+    for order_id, user_id, placed, status, total, _ in tables['orders']:
+        assert abs(totals[order_id] - total) < 0.01
+        assert signup[user_id] <= placed.date()
+
+    shipped = {row[0] for row in tables['orders'] if row[3] in ('shipped', 'delivered')}
+    assert {row[1] for row in tables['shipping']} == shipped
+
+
+def test_distributions_are_skewed():
+    generator, tables = collect()
+    units = Counter()
+    for item in tables['order_items']:
+        units[generator.variant_product[item[2] - 1]] += item[3]
+    top_tenth = sum(count for _, count in units.most_common(SCALE.products // 10))
+    assert top_tenth > 0.3 * sum(units.values())
+
+    months = Counter(row[2].month for row in tables['orders'])
+    assert months[12] > months[2]
+
+    statuses = Counter(row[3] for row in tables['orders'])
+    assert statuses['delivered'] > sum(statuses.values()) / 2
+    ratings = Counter(row[3] for row in tables['reviews'])
+    assert ratings[5] > ratings[1]
+
+
+def test_csv_sink_writes_header_and_nulls(tmp_path):
+    generator = datagen.Generator(datagen.PRESETS['tiny'], seed=1, end=END)
+    counts, _, _ = datagen.run(generator, datagen.CsvSink(str(tmp_path)), chunk_size=100)
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{table}.csv" for table in datagen.TABLES)
+
+    with open(tmp_path / 'payments.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == counts['payments'] == datagen.PRESETS['tiny'].orders
+    unpaid = [row for row in rows if row['payment_status'] in ('pending', 'failed')]
+    assert unpaid and all(row['paid_at'] == '' for row in unpaid)
+
+
+def test_mysql_load_builds_indexes_after_rows(mysql_db):
+    generator = datagen.Generator(datagen.PRESETS['tiny'], seed=3, end=END)
+    sink = datagen.MySQLSink(mysql_db, method='executemany', replace=True)
+    counts, _, index_seconds = datagen.run(generator, sink, chunk_size=200)
+
+    cursor = mysql_db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM order_items")
+    assert cursor.fetchone()[0] == counts['order_items']
+    cursor.execute("SHOW INDEX FROM reviews WHERE Key_name = 'unique_user_product'")
+    assert cursor.fetchall()
+    cursor.close()
+    assert set(index_seconds) == set(datagen.INDEX_SQL)
@@ -0,0 +1,191 @@
+"""
+Tests for the streaming export writers and the /ask/export endpoint.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from mysql.connector import FieldType
+
+import app as backend
+import export
+from question_cache import QuestionCache
+from sql_guard import QueryGuard
+from sql_result import QueryResult
+
+
+class FakeCursor:
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = list(rows)
+
+    def fetchmany(self, size):
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+
+TABLES = ('orders', 'order_items', 'users', 'products')
+
+COLUMNS = [('order_id', FieldType.LONG), ('order_date', FieldType.DATETIME), ('day', FieldType.DATE),
+           ('total', FieldType.NEWDECIMAL), ('note', FieldType.BLOB)]
+
+
+def make_result(count, batch_size=4, closed=None):
+    description = [(name, code, None, None, None, None, True) for name, code in COLUMNS]
+    rows = [(i, datetime(2024, 1, 1, 12, 0, i % 60), date(2024, 1, 1), Decimal(f"{i}.50"), b'note' if i % 2 else None)
+            for i in range(1, count + 1)]
+    on_close = closed.append if closed is not None else None
+    return QueryResult.from_cursor(FakeCursor(description, rows), on_close=on_close, batch_size=batch_size)
+
+
+def test_csv_is_written_batch_by_batch():
+    chunks = list(export.stream(make_result(10), 'csv', max_rows=100))
+
+    assert len(chunks) == 3  # header + first batch, then one chunk per batch
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    assert rows[0] == [name for name, _ in COLUMNS]
+    assert rows[1] == ['1', '2024-01-01 12:00:01', '2024-01-01', '1.5', 'note']
+    assert rows[2][4] == ''
+    assert len(rows) == 11
+
+
+def test_row_ceiling_stops_fetching_and_closes_the_result():
+    closed = []
+    data = b''.join(export.stream(make_result(10, closed=closed), 'csv', max_rows=6)).decode()
+
+    assert len(data.splitlines()) == 8
+    assert data.splitlines()[-1] == "#TRUNCATED export stopped at 6 rows"
+    assert closed == [False]  # rows left unread, the connection is not reused
+
+    complete = b''.join(export.stream(make_result(6), 'csv', max_rows=6)).decode()
+    assert "#TRUNCATED" not in complete
+
+
+def test_a_failure_mid_stream_marks_the_csv_incomplete():
+    class FailingCursor(FakeCursor):
+        def fetchmany(self, size):
+            if not self._rows:
+                raise RuntimeError("Query execution was interrupted")
+            return super().fetchmany(size)
+
+    description = [('order_id', FieldType.LONG, None, None, None, None, True)]
+    result = QueryResult.from_cursor(FailingCursor(description, [(1,), (2,)]), batch_size=2)
+    chunks = []
+    with pytest.raises(RuntimeError):
+        for chunk in export.stream(result, 'csv', max_rows=100):
+            chunks.append(chunk)
+
+    lines = b''.join(chunks).decode().splitlines()
+    assert lines[:3] == ['order_id', '1', '2']
+    assert lines[-1] == "#ERROR export incomplete: Query execution was interrupted"
+
+
+@pytest.mark.parametrize('sql', [
+    "DELETE FROM orders",
+    "SELECT 1; DROP TABLE orders",
+    "SELECT * FROM orders INTO OUTFILE '/tmp/orders.csv'",
+    "SELECT LOAD_FILE('/etc/passwd') FROM orders",
+    "SELECT * FROM orders WHERE SLEEP(10) = 0",
+    "SELECT BENCHMARK(100000000, MD5('x'))",
+    "SELECT @@datadir",
+    "SELECT * FROM mysql.user",
+    "SELECT * FROM orders WHERE user_id IN (SELECT user_id FROM other_db.users)",
+    "SELECT * FROM information_schema.tables",
+    "SELECT * FROM reviews",
+])
+def test_only_plain_selects_over_the_app_schema_are_exported(sql):
+    with pytest.raises(export.ExportError):
+        export.check_export_sql(sql, TABLES, 'online_store')
+
+
+def test_app_schema_queries_are_exported():
+    sql = "SELECT o.order_id, COUNT(*) FROM online_store.orders o JOIN order_items oi USING (order_id) GROUP BY o.order_id"
+    assert export.check_export_sql(sql, TABLES, 'online_store') == sql
+
+
+def test_arrow_and_parquet_round_trip():
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    reader = pyarrow.ipc.open_stream(b''.join(export.stream(make_result(10), 'arrow', max_rows=8)))
+    batches = list(reader.iter_batches_with_custom_metadata())
+    assert batches[-1].custom_metadata[export.TRUNCATED_KEY.encode()] == b'8'
+    table = pyarrow.Table.from_batches([batch for batch, _ in batches])
+    assert table.num_rows == 8
+    assert table.schema.field('order_id').type == pyarrow.int64()
+    assert table.column('total').to_pylist()[0] == 1.5
+    assert table.column('note').to_pylist()[:2] == ['note', None]
+
+    data = b''.join(export.parquet_stream(make_result(10), max_rows=100, row_group_rows=4))
+    parquet = pyarrow.parquet.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_rows == 10
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read().column('day').to_pylist()[0] == date(2024, 1, 1)
+    assert export.TRUNCATED_KEY.encode() not in (parquet.metadata.metadata or {})
+
+    data = b''.join(export.parquet_stream(make_result(10), max_rows=5))
+    metadata = pyarrow.parquet.ParquetFile(io.BytesIO(data)).metadata
+    assert (metadata.num_rows, metadata.metadata[export.TRUNCATED_KEY.encode()]) == (5, b'5')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend, 'question_cache', QuestionCache(":memory:"))
+    plan = {'query_block': {'table': {'table_name': 'orders', 'access_type': 'ALL', 'rows_examined_per_scan': 10}}}
+    monkeypatch.setattr(backend, 'export_guard', QueryGuard(lambda sql: plan))
+    return backend.app.test_client()
+
+
+def test_export_endpoint_streams_the_full_result(monkeypatch, client):
+    executed = []
+
+    def run_sql(sql, batch_size):
+        executed.append(sql)
+        return make_result(25)
+
+    monkeypatch.setattr(backend, 'run_sql', run_sql)
+    sql = 'SELECT * FROM orders;'
+    response = client.post('/ask/export', json={'sql': sql, 'token': export.sign_sql(sql), 'max_rows': 20})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'].endswith('.csv"')
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 22 and lines[-1] == "#TRUNCATED export stopped at 20 rows"
+    assert executed == ["SELECT /*+ MAX_EXECUTION_TIME(5000) */ * FROM orders LIMIT 21;"]
+
+
+def test_export_of_a_question_uses_the_model_sql_once(monkeypatch, client):
+    calls = []
+    monkeypatch.setattr(backend, 'get_sql_from_gemini', lambda q: calls.append(q) or "SELECT * FROM orders")
+    monkeypatch.setattr(backend, 'run_sql', lambda sql, batch_size: make_result(3))
+
+    for _ in range(2):
+        response = client.get('/ask/export', query_string={'message': 'all orders'})
+        assert len(response.get_data(as_text=True).splitlines()) == 4
+    assert calls == ['all orders']
+
+
+def test_export_rejects_bad_requests_before_running_anything(monkeypatch, client):
+    monkeypatch.setattr(backend, 'run_sql', lambda sql, **kwargs: pytest.fail("SQL executed"))
+
+    def signed(sql, **fields):
+        return dict(fields, sql=sql, token=export.sign_sql(sql))
+
+    assert client.post('/ask/export', json=signed('UPDATE orders SET status = 1')).status_code == 400
+    assert client.post('/ask/export', json=signed('SELECT LOAD_FILE(\'/etc/passwd\')')).status_code == 400
+    assert client.post('/ask/export', json=signed('SELECT 1', format='xlsx')).status_code == 400
+    assert client.post('/ask/export', json=signed('SELECT 1', max_rows='all')).status_code == 400
+    assert client.post('/ask/export', json={}).status_code == 400
+
+
+def test_export_only_runs_sql_this_server_issued(monkeypatch, client):
+    monkeypatch.setattr(backend, 'run_sql', lambda sql, **kwargs: pytest.fail("SQL executed"))
+    sql = "SELECT * FROM orders"
+
+    assert client.post('/ask/export', json={'sql': sql}).status_code == 403
+    assert client.post('/ask/export', json={'sql': sql, 'token': export.sign_sql("SELECT * FROM users")}).status_code == 403
+    assert export.verify_sql(sql + ";", export.sign_sql(sql))
@@ -0,0 +1,91 @@
+"""
+Tests for the fast path in front of Gemini.
+"""
+
+import pytest
+
+import app as backend
+from fast_path import FastPathRouter, intent
+from question_cache import QuestionCache
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(backend, 'question_cache', QuestionCache(":memory:"))
+    monkeypatch.setattr(backend, 'fast_path_router', FastPathRouter(backend.fast_path_router.intents))
+    monkeypatch.setattr(backend, 'fetch_overview_stats', lambda: {
+        'total_revenue': 1520.5, 'total_orders': 12, 'total_users': 7, 'total_products': 30, 'avg_order_value': 126.71,
+    })
+    monkeypatch.setattr(backend, 'fetch_order_status_distribution', lambda: [
+        {'status': 'Delivered', 'count': 9, 'revenue': 1200.0},
+        {'status': 'Pending', 'count': 3, 'revenue': 320.5},
+    ])
+
+
+@pytest.mark.parametrize('question, name, params', [
+    ("what is sum of all orders", 'total_revenue', {}),
+    ("What's the total revenue?", 'total_revenue', {}),
+    ("Top 5 selling products", 'top_products', {'n': '5'}),
+    ("best sellers", 'top_products', {}),
+    ("Show me low stock items", 'low_stock', {}),
+    ("products with stock below 3", 'low_stock', {'threshold': '3'}),
+    ("orders by status", 'orders_by_status', {}),
+    ("How many customers do we have?", 'customer_count', {}),
+    ("average order value", 'avg_order_value', {}),
+])
+def test_known_questions_match(question, name, params):
+    found, found_params = backend.fast_path_router.match(question)
+    assert (found.name, found_params) == (name, params)
+
+
+@pytest.mark.parametrize('question', [
+    "top products by revenue in March",
+    "revenue from customers in Lahore",
+    "hello",
+])
+def test_other_questions_fall_through(question):
+    assert backend.fast_path_router.match(question) is None
+
+
+def test_default_ask_question_skips_gemini(monkeypatch):
+    monkeypatch.setattr(backend, 'get_sql_from_gemini', lambda q: pytest.fail("Gemini called"))
+
+    response = backend.app.test_client().get('/ask').get_json()
+
+    assert response['fast_path'] == 'total_revenue'
+    assert response['text'] == "The total revenue is 1520.5."
+
+
+def test_stream_answers_from_the_fast_path(monkeypatch):
+    monkeypatch.setattr(backend, 'stream_from_gemini', lambda q: pytest.fail("Gemini called"))
+
+    body = backend.app.test_client().post('/ask/stream', json={'message': 'orders by status'}).get_data(as_text=True)
+
+    assert '"fast_path":"orders_by_status"' in body
+    assert '"rows":[["Delivered",9],["Pending",3]]' in body
+
+
+def test_failing_intent_falls_through_to_gemini(monkeypatch):
+    def broken():
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(backend, 'fast_path_router', FastPathRouter([intent('broken', [r"total revenue"], broken)]))
+    monkeypatch.setattr(backend, 'get_sql_from_gemini', lambda q: "Revenue is unavailable right now.")
+
+    response = backend.chat_with_db_gemini("total revenue")
+
+    assert 'fast_path' not in response
+    assert backend.fast_path_router.stats()['errors'] == 1
+
+
+def test_stats_report_hit_rate_and_saving(monkeypatch):
+    monkeypatch.setattr(backend, 'get_sql_from_gemini', lambda q: "Hello! How can I help you today?")
+
+    backend.chat_with_db_gemini("total revenue")
+    backend.chat_with_db_gemini("hi")
+    stats = backend.fast_path_router.stats()
+
+    assert (stats['lookups'], stats['hits'], stats['hit_rate']) == (2, 1, 0.5)
+    assert stats['hits_by_intent'] == {'total_revenue': 1}
+    assert stats['avg_llm_path_ms'] is not None
+    assert stats['saved_ms_est'] is not None
@@ -0,0 +1,51 @@
+"""
+Tests for the response encoder: both backends produce the same JSON.
+"""
+
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+
+import app as backend
+import json_encoding
+
+PAYLOAD = {
+    'price': Decimal('19.99'),
+    'day': datetime.date(2025, 3, 1),
+    'updated': datetime.datetime(2025, 3, 1, 14, 5, 9),
+    'duration': datetime.timedelta(minutes=2),
+    'rows': [[1, 'Phone', Decimal('0.50')], [2, 'Café', None]],
+}
+EXPECTED = {
+    'price': 19.99,
+    'day': '2025-03-01',
+    'updated': '2025-03-01T14:05:09',
+    'duration': 120.0,
+    'rows': [[1, 'Phone', 0.5], [2, 'Café', None]],
+}
+
+BACKENDS = ['stdlib'] + (['orjson'] if json_encoding.orjson is not None else [])
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_backend_encodes_query_values(name):
+    assert json.loads(json_encoding.dumps_bytes(PAYLOAD, backend=name)) == EXPECTED
+
+
+@pytest.mark.skipif(json_encoding.orjson is None, reason="orjson not installed")
+def test_backends_agree_byte_for_byte():
+    assert json_encoding.dumps_bytes(PAYLOAD, backend='orjson') == json_encoding.dumps_bytes(PAYLOAD, backend='stdlib')
+
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(TypeError):
+        json_encoding.dumps({'value': object()})
+
+
+def test_jsonify_uses_the_encoder():
+    with backend.app.app_context():
+        response = backend.jsonify({'success': True, 'data': PAYLOAD})
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['data'] == EXPECTED
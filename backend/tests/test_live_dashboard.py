@@ -0,0 +1,90 @@
+"""
+Tests for the live dashboard producer: watermark-driven recomputes and fan-out.
+"""
+
+import app as backend
+from live_dashboard import LiveDashboard
+
+
+class Source:
+    """Fake sections and watermarks; counts how often each section is computed"""
+
+    def __init__(self):
+        self.marks = {'orders': 1, 'inventory': 1}
+        self.values = {'orders': 10, 'inventory': 5}
+        self.calls = {'orders': 0, 'inventory': 0}
+
+    def fetch(self, name):
+        def compute():
+            self.calls[name] += 1
+            return {'total': self.values[name]}
+        return compute
+
+    def live(self, **kwargs):
+        sections = {
+            'order_status': (self.fetch('orders'), ('orders',)),
+            'inventory': (self.fetch('inventory'), ('inventory',)),
+        }
+        return LiveDashboard(sections, lambda: dict(self.marks), keepalive=0.01, **kwargs)
+
+
+def test_sections_are_recomputed_only_when_their_watermarks_move():
+    source = Source()
+    live = source.live()
+    events = live.events()
+    assert next(events) == ('snapshot', {'version': 0, 'sections': {}})
+
+    assert sorted(live.tick()) == ['inventory', 'order_status']
+    assert live.tick() == []
+    source.marks['orders'] = 2
+    source.values['orders'] = 11
+    assert live.tick() == ['order_status']
+    assert source.calls == {'orders': 2, 'inventory': 1}
+
+    received = [next(events) for _ in range(2)]
+    assert received == [
+        ('section', {'name': 'inventory', 'version': 2, 'data': {'total': 5}}),
+        ('section', {'name': 'order_status', 'version': 3, 'data': {'total': 11}}),
+    ]
+    assert next(events) == (None, None)   # keepalive
+    events.close()
+    assert live.stats()['subscribers'] == 0
+
+
+def test_one_producer_serves_every_subscriber():
+    source = Source()
+    live = source.live()
+    streams = [live.events() for _ in range(20)]
+    for stream in streams:
+        next(stream)
+
+    live.tick()
+    source.marks['orders'] = 2
+    source.values['orders'] = 11
+    live.tick()
+
+    assert source.calls == {'orders': 2, 'inventory': 1}
+    assert all(next(stream)[0] == 'section' for stream in streams)
+    stats = live.stats()
+    assert (stats['subscribers'], stats['published']) == (20, 3)
+    assert stats['coalesced'] == 20   # order_status changed twice before anyone read it
+
+
+def test_unchanged_results_and_unwatched_sections_are_not_pushed():
+    source = Source()
+    live = source.live(max_age=0)
+    events = live.events(['order_status'])
+    assert next(events)[0] == 'snapshot'
+
+    assert live.tick() == ['order_status']
+    assert live.tick() == []   # recomputed (max_age=0) but identical
+    assert source.calls == {'orders': 2, 'inventory': 0}
+    assert live.stats()['unchanged'] == 1
+
+    late = live.events(['order_status'])
+    assert next(late) == ('snapshot', {'version': 1, 'sections': {'order_status': {'total': 10}}})
+
+
+def test_live_route_rejects_unknown_sections():
+    response = backend.app.test_client().get('/api/analytics/live?sections=overview,bogus')
+    assert response.status_code == 400
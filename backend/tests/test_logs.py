@@ -0,0 +1,87 @@
+"""
+Tests for the structured logging helpers.
+"""
+
+import json
+import logging
+
+import pytest
+
+import logs
+
+
+class Expensive:
+    """Counts how often it is rendered"""
+
+    renders = 0
+
+    def __str__(self):
+        Expensive.renders += 1
+        return "expensive"
+
+
+@pytest.fixture
+def records():
+    captured = []
+    handler = logging.Handler()
+    handler.emit = captured.append
+    logger = logging.getLogger('test_logs')
+    logger.addHandler(handler)
+    logger.propagate = False
+    yield logger, captured
+    logger.removeHandler(handler)
+
+
+def test_brief_bounds_strings_and_collections():
+    assert logs.brief("x" * 10, limit=4) == "xxxx...(+6 chars)"
+    rows = [[i, "row"] for i in range(1000)]
+    assert logs.brief(rows, items=2) == [[0, "row"], [1, "row"], "...(+998 more)"]
+    assert logs.brief({'a': 1, 'b': 2, 'c': 3}, items=1) == {'a': 1, '...': "+2 more"}
+
+
+def test_untrimmed_fields_are_logged_whole(records):
+    logger, captured = records
+    logger.setLevel(logging.INFO)
+    long = "x" * (logs.LOG_PAYLOAD_CHARS + 10)
+
+    logs.log_event(logger, logging.WARNING, 'request.slow', untrimmed=('spans',), spans=long, sql=long)
+
+    assert captured[0].fields['spans'] == long
+    assert captured[0].fields['sql'] != long
+
+
+def test_disabled_levels_build_nothing(records):
+    logger, captured = records
+    logger.setLevel(logging.INFO)
+    Expensive.renders = 0
+
+    logs.log_event(logger, logging.DEBUG, 'skipped', payload=Expensive())
+    logs.log_payload(logger, 'skipped', payload=Expensive())
+    assert Expensive.renders == 0 and captured == []
+
+    logs.log_event(logger, logging.INFO, 'kept', payload=Expensive())
+    assert Expensive.renders == 1
+    assert captured[0].fields == {'payload': "expensive"}
+
+
+def test_payloads_are_sampled(records, monkeypatch):
+    logger, captured = records
+    logger.setLevel(logging.DEBUG)
+    monkeypatch.setattr(logs, 'LOG_SAMPLE_RATE', 0.0)
+    logs.log_payload(logger, 'dropped', sql="SELECT 1")
+    monkeypatch.setattr(logs, 'LOG_SAMPLE_RATE', 1.0)
+    logs.log_payload(logger, 'kept', sql="SELECT 1")
+    assert [record.getMessage() for record in captured] == ['kept']
+
+
+def test_formatter_text_and_json(records):
+    logger, captured = records
+    logger.setLevel(logging.DEBUG)
+    logs.log_event(logger, logging.WARNING, 'sql.failed', error="Unknown column 'x'", rows=3)
+    record = captured[0]
+
+    text = logs.StructuredFormatter().format(record)
+    assert text.endswith("WARNING test_logs sql.failed error=\"Unknown column 'x'\" rows=3")
+
+    entry = json.loads(logs.StructuredFormatter(json_lines=True).format(record))
+    assert entry['event'] == 'sql.failed' and entry['level'] == 'WARNING' and entry['rows'] == 3
@@ -0,0 +1,81 @@
+"""
+Tests for request tracing and the /metrics endpoint.
+"""
+
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+
+import app as backend
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('latency_seconds', "test", ['span'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(('db',), value)
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{span="db",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{span="db",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{span="db",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{span="db"} 4' in lines
+    assert 'latency_seconds_sum{span="db"} 4.05' in lines
+
+
+def test_spans_join_the_trace_across_threads():
+    trace = metrics.Trace()
+    token = metrics._trace.set(trace)
+    try:
+        def work():
+            with metrics.span('in_thread'):
+                pass
+
+        with metrics.span('outer'):
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(contextvars.copy_context().run, work).result()
+        with pytest.raises(RuntimeError):
+            with metrics.span('broken'):
+                raise RuntimeError("boom")
+    finally:
+        metrics._trace.reset(token)
+
+    names = {name: failed for name, _, _, failed in trace.spans}
+    assert names['outer'] is False
+    assert names['in_thread'] is False
+    assert names['broken'] is True
+    assert 'broken=' in trace.breakdown() and '!' in trace.breakdown()
+
+
+def test_slow_requests_are_logged_with_their_spans(caplog):
+    flask_app = Flask(__name__)
+    metrics.init_app(flask_app, slow_request_ms=0.001)
+
+    @flask_app.route('/slow')
+    def slow():
+        with metrics.span('db.query'):
+            pass
+        return 'ok'
+
+    with caplog.at_level(logging.WARNING, logger='metrics'):
+        response = flask_app.test_client().get('/slow')
+        response.close()
+
+    record, = [r for r in caplog.records if r.getMessage() == 'request.slow']
+    assert (record.fields['method'], record.fields['endpoint'], record.fields['status']) == ('GET', '/slow', 200)
+    assert 'db.query=' in record.fields['spans']
+
+
+def test_metrics_endpoint_exposes_histograms_and_component_stats():
+    client = backend.app.test_client()
+    client.get('/test').close()
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'app_http_request_duration_seconds_count{endpoint="/test",method="GET"}' in body
+    assert 'app_http_requests_total{endpoint="/test",method="GET",status="200"}' in body
+    assert '# TYPE app_db_pool_in_use gauge' in body
+    assert 'app_analytics_cache_hits ' in body
+    assert 'app_fast_path_lookups ' in body
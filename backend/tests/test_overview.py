@@ -0,0 +1,183 @@
+"""
+Regression tests for the single-statement /api/analytics/overview.
+
+`legacy_overview` is the previous 11-query implementation, kept here as the
+oracle the new endpoint must agree with.
+"""
+
+from decimal import Decimal
+
+import pytest
+
+import app as backend
+
+THIS_MONTH_START = "DATE_FORMAT(CURDATE(), '%Y-%m-01')"
+THIS_MONTH = "DATE_FORMAT(CURDATE(), '%Y-%m-01') + INTERVAL 5 MINUTE"
+LAST_MONTH_START = "DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')"
+LAST_MONTH = "DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01') + INTERVAL 2 DAY"
+OLDER = "DATE_FORMAT(CURDATE() - INTERVAL 3 MONTH, '%Y-%m-01') + INTERVAL 10 DAY"
+
+
+def decimals_to_float(data):
+    """The legacy endpoint's Decimal -> float pass over its flat result"""
+    return {key: float(value) if isinstance(value, Decimal) else value for key, value in data.items()}
+
+
+def legacy_overview(execute_query):
+    total_users = execute_query("SELECT COUNT(*) as count FROM users")[0]['count']
+    this_month = execute_query("""
+        SELECT COUNT(*) as count FROM users
+        WHERE created_at >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
+    """)[0]['count']
+    last_month = execute_query("""
+        SELECT COUNT(*) as count FROM users
+        WHERE created_at >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+        AND created_at < DATE_FORMAT(CURDATE(), '%Y-%m-01')
+    """)[0]['count']
+    user_growth = ((this_month - last_month) / max(last_month, 1)) * 100 if last_month > 0 else 0
+
+    total_orders = execute_query("SELECT COUNT(*) as count FROM orders")[0]['count']
+    orders_this_month = execute_query("""
+        SELECT COUNT(*) as count FROM orders
+        WHERE order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
+    """)[0]['count']
+    orders_last_month = execute_query("""
+        SELECT COUNT(*) as count FROM orders
+        WHERE order_date >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+        AND order_date < DATE_FORMAT(CURDATE(), '%Y-%m-01')
+    """)[0]['count']
+    order_growth = ((orders_this_month - orders_last_month) / max(orders_last_month, 1)) * 100 if orders_last_month > 0 else 0
+
+    total_revenue = execute_query("SELECT SUM(total_amount) as total FROM orders WHERE status != 'Cancelled'")[0]['total'] or 0
+    revenue_this_month = execute_query("""
+        SELECT SUM(total_amount) as total FROM orders
+        WHERE order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
+        AND status != 'Cancelled'
+    """)[0]['total'] or 0
+    revenue_last_month = execute_query("""
+        SELECT SUM(total_amount) as total FROM orders
+        WHERE order_date >= DATE_FORMAT(CURDATE() - INTERVAL 1 MONTH, '%Y-%m-01')
+        AND order_date < DATE_FORMAT(CURDATE(), '%Y-%m-01')
+        AND status != 'Cancelled'
+    """)[0]['total'] or 0
+    revenue_growth = ((revenue_this_month - revenue_last_month) / max(revenue_last_month, 1)) * 100 if revenue_last_month > 0 else 0
+
+    total_products = execute_query("SELECT COUNT(*) as count FROM products")[0]['count']
+    avg_order_value = execute_query("""
+        SELECT AVG(total_amount) as avg_value FROM orders
+        WHERE status != 'Cancelled'
+    """)[0]['avg_value'] or 0
+
+    return decimals_to_float({
+        'total_users': total_users,
+        'user_growth': round(user_growth, 1),
+        'total_orders': total_orders,
+        'order_growth': round(order_growth, 1),
+        'total_revenue': float(total_revenue),
+        'revenue_growth': round(revenue_growth, 1),
+        'total_products': total_products,
+        'avg_order_value': float(avg_order_value)
+    })
+
+
+def seed(conn, users, orders, products):
+    cursor = conn.cursor()
+    for i, created_at in enumerate(users):
+        cursor.execute(
+            f"INSERT INTO users (name, email, password_hash, created_at) "
+            f"VALUES ('User {i}', 'user{i}@example.com', 'x', {created_at})"
+        )
+    for i, (order_date, status, amount) in enumerate(orders):
+        cursor.execute(
+            f"INSERT INTO orders (user_id, order_date, status, total_amount, shipping_address) "
+            f"VALUES ({i % max(len(users), 1) + 1}, {order_date}, '{status}', {amount}, 'Street {i}')"
+        )
+    for i in range(products):
+        cursor.execute(
+            f"INSERT INTO products (category_id, name, base_price) VALUES (1, 'Product {i}', 9.99)"
+        )
+    cursor.close()
+
+
+def fetch_overview():
+    response = backend.app.test_client().get('/api/analytics/overview')
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_matches_legacy_on_seeded_dataset(mysql_db):
+    seed(
+        mysql_db,
+        users=[THIS_MONTH_START, THIS_MONTH, THIS_MONTH, LAST_MONTH_START, LAST_MONTH, OLDER, OLDER],
+        orders=[
+            (THIS_MONTH_START, 'delivered', '120.50'),
+            (THIS_MONTH, 'pending', '15.25'),
+            (THIS_MONTH, 'cancelled', '999.99'),
+            (THIS_MONTH, 'shipped', '33.33'),
+            (LAST_MONTH_START, 'delivered', '45.10'),
+            (LAST_MONTH, 'processing', '80.05'),
+            (LAST_MONTH, 'cancelled', '10.00'),
+            (OLDER, 'delivered', '250.00'),
+            (OLDER, 'cancelled', '5.55'),
+        ],
+        products=4
+    )
+
+    data = fetch_overview()
+
+    assert data == legacy_overview(backend.execute_query)
+    assert data['total_orders'] == 9
+    assert data['total_users'] == 7
+
+
+def test_matches_legacy_on_empty_tables(mysql_db):
+    data = fetch_overview()
+
+    assert data == legacy_overview(backend.execute_query)
+    assert data['total_revenue'] == 0.0
+    assert data['revenue_growth'] == 0
+
+
+def test_matches_legacy_without_last_month_activity(mysql_db):
+    seed(
+        mysql_db,
+        users=[THIS_MONTH, OLDER],
+        orders=[(THIS_MONTH, 'delivered', '19.99'), (OLDER, 'shipped', '7.01')],
+        products=1
+    )
+
+    data = fetch_overview()
+
+    assert data == legacy_overview(backend.execute_query)
+    assert data['order_growth'] == 0
+
+
+@pytest.mark.parametrize("current, previous, expected", [
+    (12, 8, 50.0),
+    (3, 0, 0),
+    (0, 4, -100.0),
+    (Decimal('150.00'), Decimal('120.00'), Decimal('25.0')),
+    (Decimal('0.50'), Decimal('0.25'), Decimal('25.0')),
+])
+def test_calculate_growth(current, previous, expected):
+    assert round(backend.calculate_growth(current, previous), 1) == expected
+
+
+def test_build_overview_stats_handles_null_sums():
+    row = {
+        'total_users': 2, 'users_this_month': 1, 'users_last_month': 1,
+        'total_orders': 0, 'orders_this_month': 0, 'orders_last_month': 0,
+        'total_revenue': None, 'revenue_this_month': None, 'revenue_last_month': None,
+        'avg_order_value': None, 'total_products': 3,
+    }
+
+    assert backend.build_overview_stats(row) == {
+        'total_users': 2,
+        'user_growth': 0.0,
+        'total_orders': 0,
+        'order_growth': 0,
+        'total_revenue': 0.0,
+        'revenue_growth': 0,
+        'total_products': 3,
+        'avg_order_value': 0.0
+    }
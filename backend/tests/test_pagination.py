@@ -0,0 +1,140 @@
+"""
+Tests for limit / cursor / from / to on the analytics endpoints.
+"""
+
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+import app as backend
+from analytics_cache import AnalyticsCache
+from pagination import PageArgError, decode_cursor, encode_cursor, parse_page_args
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Record execute_query calls and answer them from a queue of canned results"""
+    recorder = SimpleNamespace(calls=[], results=[])
+
+    def execute_query(query, params=None):
+        recorder.calls.append((query, params))
+        return recorder.results.pop(0) if recorder.results else []
+
+    monkeypatch.setattr(backend, 'execute_query', execute_query)
+    monkeypatch.setattr(backend, 'analytics_cache', AnalyticsCache(lambda: None))
+    monkeypatch.setattr(backend, 'ANALYTICS_USE_ROLLUPS', False)
+    return recorder
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+def product(product_id, total_sold):
+    return {'product_id': product_id, 'name': f"P{product_id}", 'brand': 'Acme',
+            'total_sold': Decimal(total_sold), 'revenue': Decimal('10.00')}
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([Decimal('12.5000'), 7, date(2025, 3, 1)])
+    assert decode_cursor(cursor, 3) == ('12.5000', 7, '2025-03-01')
+
+
+@pytest.mark.parametrize('cursor', ["not-base64!", encode_cursor([1]), encode_cursor([[1], 2]), encode_cursor([True, 1])])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(PageArgError):
+        decode_cursor(cursor, 2)
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'limit': '0'}, "between 1 and"),
+    ({'limit': 'ten'}, "integer"),
+    ({'from': '2025-13-01'}, "YYYY-MM-DD"),
+    ({'from': '2025-03-02', 'to': '2025-03-01'}, "must not be after"),
+])
+def test_bad_page_args_are_rejected(args, message):
+    with pytest.raises(PageArgError, match=message):
+        parse_page_args(args, 10, 2)
+
+
+def test_defaults_keep_the_old_page_sizes():
+    assert parse_page_args({}, 10, 2) == (10, None, None, None)
+
+
+def test_first_page_returns_a_cursor_when_more_rows_exist(client, queries):
+    queries.results.append([product(3, '50'), product(9, '40'), product(4, '40')])
+
+    body = client.get('/api/analytics/top-products?limit=2&from=2025-01-01&to=2025-01-31').get_json()
+
+    assert [row['product_id'] for row in body['data']] == [3, 9]
+    assert decode_cursor(body['next_cursor'], 2) == ('40', 9)
+    query, params = queries.calls[0]
+    assert "HAVING" not in query
+    assert params == (date(2025, 1, 1), date(2025, 2, 1), 3)
+
+
+def test_next_page_seeks_past_the_cursor(client, queries):
+    queries.results.append([product(4, '40')])
+
+    body = client.get(f"/api/analytics/top-products?limit=2&cursor={encode_cursor([Decimal('40'), 9])}").get_json()
+
+    assert body['next_cursor'] is None
+    query, params = queries.calls[0]
+    assert "HAVING (total_sold, p.product_id) < (%s, %s)" in query
+    assert "OFFSET" not in query
+    assert params == ('40', 9, 3)
+
+
+def test_sales_trend_cursor_moves_the_window(client, queries):
+    cursor = encode_cursor([date(2025, 3, 10)])
+
+    client.get(f"/api/analytics/sales-trend?from=2025-03-01&to=2025-03-31&limit=10&cursor={cursor}")
+
+    assert queries.calls[0][1] == (date(2025, 3, 11), date(2025, 4, 1), 11)
+
+
+def test_low_stock_pages_in_ascending_order(client, queries):
+    queries.results.append([{'product_name': 'Case', 'variant_id': 12, 'quantity': 2}])
+    queries.results.append([{'total_variants': 1}])
+
+    body = client.get(f"/api/analytics/inventory?cursor={encode_cursor([1, 40])}").get_json()
+
+    assert body['data']['low_stock_items'][0]['variant_id'] == 12
+    query, params = queries.calls[0]
+    assert "(i.quantity, i.variant_id) > (%s, %s)" in query
+    assert params == (10, 1, 40, 21)
+
+
+@pytest.mark.parametrize('url', [
+    '/api/analytics/top-products?limit=1000',
+    '/api/analytics/reviews?cursor=abc',
+    '/api/analytics/inventory?from=2025-01-01',
+    '/api/analytics/sales-trend?cursor=' + encode_cursor(['yesterday']),
+])
+def test_invalid_parameters_are_a_400(client, queries, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert queries.calls == []
+
+
+def test_customer_acquisition_has_one_bucket_per_month(mysql_db):
+    cursor = mysql_db.cursor()
+    for i, created_at in enumerate([
+        "DATE_FORMAT(CURDATE(), '%Y-%m-01')",
+        "DATE_FORMAT(CURDATE(), '%Y-%m-01')",
+        "DATE_FORMAT(CURDATE() - INTERVAL 2 MONTH, '%Y-%m-01') + INTERVAL 3 DAY",
+    ]):
+        cursor.execute(f"INSERT INTO users (name, email, password_hash, created_at) "
+                       f"VALUES ('u{i}', 'u{i}@example.com', 'x', {created_at})")
+    cursor.close()
+
+    response = backend.app.test_client().get('/api/analytics/customer-insights')
+    acquisition = response.get_json()['data']['customer_acquisition']
+
+    this_month = date.today().strftime('%Y-%m')
+    assert [row['new_customers'] for row in acquisition] == [1, 2]
+    assert acquisition[-1]['month'] == this_month
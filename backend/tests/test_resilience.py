@@ -0,0 +1,255 @@
+"""
+Tests for the model call resilience layer: deadline, retries, hedging and
+the circuit breaker, on plain callables and end to end against the Gemini
+stub server with injected latency and errors.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpen, ModelUnavailable, ResilientCaller
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+
+class Flaky:
+    """Callable failing `failures` times, then answering after `delay` seconds"""
+
+    def __init__(self, failures=0, delay=0.0, error=ConnectionError):
+        self.failures = failures
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+        if fail:
+            raise self.error("injected")
+        time.sleep(self.delay)
+        return "ok"
+
+
+def test_retries_until_an_attempt_succeeds():
+    caller = ResilientCaller('test', attempts=3, backoff=0.001)
+    fn = Flaky(failures=2)
+
+    assert caller.call(fn) == "ok"
+    assert fn.calls == 3 and caller.stats()['retries'] == 2
+
+
+def test_gives_up_after_the_last_attempt():
+    caller = ResilientCaller('test', attempts=2, backoff=0.001)
+
+    with pytest.raises(ModelUnavailable):
+        caller.call(Flaky(failures=5))
+    assert caller.stats()['failed'] == 1
+
+
+def test_errors_that_are_not_retryable_surface_at_once():
+    caller = ResilientCaller('test', attempts=3, retryable=lambda error: not isinstance(error, ValueError))
+    fn = Flaky(failures=5, error=ValueError)
+
+    with pytest.raises(ValueError):
+        caller.call(fn)
+    assert fn.calls == 1
+
+
+def test_deadline_frees_the_caller_from_a_hung_call():
+    caller = ResilientCaller('test', deadline=0.1)
+    release = threading.Event()
+
+    started = time.monotonic()
+    with pytest.raises(ModelUnavailable):
+        caller.call(release.wait)
+    assert time.monotonic() - started < 0.5
+    assert caller.stats()['deadline_exceeded'] == 1
+    release.set()
+
+
+def test_a_slow_attempt_is_hedged_after_the_p95():
+    caller = ResilientCaller('test', hedge=True, hedge_min_delay=0.01, hedge_min_samples=5)
+    for _ in range(5):
+        caller.latency.add(0.02)
+    release = threading.Event()
+    calls = []
+
+    def first_hangs():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "hedge"
+
+    assert caller.call(first_hangs) == "hedge"
+    assert caller.stats()['hedges'] == 1 and caller.stats()['hedge_wins'] == 1
+    release.set()
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    caller = ResilientCaller('test', attempts=1, breaker=breaker)
+    broken = Flaky(failures=100)
+
+    for _ in range(2):
+        with pytest.raises(ModelUnavailable):
+            caller.call(broken)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        caller.call(broken)
+    assert broken.calls == 2
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()   # only one probe while half open
+    breaker.record_success()
+    assert caller.call(Flaky()) == "ok"
+    assert breaker.stats() == {'state': 'closed', 'consecutive_failures': 0, 'opened': 1, 'rejected': 2}
+
+
+def test_stream_deadlines_on_first_chunk_and_gaps():
+    breaker = CircuitBreaker(failure_threshold=2)
+    caller = ResilientCaller('test', breaker=breaker)
+    release = threading.Event()
+
+    def stalls_after(n):
+        yield from ("chunk",) * n
+        release.wait()
+        yield "late"
+
+    assert list(caller.stream(lambda: iter("abc"), first_chunk=0.1)) == ["a", "b", "c"]
+
+    started = time.monotonic()
+    with pytest.raises(ModelUnavailable):
+        list(caller.stream(stalls_after, 0, first_chunk=0.1))
+    received = []
+    with pytest.raises(ModelUnavailable):
+        for chunk in caller.stream(stalls_after, 2, first_chunk=5, between_chunks=0.1):
+            received.append(chunk)
+    assert received == ["chunk", "chunk"] and time.monotonic() - started < 1
+    assert breaker.state == CircuitBreaker.OPEN
+    assert caller.stats()['deadline_exceeded'] == 2
+    with pytest.raises(CircuitOpen):
+        next(caller.stream(stalls_after, 1))
+    release.set()
+
+
+def test_a_closed_stream_releases_the_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    caller = ResilientCaller('test', breaker=breaker)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    abandoned = caller.stream(lambda: iter("abc"))
+    next(abandoned)
+    abandoned.close()
+    assert breaker.allow()   # the next call becomes the probe
+    breaker.record_failure()
+
+    time.sleep(0.02)
+    finished = caller.stream(lambda: iter("abc"))
+    next(finished), next(finished)
+    finished.close()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_a_lost_probe_is_replaced_after_the_probe_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01, probe_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Gemini stub server wired into the backend's client, with a fresh caller and breaker"""
+    from gemini_stub import GeminiStub
+    from google import genai
+    from google.genai import types
+    import app
+
+    server = GeminiStub(latency_ms=20, chunks=2).start()
+    client = genai.Client(api_key='test-key', http_options=types.HttpOptions(base_url=server.base_url, timeout=5000))
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    monkeypatch.setattr(app, '_gemini_client', client)
+    monkeypatch.setattr(app, 'gemini_breaker', breaker)
+    monkeypatch.setattr(app, 'gemini_caller', ResilientCaller(
+        'gemini', deadline=1.0, attempts=2, backoff=0.01, retryable=app.gemini_retryable, breaker=breaker))
+    monkeypatch.setattr(app.schema_prompter, 'build', lambda question: (f"User Question: {question}", {
+        'tables': [], 'prompt_tokens_est': 0}))
+    monkeypatch.setattr(app, 'fast_path_answer', lambda question: None)
+    monkeypatch.setattr(app, 'answer_with_sql', lambda question, sql: ({'text': 'answered', 'sql': sql}, False))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_stub_server_error_is_retried(stub):
+    import app
+
+    stub.inject({'status': 503})
+
+    assert app.get_sql_from_gemini("how many orders are pending").startswith("SELECT status")
+    assert stub.requests == 2 and stub.errors == 1
+
+
+def test_stub_bad_request_is_not_retried(stub):
+    import app
+    from google.genai import errors
+
+    stub.inject({'status': 400})
+
+    with pytest.raises(errors.ClientError):
+        app.get_sql_from_gemini("how many orders are pending")
+    assert stub.requests == 1 and app.gemini_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stub_brownout_opens_the_circuit_and_ask_fails_fast(stub):
+    import app
+
+    stub.error_rate = 1.0
+    client = app.app.test_client()
+
+    for question in ("revenue this month", "top customers"):
+        assert client.post('/ask', json={'message': question}).get_json()['degraded'] is True
+    assert app.gemini_breaker.state == CircuitBreaker.OPEN
+    served = stub.requests
+
+    started = time.monotonic()
+    response = client.post('/ask', json={'message': "best rated products"}).get_json()
+    assert response['text'] == app.GEMINI_UNAVAILABLE_TEXT
+    assert stub.requests == served and time.monotonic() - started < 0.5
+
+
+def test_stub_stream_stall_answers_degraded(stub, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'GEMINI_FIRST_TOKEN_SECONDS', 0.2)
+    stub.inject({'latency_ms': 3000})
+
+    started = time.monotonic()
+    events = list(app.stream_chat("how many orders are pending"))
+    assert events[-1] == ('answer', {'text': app.GEMINI_UNAVAILABLE_TEXT, 'degraded': True})
+    assert time.monotonic() - started < 1
+    assert app.gemini_breaker.stats()['consecutive_failures'] == 1
+
+
+def test_stub_latency_past_the_deadline(stub):
+    import app
+
+    stub.inject({'latency_ms': 3000}, {'latency_ms': 3000})
+
+    started = time.monotonic()
+    response = app.chat_with_db_gemini("how many orders are pending")
+    assert response['degraded'] is True
+    assert time.monotonic() - started < 2
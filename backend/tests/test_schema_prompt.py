@@ -0,0 +1,127 @@
+"""
+Tests for per-question schema prompts over a fake information_schema.
+"""
+
+import threading
+
+from schema_prompt import FALLBACK_FOREIGN_KEYS, FALLBACK_TABLES, SchemaPrompter
+
+
+def information_schema(tables=FALLBACK_TABLES, foreign_keys=FALLBACK_FOREIGN_KEYS):
+    """Rows shaped like SCHEMA_COLUMNS_QUERY / SCHEMA_FOREIGN_KEYS_QUERY results"""
+    columns = [(table, column, 'PRI' if i == 0 else '')
+               for table, names in tables.items() for i, column in enumerate(names)]
+    return columns, list(foreign_keys)
+
+
+def make_prompter(**kwargs):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return information_schema(**kwargs)
+
+    prompter = SchemaPrompter(load, "INSTRUCTIONS")
+    prompter.loads = loads
+    return prompter
+
+
+def test_question_selects_only_named_tables():
+    direct, bridges = make_prompter().select_tables("which customers spent the most")
+    assert direct == {'users', 'orders'}
+    assert bridges == set()
+
+
+def test_join_tables_are_added_with_key_columns_only():
+    prompt, info = make_prompter().build("top selling products")
+
+    assert info['tables'] == ['order_items', 'product_variants', 'products']
+    assert "- product_variants(variant_id, product_id)" in prompt
+    assert "- products(product_id, category_id, name, description, base_price, brand, image_url, created_at)" in prompt
+    assert "users(" not in prompt
+    assert prompt.endswith("User Question: top selling products\n")
+
+
+def test_unrecognised_question_gets_the_whole_schema():
+    direct, bridges = make_prompter().select_tables("hello there")
+    assert direct == set(FALLBACK_TABLES)
+
+
+def test_rollup_tables_are_hidden():
+    tables = dict(FALLBACK_TABLES, rollup_daily_sales=['day', 'revenue'])
+    prompt, _ = make_prompter(tables=tables).build("daily revenue")
+    assert "rollup_daily_sales" not in prompt
+
+
+def test_schema_is_read_once_and_prompts_are_reused():
+    prompter = make_prompter()
+    prompter.build("orders by status")
+    prompter.build("Orders by status?")
+
+    assert len(prompter.loads) == 1
+    assert prompter.stats()['cached_prompts'] >= 1
+    assert prompter.stats()['requests'] == 2
+
+
+def test_column_changes_show_up_after_a_refresh():
+    tables = {name: list(columns) for name, columns in FALLBACK_TABLES.items()}
+    prompter = SchemaPrompter(lambda: information_schema(tables=tables), "INSTRUCTIONS")
+    before, _ = prompter.build("orders by status")
+
+    tables['orders'].append('coupon_code')
+    prompter.mark_stale()
+    after, _ = prompter.build("orders by status")
+
+    assert "coupon_code" not in before
+    assert "coupon_code" in after
+
+
+def test_prompt_is_smaller_than_the_full_schema(monkeypatch):
+    prompter = make_prompter()
+    prompter.build("low stock items")
+    stats = prompter.stats()
+    assert stats['avg_prompt_tokens_est'] < stats['avg_full_prompt_tokens_est']
+
+    assembled = []
+    assemble = prompter._assemble
+    monkeypatch.setattr(prompter, '_assemble', lambda *args: assembled.append(args) or assemble(*args))
+    prompter.build("low stock items")
+    prompter.build("more low stock items")
+    assert assembled == []   # neither the selection nor the full prompt is rebuilt
+
+
+def test_failed_introspection_falls_back_to_the_static_schema():
+    def load():
+        raise RuntimeError("database is down")
+
+    prompter = SchemaPrompter(load, "INSTRUCTIONS")
+    prompt, _ = prompter.build("orders by status")
+
+    assert "- orders(order_id, user_id, order_date, status, total_amount, shipping_address)" in prompt
+    assert prompter.stats()['source'] == 'fallback'
+
+
+def test_a_slow_refresh_does_not_block_other_callers():
+    reading, release = threading.Event(), threading.Event()
+    tables = {name: list(columns) for name, columns in FALLBACK_TABLES.items()}
+
+    def load():
+        if prompter.stats()['refreshes']:
+            reading.set()
+            release.wait(5)
+        return information_schema(tables=tables)
+
+    prompter = SchemaPrompter(load, "INSTRUCTIONS")
+    current = prompter.schema()
+    tables['orders'].append('coupon_code')
+    prompter.mark_stale()
+    refresher = threading.Thread(target=prompter.schema)
+    refresher.start()
+    assert reading.wait(5)
+
+    assert prompter.schema() is current
+    assert prompter.stats()['refreshes'] == 1
+    release.set()
+    refresher.join()
+    assert 'coupon_code' in prompter.schema().tables['orders']
+    assert prompter.stats()['refreshes'] == 2
@@ -0,0 +1,175 @@
+"""
+Tests for follow-up questions answered from a session's recent result sets.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+import app as backend
+from question_cache import QuestionCache
+from session_cache import CachedResult, SessionCache, apply_followup, parse_followup
+from sql_result import QueryResult
+
+TODAY = date(2024, 6, 15)
+COLUMNS = ('product', 'brand', 'revenue', 'last_order')
+ROWS = (
+    ('Phone', 'Acme', 900.0, datetime(2024, 6, 2, 10, 0)),
+    ('Laptop', 'Zen', 1500.0, datetime(2024, 5, 20, 9, 30)),
+    ('Tablet', 'Acme', 450.0, datetime(2024, 5, 3, 18, 0)),
+    ('Watch', 'Zen', 120.0, datetime(2024, 3, 1, 12, 0)),
+)
+
+
+def cached(complete=True, rows=ROWS, question="products by revenue"):
+    return CachedResult(question, "SELECT ...", COLUMNS, rows, complete, 0)
+
+
+@pytest.mark.parametrize('question, kind, params', [
+    ("now only for last month", 'period', {'which': 'last', 'unit': 'month'}),
+    ("Just the top 3", 'truncate', {'end': 'top', 'n': '3'}),
+    ("sort by revenue", 'sort', {'column': 'revenue'}),
+    ("order them by brand a to z", 'sort', {'column': 'brand', 'direction': 'a to z'}),
+    ("only the ones with revenue above $500", 'compare', {'column': 'revenue', 'op': 'above', 'number': '500'}),
+    ("only Acme", 'value', {'value': 'acme'}),
+])
+def test_refinements_are_recognized(question, kind, params):
+    assert parse_followup(question) == (kind, params)
+
+
+@pytest.mark.parametrize('question', ["What is the total revenue?", "top 5 selling products", "hello",
+                                      "show me the last 5 orders"])
+def test_new_questions_are_not_refinements(question):
+    assert parse_followup(question) is None
+
+
+@pytest.mark.parametrize('question, products', [
+    ("only for last month", ['Laptop', 'Tablet']),
+    ("this month", ['Phone']),
+    ("just the top 2", ['Phone', 'Laptop']),
+    ("bottom 1", ['Watch']),
+    ("sort by revenue", ['Laptop', 'Phone', 'Tablet', 'Watch']),
+    ("sort by product", ['Laptop', 'Phone', 'Tablet', 'Watch']),
+    ("sort by revenue lowest first", ['Watch', 'Tablet', 'Phone', 'Laptop']),
+    ("only where revenue is at least 900", ['Phone', 'Laptop']),
+    ("just zen", ['Laptop', 'Watch']),
+])
+def test_refinements_apply_to_the_rows(question, products):
+    rows = apply_followup(cached(), parse_followup(question), today=TODAY)
+    assert [row[0] for row in rows] == products
+
+
+@pytest.mark.parametrize('question', ["sort by revenue", "only for last month", "bottom 2", "just the top 10"])
+def test_a_cut_off_result_only_serves_its_head(question):
+    assert apply_followup(cached(complete=False), parse_followup(question), today=TODAY) is None
+
+
+@pytest.mark.parametrize('question', ["sort by shipping cost", "only Globex", "just the top 2 customers"])
+def test_refinements_the_rows_cannot_answer(question):
+    assert apply_followup(cached(), parse_followup(question), today=TODAY) is None
+
+
+def test_refinements_chain_and_are_counted():
+    sessions = SessionCache()
+    sessions.put('s1', "products by revenue", "SELECT ...", COLUMNS, ROWS)
+
+    assert sessions.answer('s1', "sort by revenue")[0] == 'sort'
+    kind, _, rows = sessions.answer('s1', "just the top 2")
+    assert [row[0] for row in rows] == ['Laptop', 'Phone']
+    assert sessions.answer('s2', "sort by revenue") is None
+    assert sessions.answer('s1', "sort by shipping cost") is None
+
+    stats = sessions.stats()
+    assert (stats['turns'], stats['served'], stats['unservable']) == (4, 2, 1)
+    assert stats['served_by_kind'] == {'sort': 1, 'truncate': 1}
+
+
+def test_top_n_slices_only_serve_truncations():
+    assert not backend.result_is_complete("SELECT name FROM products ORDER BY revenue DESC LIMIT 10", 10)
+    assert backend.result_is_complete("SELECT name FROM products", 10)
+
+    sessions = SessionCache()
+    sessions.put('s1', "top products by revenue", "SELECT ... LIMIT 10", COLUMNS, ROWS, complete=False)
+    assert sessions.answer('s1', "sort by product") is None
+    assert sessions.answer('s1', "just the top 3")[0] == 'truncate'
+    assert sessions.answer('s1', "top 2")[0] == 'truncate'
+
+    sessions.put('s2', "products by revenue", "SELECT ...", COLUMNS, ROWS)
+    sessions.answer('s2', "just the top 2")
+    assert not sessions._sessions['s2'][1][0].complete
+
+
+def test_memory_caps_evict_whole_sessions_least_recently_used():
+    sessions = SessionCache(max_sessions=2, results_per_session=2, max_rows=3)
+    for session_id in ('a', 'b'):
+        for turn in range(3):
+            sessions.put(session_id, f"q{turn}", None, COLUMNS, ROWS)
+    assert sessions.stats()['results'] == 4
+    assert not sessions._sessions['a'][1][0].complete   # 4 rows over the 3-row cap
+
+    sessions.answer('a', "just the top 1")   # touches a
+    sessions.put('c', "q", None, COLUMNS, ROWS)
+    assert sorted(sessions._sessions) == ['a', 'c']
+
+    size = sessions.stats()['bytes']
+    tight = SessionCache(max_bytes=int(size * 0.75))
+    for session_id in ('a', 'b', 'c'):
+        tight.put(session_id, "q", None, COLUMNS, ROWS)
+    assert tight.stats()['bytes'] <= tight.max_bytes and tight.stats()['evictions'] > 0
+
+
+@pytest.fixture
+def ask(monkeypatch):
+    """/ask with Gemini and the database stubbed; records what reached them"""
+    calls = {'gemini': 0, 'sql': []}
+    monkeypatch.setattr(backend, 'question_cache', QuestionCache(":memory:"))
+    monkeypatch.setattr(backend, 'session_cache', SessionCache())
+    monkeypatch.setattr(backend, 'fast_path_answer', lambda question: None)
+
+    def gemini(question):
+        calls['gemini'] += 1
+        return "SELECT p.name AS product, p.brand, SUM(oi.price) AS revenue FROM products p GROUP BY p.name, p.brand"
+
+    def fetch(sql, batch_size=None):
+        calls['sql'].append(sql)
+        return QueryResult.from_rows(['product', 'brand', 'revenue'], [row[:3] for row in ROWS])
+
+    monkeypatch.setattr(backend, 'get_sql_from_gemini', gemini)
+    monkeypatch.setattr(backend, 'stream_from_gemini', lambda question: iter([gemini(question)]))
+    monkeypatch.setattr(backend, 'fetch_sql_result', fetch)
+    return calls
+
+
+def test_follow_up_turns_skip_gemini_and_the_database(ask):
+    client = backend.app.test_client()
+
+    first = client.post('/ask', json={'message': "revenue by product", 'session_id': 'chat-1'}).get_json()
+    follow = client.post('/ask', json={'message': "sort by revenue", 'session_id': 'chat-1'}).get_json()
+    other = client.post('/ask', json={'message': "sort by revenue", 'session_id': 'chat-2'}).get_json()
+
+    assert 'followup' not in first
+    assert follow['followup'] == 'sort' and follow['sql'] is None
+    assert follow['text'].startswith("Record 1 - Product: Laptop")
+    assert 'followup' not in other
+    assert (ask['gemini'], len(ask['sql'])) == (2, 2)
+    assert client.get('/api/admin/session-cache').get_json()['data']['served'] == 1
+
+
+def test_fast_path_answers_are_not_kept_for_follow_ups(ask, monkeypatch):
+    monkeypatch.setattr(backend, 'fast_path_answer',
+                        lambda question: ('top_products', ['product'], [['Phone']], "Record 1 - Product: Phone"))
+    client = backend.app.test_client()
+
+    client.post('/ask', json={'message': "top products", 'session_id': 'chat-1'})
+    assert backend.session_cache.stats()['results'] == 0
+
+
+def test_stream_follow_up_sends_the_refined_rows(ask):
+    client = backend.app.test_client()
+
+    client.post('/ask/stream', json={'message': "revenue by product", 'session_id': 'chat-1'}).get_data()
+    body = client.post('/ask/stream', json={'message': "just the top 2", 'session_id': 'chat-1'}).get_data(as_text=True)
+
+    assert '"followup":"truncate"' in body
+    assert '"rows":[["Phone","Acme",900.0],["Laptop","Zen",1500.0]]' in body
+    assert ask['gemini'] == 1
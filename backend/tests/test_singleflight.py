@@ -0,0 +1,117 @@
+"""
+Tests for request coalescing: concurrent identical calls run once and share
+the outcome, distinct keys and sequential calls do not.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import Group
+
+
+def burst(n, fn):
+    """Run fn from n threads released at the same moment"""
+    start = threading.Barrier(n)
+
+    def call():
+        start.wait()
+        return fn()
+
+    with ThreadPoolExecutor(n) as pool:
+        futures = [pool.submit(call) for _ in range(n)]
+        return [f.result() for f in futures] if all(f.exception() is None for f in futures) else futures
+
+
+def slow(calls, value, delay=0.2):
+    def fn(*args):
+        calls.append(args)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+def test_concurrent_callers_share_one_execution():
+    group, calls, rows = Group('test'), [], [{'n': 1}]
+
+    results = burst(8, lambda: group.do('key', slow(calls, rows)))
+
+    assert len(calls) == 1
+    assert all(result is rows for result in results)
+    stats = group.stats()
+    assert stats['executions'] == 1 and stats['coalesced'] == 7 and stats['in_flight'] == 0
+
+
+def test_distinct_keys_and_later_calls_run_again():
+    group, calls = Group('test'), []
+    fn = slow(calls, 'x', delay=0)
+
+    group.do('a', fn)
+    group.do('a', fn)
+    group.do('b', fn)
+
+    assert len(calls) == 3
+    assert group.stats()['coalesced'] == 0
+
+
+def test_the_leaders_exception_reaches_every_waiter():
+    group = Group('test')
+
+    def fail():
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    futures = burst(4, lambda: group.do('key', fail))
+
+    assert all(isinstance(f.exception(), RuntimeError) for f in futures)
+    assert group.stats()['errors'] == 1
+    assert group.do('key', lambda: 'recovered') == 'recovered'
+
+
+def test_waiters_give_up_on_a_stuck_leader():
+    group, release = Group('test', timeout=0.05), threading.Event()
+    leader = threading.Thread(target=group.do, args=('key', release.wait))
+    leader.start()
+    while not group.stats()['in_flight']:
+        time.sleep(0.001)
+
+    assert group.do('key', lambda: 'own result') == 'own result'
+    release.set()
+    leader.join()
+    assert group.stats()['timeouts'] == 1
+
+
+def test_dashboard_burst_runs_each_query_once(monkeypatch):
+    import app
+
+    calls = []
+    monkeypatch.setattr(app, 'SINGLEFLIGHT_ENABLED', True)
+    monkeypatch.setattr(app, 'db_flight', Group('db'))
+    monkeypatch.setattr(app, '_execute_query', slow(calls, [{'status': 'delivered', 'count': 3}]))
+
+    results = burst(6, lambda: app.execute_query(app.SALES_TREND_QUERY, ('2024-01-01', '2024-02-01', 31)))
+
+    assert len(calls) == 1 and len(results) == 6
+    assert app.db_flight.stats()['coalesced'] == 5
+
+
+@pytest.mark.parametrize('enabled, expected', [(True, 1), (False, 3)])
+def test_same_question_shares_a_gemini_call(monkeypatch, enabled, expected):
+    import app
+
+    calls = []
+    monkeypatch.setattr(app, 'SINGLEFLIGHT_ENABLED', enabled)
+    monkeypatch.setattr(app, 'gemini_flight', Group('gemini'))
+    monkeypatch.setattr(app, '_sql_from_gemini', slow(calls, "SELECT COUNT(*) FROM orders"))
+    questions = iter(["How many orders?", "how many orders", "How many  orders ?"])
+    lock = threading.Lock()
+
+    def ask():
+        with lock:
+            question = next(questions)
+        return app.get_sql_from_gemini(question)
+
+    assert burst(3, ask) == ["SELECT COUNT(*) FROM orders"] * 3
+    assert len(calls) == expected
@@ -0,0 +1,101 @@
+"""
+Tests for the EXPLAIN-based guard on generated SQL.
+"""
+
+import logging
+
+import pytest
+
+import app as backend
+from sql_guard import QueryGuard, add_execution_hint, summarize_plan
+
+
+def table(name, access_type, examined, produced=None):
+    return {'table': {
+        'table_name': name,
+        'access_type': access_type,
+        'rows_examined_per_scan': examined,
+        'rows_produced_per_join': examined if produced is None else produced,
+    }}
+
+
+def plan(*tables, cost="12.50"):
+    return {'query_block': {'select_id': 1, 'cost_info': {'query_cost': cost}, 'nested_loop': list(tables)}}
+
+
+CROSS_JOIN = plan(table('orders', 'ALL', 50000), table('order_items', 'ALL', 200000, produced=10000000000))
+INDEXED = plan(table('orders', 'range', 120), table('order_items', 'ref', 3, produced=360))
+
+
+class TimeoutError3024(Exception):
+    errno = 3024
+
+
+def make_guard(explained, **kwargs):
+    return QueryGuard(lambda sql: explained, **kwargs)
+
+
+def test_summary_takes_the_largest_join_estimate():
+    assert summarize_plan(CROSS_JOIN) == (10000000000, 2, 12.5, ['orders', 'order_items'])
+
+
+def test_full_scans_of_small_tables_are_not_counted():
+    est_rows, full_scans, _, _ = summarize_plan(plan(table('categories', 'ALL', 40), table('products', 'ref', 5)))
+    assert (est_rows, full_scans) == (40, 0)
+
+
+def test_cheap_query_is_allowed_with_a_deadline():
+    decision = make_guard(INDEXED, max_execution_ms=3000).check("SELECT o.order_id FROM orders o LIMIT 100;")
+    assert decision.allowed
+    assert decision.sql == "SELECT /*+ MAX_EXECUTION_TIME(3000) */ o.order_id FROM orders o LIMIT 100;"
+
+
+def test_row_estimate_over_threshold_is_rejected():
+    decision = make_guard(CROSS_JOIN).check("SELECT * FROM orders, order_items LIMIT 100;")
+    assert not decision.allowed
+    assert decision.sql is None
+    assert "10,000,000,000 rows" in decision.reason
+
+
+def test_too_many_full_scans_is_rejected():
+    decision = make_guard(CROSS_JOIN, max_rows=0, max_full_scans=1).check("SELECT 1")
+    assert not decision.allowed
+    assert "orders, order_items" in decision.reason
+
+
+def test_decisions_are_logged_with_costs(caplog):
+    with caplog.at_level(logging.INFO, logger='sql_guard'):
+        make_guard(CROSS_JOIN).check("SELECT 1")
+    record, = [r for r in caplog.records if r.getMessage() == 'sql_guard.decision']
+    assert record.levelno == logging.WARNING
+    assert record.fields['allowed'] is False
+    assert (record.fields['est_rows'], record.fields['full_scans'], record.fields['cost']) == (10000000000, 2, 12.5)
+
+
+def test_existing_hint_is_kept():
+    sql = "SELECT /*+ MAX_EXECUTION_TIME(100) */ 1"
+    assert add_execution_hint(sql, 5000) == sql
+
+
+def test_rejected_query_is_never_run(monkeypatch):
+    monkeypatch.setattr(backend, 'query_guard', make_guard(CROSS_JOIN))
+    monkeypatch.setattr(backend, 'run_sql', lambda sql, **kwargs: pytest.fail("rejected SQL executed"))
+
+    response, succeeded = backend.answer_with_sql("all orders with all items", "SELECT * FROM orders, order_items;")
+
+    assert not succeeded
+    assert "too expensive" in response['text']
+
+
+def test_timeout_is_explained(monkeypatch):
+    monkeypatch.setattr(backend, 'query_guard', make_guard(INDEXED, max_execution_ms=2500))
+
+    def run_sql(sql, **kwargs):
+        return backend.sql_error_message(TimeoutError3024("Query execution was interrupted"))
+
+    monkeypatch.setattr(backend, 'run_sql', run_sql)
+
+    response, succeeded = backend.answer_with_sql("orders", "SELECT order_id FROM orders;")
+
+    assert not succeeded
+    assert response['text'].startswith("The query for that question was stopped after 2.5 seconds.")
@@ -0,0 +1,103 @@
+"""
+Tests for the parse-once SQL normalizer: statement extraction from model
+replies, fingerprints, table extraction, outermost LIMIT handling and the memo.
+"""
+
+import pytest
+
+import sql_normalize
+from sql_normalize import SQLNormalizer, add_limit, extract_statement, is_safe_select
+
+
+@pytest.mark.parametrize('reply, expected', [
+    ("SELECT name FROM products;", "SELECT name FROM products"),
+    ("```sql\nSELECT name\nFROM products\nWHERE brand = 'A;B';\n```\nThis lists products.",
+     "SELECT name\nFROM products\nWHERE brand = 'A;B'"),
+    ("`SELECT name FROM products`", "SELECT name FROM products"),
+    ("SQL: SELECT `order` FROM t\n\nThe column is quoted.", "SELECT `order` FROM t"),
+])
+def test_statement_is_extracted_from_the_reply(reply, expected):
+    assert extract_statement(reply) == expected
+
+
+def test_normalized_text_and_fingerprint():
+    parsed = SQLNormalizer().parse("select  name,\n  COUNT( * ) from products -- top\n"
+                                   "where brand IN ('A', 'B') and price > 10.5 LIMIT 5;")
+
+    assert parsed.sql == "select name, COUNT(*) from products where brand IN ('A', 'B') and price > 10.5 LIMIT 5"
+    assert parsed.fingerprint == "SELECT name, COUNT(*) FROM products WHERE brand IN (?+) AND price > ? LIMIT ?"
+    assert (parsed.kind, parsed.statements, parsed.limit) == ('SELECT', 1, 5)
+
+
+def test_literal_variants_share_a_fingerprint_and_a_memoized_shape():
+    normalizer = SQLNormalizer()
+    first = normalizer.parse("SELECT * FROM orders WHERE user_id = 7 AND status IN ('shipped')")
+    second = normalizer.parse("SELECT * FROM orders WHERE user_id = 9 AND status IN ('shipped', 'delivered')")
+    normalizer.parse("SELECT * FROM orders WHERE user_id = 7 AND status IN ('shipped')")
+
+    assert first.digest == second.digest and first.sql != second.sql
+    assert normalizer.stats() == {'entries': 2, 'fingerprints': 1, 'hits': 1, 'misses': 2,
+                                  'hit_ratio': 0.3333, 'shape_hits': 1}
+
+
+def test_a_trailing_statement_never_shares_a_shape():
+    normalizer = SQLNormalizer()
+    assert is_safe_select(normalizer.parse("SELECT 1 FROM users"))
+    assert not is_safe_select(normalizer.parse("SELECT 1 FROM users; DROP TABLE users"))
+
+
+@pytest.mark.parametrize('sql, tables', [
+    ("SELECT * FROM orders o JOIN order_items oi ON oi.order_id = o.order_id LEFT JOIN users u ON u.user_id = o.user_id",
+     ('orders', 'order_items', 'users')),
+    ("SELECT * FROM products p, categories c WHERE p.category_id = c.category_id AND COALESCE(p.brand, c.name) = 'x'",
+     ('products', 'categories')),
+    ("WITH recent AS (SELECT * FROM orders WHERE order_date > NOW() - INTERVAL 7 DAY) "
+     "SELECT COUNT(*) FROM recent WHERE user_id IN (SELECT user_id FROM shop.users)",
+     ('orders', 'shop.users')),
+    ("SELECT `name` FROM `products`", ('products',)),
+])
+def test_referenced_tables(sql, tables):
+    assert SQLNormalizer().parse(sql).tables == tables
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("SELECT * FROM orders", "SELECT * FROM orders LIMIT 100"),
+    ("SELECT * FROM orders WHERE order_id IN (SELECT order_id FROM order_items LIMIT 5)",
+     "SELECT * FROM orders WHERE order_id IN (SELECT order_id FROM order_items LIMIT 5) LIMIT 100"),
+    ("SELECT * FROM (SELECT * FROM orders ORDER BY order_date DESC LIMIT 20) t",
+     "SELECT * FROM (SELECT * FROM orders ORDER BY order_date DESC LIMIT 20) t LIMIT 100"),
+    ("SELECT name FROM products LIMIT 10;", "SELECT name FROM products LIMIT 10"),
+    ("SELECT name FROM products WHERE name = 'LIMIT 3'", "SELECT name FROM products WHERE name = 'LIMIT 3' LIMIT 100"),
+])
+def test_limit_goes_on_the_outermost_query(sql, expected):
+    assert add_limit(SQLNormalizer().parse(sql), 100) == expected
+
+
+@pytest.mark.parametrize('sql, limit', [
+    ("SELECT a FROM t LIMIT 20, 10", 10),
+    ("SELECT a FROM t LIMIT 10 OFFSET 20", 10),
+    ("SELECT a FROM t UNION SELECT b FROM u LIMIT 3", 3),
+])
+def test_limit_row_count(sql, limit):
+    assert SQLNormalizer().parse(sql).limit == limit
+
+
+@pytest.mark.parametrize('sql', [
+    "DELETE FROM orders",
+    "UPDATE users SET name = 'x'",
+    "SELECT * FROM orders INTO OUTFILE '/tmp/orders.csv'",
+    "SELECT 1; SELECT 2",
+    "",
+])
+def test_only_single_plain_selects_are_safe(sql):
+    assert not is_safe_select(SQLNormalizer().parse(sql))
+
+
+def test_app_pipeline_uses_the_normalizer():
+    import app
+
+    assert app.clean_sql("```sql\nSELECT `name` FROM products;\n```") == "SELECT `name` FROM products;"
+    assert app.add_limit("SELECT * FROM (SELECT * FROM orders LIMIT 5) t") == \
+        "SELECT * FROM (SELECT * FROM orders LIMIT 5) t LIMIT 100;"
+    assert app.is_sql_response("```sql\nSELECT name FROM products\n```")
+    assert sql_normalize.normalizer.stats()['misses'] > 0
@@ -0,0 +1,74 @@
+"""
+Tests for QueryResult over a fake unbuffered cursor.
+"""
+
+from decimal import Decimal
+from itertools import islice
+
+from mysql.connector import FieldType
+
+from sql_result import QueryResult
+
+
+class FakeCursor:
+    """Just enough of a DB-API cursor: description plus fetchmany()"""
+
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = list(rows)
+        self.fetches = 0
+
+    def fetchmany(self, size):
+        self.fetches += 1
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+
+def description(*columns):
+    return [(name, type_code, None, None, None, None, True) for name, type_code in columns]
+
+
+def test_decimal_columns_become_floats():
+    cursor = FakeCursor(
+        description(('name', FieldType.VAR_STRING), ('total', FieldType.NEWDECIMAL), ('orders', FieldType.LONGLONG)),
+        [('Phone', Decimal('10.50'), 3), ('Case', None, 1)],
+    )
+    result = QueryResult.from_cursor(cursor)
+
+    assert result.columns == ['name', 'total', 'orders']
+    assert list(result) == [['Phone', 10.5, 3], ['Case', None, 1]]
+
+
+def test_rows_are_fetched_in_batches():
+    cursor = FakeCursor(description(('id', FieldType.LONG)), [(i,) for i in range(5)])
+    result = QueryResult.from_cursor(cursor, batch_size=2)
+
+    assert [len(batch) for batch in result.iter_batches()] == [2, 2, 1]
+    assert result.rows_read == 5
+
+
+def test_partial_read_resumes_mid_batch():
+    cursor = FakeCursor(description(('id', FieldType.LONG)), [(i,) for i in range(5)])
+    result = QueryResult.from_cursor(cursor, batch_size=4)
+
+    assert list(islice(result, 2)) == [(0,), (1,)]
+    assert list(result) == [(2,), (3,), (4,)]
+
+
+def test_exhausted_result_reports_it_on_close():
+    closed = []
+    cursor = FakeCursor(description(('id', FieldType.LONG)), [(1,), (2,)])
+
+    assert list(QueryResult.from_cursor(cursor, on_close=closed.append)) == [(1,), (2,)]
+    assert closed == [True]
+
+
+def test_result_closed_early_is_not_exhausted():
+    closed = []
+    cursor = FakeCursor(description(('id', FieldType.LONG)), [(i,) for i in range(10)])
+
+    with QueryResult.from_cursor(cursor, on_close=closed.append, batch_size=3) as result:
+        next(iter(result))
+
+    assert closed == [False]
+    assert cursor.fetches == 1
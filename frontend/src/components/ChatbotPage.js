@@ -21,6 +21,10 @@ const ChatbotPage = () => {
   const [isTyping, setIsTyping] = useState(false);
   const messagesEndRef = useRef(null);
   const textareaRef = useRef(null);
+  // One id per open chat, so the backend can answer refinements from the previous result
+  const sessionIdRef = useRef(
+    window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`
+  );
 
   // Auto-scroll to bottom of messages
   const scrollToBottom = () => {
@@ -57,6 +61,30 @@ const ChatbotPage = () => {
     return responses[Math.floor(Math.random() * responses.length)];
   };
 
+  // Parse the Server-Sent Events sent by /ask/stream as they arrive
+  const readEventStream = async (response, onEvent) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  };
+
   const handleSendMessage = async () => {
     if (inputMessage.trim() === '') return;
 
@@ -72,24 +100,54 @@ const ChatbotPage = () => {
     setIsLoading(true);
     setIsTyping(true);
 
+    const botMessageId = Date.now() + 1;
+    let botMessageShown = false;
+    let streamedText = '';
+
+    // The bot bubble replaces the typing indicator on the first streamed event
+    const updateBotMessage = (changes) => {
+      if (!botMessageShown) {
+        botMessageShown = true;
+        setIsTyping(false);
+        setMessages(prevMessages => [
+          ...prevMessages,
+          {
+            id: botMessageId,
+            text: '',
+            sql: null,
+            sender: 'bot',
+            timestamp: new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
+          }
+        ]);
+      }
+      setMessages(prevMessages => prevMessages.map(message => (
+        message.id === botMessageId ? { ...message, ...changes } : message
+      )));
+    };
+
     try {
-      const response = await fetch('http://localhost:5000/ask', {
+      const response = await fetch('http://localhost:5000/ask/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: newUserMessage.text })
+        body: JSON.stringify({ message: newUserMessage.text, session_id: sessionIdRef.current })
       });
-      const data = await response.json();
-      setIsTyping(false);
-      setMessages(prevMessages => [
-        ...prevMessages,
-        {
-          id: Date.now() + 1,
-          text: data.text,
-          sql: data.sql || null,
-          sender: 'bot',
-          timestamp: new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
+      await readEventStream(response, (event, data) => {
+        if (event === 'meta' && data.followup) {
+          updateBotMessage({ followup: data.followup });
+        } else if (event === 'token') {
+          streamedText += data.text;
+          updateBotMessage({ text: streamedText });
+        } else if (event === 'sql') {
+          updateBotMessage({ sql: data.sql, exportToken: data.export_token });
+        } else if (event === 'answer') {
+          updateBotMessage({ text: data.text });
+        } else if (event === 'error') {
+          updateBotMessage({ text: 'Sorry, something went wrong while answering your question.' });
+        } else if (event === 'done' && botMessageShown) {
+          updateBotMessage({ firstTokenMs: data.first_token_ms });
         }
-      ]);
+      });
+      setIsTyping(false);
     } catch (error) {
       setIsTyping(false);
       setMessages(prevMessages => [
@@ -240,6 +298,18 @@ const ChatbotPage = () => {
                             <path d="M5 15H4a2 2 0 0 1-2-2V4a2 2 0 0 1 2-2h9a2 2 0 0 1 2 2v1"/>
                           </svg>
                         </button>
+                        <a
+                          className="copy-btn"
+                          href={`http://localhost:5000/ask/export?format=csv&sql=${encodeURIComponent(message.sql)}&token=${message.exportToken}`}
+                          download
+                          title="Download full result as CSV"
+                        >
+                          <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2" strokeLinecap="round" strokeLinejoin="round">
+                            <path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"/>
+                            <polyline points="7 10 12 15 17 10"/>
+                            <line x1="12" y1="15" x2="12" y2="3"/>
+                          </svg>
+                        </a>
                       </div>
                       <pre className="sql-block">{message.sql}</pre>
                     </div>
@@ -247,6 +317,12 @@ const ChatbotPage = () => {
                 </div>
                 <div className="message-info">
                   <span className="message-time">{message.timestamp}</span>
+                  {message.sender === 'bot' && message.firstTokenMs != null && (
+                    <span className="message-latency">• first token in {Math.round(message.firstTokenMs)} ms</span>
+                  )}
+                  {message.sender === 'bot' && message.followup && (
+                    <span className="message-latency">• refined from the previous result</span>
+                  )}
                   {message.sender === 'user' && (
                     <span className="message-status">
                       <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2" strokeLinecap="round" strokeLinejoin="round">
@@ -10,31 +10,62 @@ const Dashboard = () => {
   const [inventory, setInventory] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [live, setLive] = useState(false);
 
   const API_BASE = 'http://localhost:5000/api/analytics';
 
+  const applySections = (sections) => {
+    if (sections.overview) setOverviewData(sections.overview);
+    if (sections.sales_trend) setSalesTrend(sections.sales_trend);
+    if (sections.order_status) setOrderStatus(sections.order_status);
+    if (sections.top_products) setTopProducts(sections.top_products);
+    if (sections.categories) setCategories(sections.categories);
+    if (sections.inventory) setInventory(sections.inventory);
+  };
+
   useEffect(() => {
-    fetchAllData();
+    if (!window.EventSource) {
+      fetchAllData();
+      return undefined;
+    }
+    // The server pushes a snapshot, then each section whenever its data changes
+    const source = new EventSource(`${API_BASE}/live`);
+    source.addEventListener('snapshot', (event) => {
+      const snapshot = JSON.parse(event.data);
+      applySections(snapshot.sections);
+      setLive(true);
+      // Sections the server has not computed yet arrive as 'section' events;
+      // fetch them once so the first paint does not wait for the producer
+      if (Object.keys(snapshot.sections).length === 0) {
+        fetchAllData();
+      } else {
+        setLoading(false);
+      }
+    });
+    source.addEventListener('section', (event) => {
+      const update = JSON.parse(event.data);
+      applySections({ [update.name]: update.data });
+      setLoading(false);
+    });
+    source.onerror = () => {
+      // EventSource reconnects on its own; show the data as not live meanwhile
+      setLive(false);
+    };
+    return () => source.close();
   }, []);
 
   const fetchAllData = async () => {
     try {
       setLoading(true);
-      const [overview, sales, status, products, cats, inv] = await Promise.all([
-        fetch(`${API_BASE}/overview`).then(res => res.json()),
-        fetch(`${API_BASE}/sales-trend`).then(res => res.json()),
-        fetch(`${API_BASE}/order-status`).then(res => res.json()),
-        fetch(`${API_BASE}/top-products`).then(res => res.json()),
-        fetch(`${API_BASE}/categories`).then(res => res.json()),
-        fetch(`${API_BASE}/inventory`).then(res => res.json())
-      ]);
-
-      if (overview.success) setOverviewData(overview.data);
-      if (sales.success) setSalesTrend(sales.data);
-      if (status.success) setOrderStatus(status.data);
-      if (products.success) setTopProducts(products.data);
-      if (cats.success) setCategories(cats.data);
-      if (inv.success) setInventory(inv.data);
+      // One request for every section; the backend queries them concurrently
+      const response = await fetch(`${API_BASE}/dashboard`);
+      const dashboard = await response.json();
+      applySections(dashboard.data || {});
+
+      if (dashboard.errors && Object.keys(dashboard.errors).length > 0) {
+        console.error('Some dashboard sections failed:', dashboard.errors);
+        if (!dashboard.partial) setError('Failed to fetch analytics data');
+      }
     } catch (err) {
       setError('Failed to fetch analytics data');
       console.error('Error fetching data:', err);
@@ -74,9 +105,13 @@ const Dashboard = () => {
     <div className="dashboard-container">
       <div className="dashboard-header">
         <h1>Online Store Analytics Dashboard</h1>
-        <button onClick={fetchAllData} className="refresh-btn">
-          Refresh Data
-        </button>
+        {live ? (
+          <span className="live-indicator">● Live</span>
+        ) : (
+          <button onClick={fetchAllData} className="refresh-btn">
+            Refresh Data
+          </button>
+        )}
       </div>
       
       {/* Overview Stats */}